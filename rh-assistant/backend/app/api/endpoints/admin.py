@@ -1,11 +1,24 @@
 from typing import List
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from loguru import logger
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.database import get_db
 from app.models import schemas, models
 from app.core.config import settings # Import settings
+from app.core.principal_cache import principal_cache
+from app.core.security import password_hasher
+from app.data.kb_snapshot import kb_snapshot_stats
+from app.ml.embeddings import embedding_service
+from app.ml.llm_engine import llm_engine
 from app.services import hr_service
+from app.services.chat_service import chat_service
+from app.services.external_api import external_api_service
+from app.services.ingestion_jobs import ingestion_jobs
+from app.services.interaction_log import interaction_log
+from app.services.rag import rag_pipeline
+from app.services.semantic_cache import semantic_cache
 from .chat import get_current_user # Import get_current_user from chat.py
 
 router = APIRouter()
@@ -18,12 +31,14 @@ async def get_current_admin_user(current_user: schemas.User = Depends(get_curren
 
 
 @router.get("/stats", response_model=dict)
-async def get_admin_stats(db: Session = Depends(get_db), current_user: schemas.User = Depends(get_current_admin_user)):
+async def get_admin_stats(db: AsyncSession = Depends(get_db), current_user: schemas.User = Depends(get_current_admin_user)):
     # Placeholder for admin statistics
     try:
-        total_users = db.query(models.User).count()
-        total_documents = db.query(models.HRDocument).count()
-        pending_validations = db.query(models.HRValidation).filter(models.HRValidation.approved.is_(None)).count()
+        total_users = await db.scalar(select(func.count()).select_from(models.User))
+        total_documents = await db.scalar(select(func.count()).select_from(models.HRDocument))
+        pending_validations = await db.scalar(
+            select(func.count()).select_from(models.HRValidation).where(models.HRValidation.approved.is_(None))
+        )
         return {
             "total_users": total_users,
             "total_documents": total_documents,
@@ -38,10 +53,50 @@ async def get_admin_stats(db: Session = Depends(get_db), current_user: schemas.U
         }
 
 
+# Runtime counters of the in-process caches and pools (per worker process), also exported on /metrics
+PERFORMANCE_STATS = {
+    "shared_query_cache": chat_service.query_cache.stats,
+    "external_context_cache": external_api_service.cache_stats,
+    "embedding_batches": embedding_service.stats,
+    "ingestion_jobs": ingestion_jobs.stats,
+    "password_hashing": password_hasher.stats,
+    "principal_cache": principal_cache.stats,
+    "interaction_log": interaction_log.stats,
+    "semantic_cache": semantic_cache.stats,
+    "llm": llm_engine.stats,
+    "rag": rag_pipeline.stats,
+    "kb_snapshot": kb_snapshot_stats,
+}
+
+
+@router.get("/performance", response_model=dict)
+async def get_performance_stats(current_user: schemas.User = Depends(get_current_admin_user)):
+    return {name: stats() for name, stats in PERFORMANCE_STATS.items()}
+
+
+@router.patch("/users/{user_id}", response_model=schemas.User)
+async def update_user(
+    user_id: int,
+    update: schemas.UserUpdate,
+    db: AsyncSession = Depends(get_db),
+    current_user: schemas.User = Depends(get_current_admin_user),
+):
+    user = await db.get(models.User, user_id)
+    if user is None:
+        raise HTTPException(status_code=404, detail="User not found")
+    for field, value in update.model_dump(exclude_unset=True).items():
+        setattr(user, field, value)
+    await db.commit()
+    await db.refresh(user)
+    # Cached principals of this user must not keep the old role / active flag
+    principal_cache.invalidate_user(user.email)
+    return user
+
+
 @router.get("/validations/pending", response_model=List[schemas.HRValidationInDB])
-async def get_pending_validations(db: Session = Depends(get_db), current_user: schemas.User = Depends(get_current_admin_user)):
+async def get_pending_validations(db: AsyncSession = Depends(get_db), current_user: schemas.User = Depends(get_current_admin_user)):
     try:
-        validations = hr_service.get_pending_validations(db)
+        validations = await hr_service.get_pending_validations(db)
         return validations
     except Exception:
         return []
@@ -52,13 +107,20 @@ async def validate_hr_response(
     validation_id: int,
     approved: bool,
     hr_feedback: str | None = None,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: schemas.User = Depends(get_current_admin_user),
 ):
     try:
-        validation = hr_service.update_hr_validation_status(db, validation_id, approved, hr_feedback)
-        if not validation:
-            raise HTTPException(status_code=404, detail="Validation not found")
-        return validation
+        validation = await hr_service.update_hr_validation_status(db, validation_id, approved, hr_feedback)
     except Exception:
         raise HTTPException(status_code=503, detail="Validation service unavailable in dev mode")
+    if not validation:
+        raise HTTPException(status_code=404, detail="Validation not found")
+    if approved:
+        # HR-approved answers are eligible for the semantic cache even in approved-only mode;
+        # the validation is already committed, a cache failure must not turn it into an error
+        try:
+            await semantic_cache.mark_approved(validation.query)
+        except Exception as e:
+            logger.warning(f"Semantic cache: could not mark validation {validation_id} as approved: {e}")
+    return validation
@@ -1,60 +1,101 @@
+import json
+import time
 from datetime import datetime, timedelta
-from typing import List, Optional
-from fastapi import APIRouter, Depends, HTTPException, status
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, status
 from types import SimpleNamespace
+from fastapi.responses import StreamingResponse
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.core.security import create_access_token, verify_token, get_password_hash, verify_password
+from app.core.principal_cache import principal_cache
+from app.core.security import create_access_token, verify_token, password_hasher, PasswordHasherBusyError
 from app.database import get_db
 from app.models import schemas, models
 from app.services.chat_service import chat_service
+from app.services.interaction_log import get_history_page, interaction_log
 from app.core.config import settings
 
 router = APIRouter()
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
 
-async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
+def _active(user):
+    # Deactivated accounts are refused (the principal cache is invalidated on deactivation)
+    if user.is_active is False:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Inactive user")
+    return user
+
+
+async def get_current_user(token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_db)):
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
+    # A token seen recently skips both the signature check and the users query
+    principal = principal_cache.get(token)
+    if principal is not None:
+        return _active(principal)
+
     # Be tolerant in dev: if token invalid (e.g., reload changed SECRET_KEY), fall back to mock user
+    expires_at = None
     try:
         payload = verify_token(token, credentials_exception)
         email: str = payload.get("sub")
         if email is None:
             raise credentials_exception
+        expires_at = payload.get("exp")
     except Exception:
         email = "dev@example.com"
 
     try:
-        user = db.query(models.User).filter(models.User.email == email).first()
+        user = (await db.execute(select(models.User).where(models.User.email == email))).scalars().first()
         if user is None:
             # Dev fallback: return mock user when DB has no data
             return SimpleNamespace(id=1, email=email, full_name="Dev User", is_active=True, role="user")
-        return user
     except Exception:
         # Dev fallback: if DB is unavailable or tables missing
         return SimpleNamespace(id=1, email=email, full_name="Dev User", is_active=True, role="user")
 
+    if expires_at is not None:
+        # Only real users behind a verified token are cached, never the dev fallbacks
+        user = principal_cache.set(token, user, expires_at)
+    return _active(user)
+
 
 @router.post("/token", response_model=schemas.Token)
-async def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
+async def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends(), db: AsyncSession = Depends(get_db)):
     try:
-        user = db.query(models.User).filter(models.User.email == form_data.username).first()
-        if not user or not verify_password(form_data.password, user.hashed_password):
+        user = (await db.execute(select(models.User).where(models.User.email == form_data.username))).scalars().first()
+    except Exception:
+        # Dev fallback: without a reachable user table, issue a token for any provided username
+        subject_email = form_data.username
+    else:
+        # Outside the fallback: a wrong password or a saturated hasher must reach the client
+        valid, new_hash = (False, None)
+        if user:
+            # bcrypt runs on the password hasher threads, not on the event loop
+            try:
+                valid, new_hash = await password_hasher.verify_and_update(form_data.password, user.hashed_password)
+            except PasswordHasherBusyError:
+                raise HTTPException(
+                    status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                    detail="Too many login attempts in progress, retry shortly",
+                    headers={"Retry-After": "1"},
+                )
+        if not valid:
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Incorrect username or password",
                 headers={"WWW-Authenticate": "Bearer"},
             )
+        if new_hash:
+            # Stored hash used another bcrypt cost: upgrade it now that we know the password
+            user.hashed_password = new_hash
+            await db.commit()
         subject_email = user.email
-    except Exception:
-        # Dev fallback: issue a token for any provided username
-        subject_email = form_data.username
 
     access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES) # type: ignore
     access_token = create_access_token(
@@ -67,39 +108,97 @@ async def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends(
 @router.post("/", response_model=schemas.ChatResponse)
 async def chat_with_assistant(
     chat_query: schemas.ChatQuery,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: schemas.User = Depends(get_current_user),
 ):
     # Ensure the user_id in the query matches the authenticated user
     if chat_query.user_id != current_user.id:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="User ID mismatch")
     
+    start = time.perf_counter()
     response = await chat_service.process_chat_query(db, chat_query)
+    # Buffered only: the row is bulk-inserted later by the interaction log flusher
+    interaction_log.record(
+        current_user.email,
+        chat_query.session_id,
+        chat_query.message,
+        response,
+        response_time_ms=round((time.perf_counter() - start) * 1000),
+    )
     return response
 
 
-@router.get("/history/{user_id}", response_model=List[schemas.ChatResponse])
+def _sse(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False, default=str)}\n\n"
+
+
+@router.post("/stream")
+async def stream_chat_with_assistant(
+    chat_query: schemas.ChatQuery,
+    current_user: schemas.User = Depends(get_current_user),
+):
+    """Server-Sent Events: `sources` and `context` first, then `token` events as the LLM
+    generates, then `done` with the full response (or `error` if generation broke off)."""
+    if chat_query.user_id != current_user.id:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="User ID mismatch")
+
+    email = current_user.email
+
+    async def events():
+        start = time.perf_counter()
+        async for event, data in chat_service.stream_chat_query(chat_query):
+            yield _sse(event, data)
+            if event == "done":
+                interaction_log.record(
+                    email,
+                    chat_query.session_id,
+                    chat_query.message,
+                    data,
+                    response_time_ms=round((time.perf_counter() - start) * 1000),
+                )
+
+    # X-Accel-Buffering: keep nginx from buffering the stream
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.get("/history/{user_id}", response_model=schemas.ChatHistoryPage)
 async def get_chat_history(
     user_id: int,
-    db: Session = Depends(get_db),
+    limit: int = Query(settings.CHAT_HISTORY_PAGE_SIZE, ge=1, le=100),
+    cursor: Optional[str] = None,
+    db: AsyncSession = Depends(get_db),
     current_user: schemas.User = Depends(get_current_user),
 ):
-    # In a real application, you would store chat history in the DB and retrieve it here.
-    # For this example, we'll return an empty list or mock data.
     if user_id != current_user.id:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="User ID mismatch")
-    
-    # This is a placeholder. You would fetch actual chat history from your database.
-    return []
+
+    if cursor is None:
+        # First page: write this user's pending messages (no embeddings, no wait on the background flush)
+        await interaction_log.write_pending(current_user.email)
+    try:
+        return await get_history_page(db, current_user.email, limit, cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
 
 @router.post("/register", response_model=schemas.User)
-async def register_user(user: schemas.UserCreate, db: Session = Depends(get_db)):
-    db_user = db.query(models.User).filter(models.User.email == user.email).first()
+async def register_user(user: schemas.UserCreate, db: AsyncSession = Depends(get_db)):
+    db_user = (await db.execute(select(models.User).where(models.User.email == user.email))).scalars().first()
     if db_user:
         raise HTTPException(status_code=400, detail="Email already registered")
     
-    hashed_password = get_password_hash(user.password)
+    try:
+        hashed_password = await password_hasher.hash(user.password)
+    except PasswordHasherBusyError:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Too many registrations in progress, retry shortly",
+            headers={"Retry-After": "1"},
+        )
     db_user = models.User(
         email=user.email, 
         full_name=user.full_name, 
@@ -108,6 +207,6 @@ async def register_user(user: schemas.UserCreate, db: Session = Depends(get_db))
         role="user"
     )
     db.add(db_user)
-    db.commit()
-    db.refresh(db_user)
+    await db.commit()
+    await db.refresh(db_user)
     return db_user
@@ -1,74 +1,94 @@
 from fastapi import APIRouter, File, UploadFile, Depends, HTTPException
-from sqlalchemy.orm import Session
-import docx
-import PyPDF2
-import io
-from app.database import get_db
-from app.models import schemas, models
-from app.core.config import settings # Import settings
-from app.ml.embeddings import EmbeddingsGenerator
-from app.services import hr_service
-from app.ml.vectorizer import chroma_vectorizer
-import uuid
+from typing import List
+import asyncio
+import os
+from app.models import schemas
+from app.services.ingestion import spool_upload
+from app.services.ingestion_jobs import ingestion_jobs
 from .chat import get_current_user
 from fastapi import status
 
 router = APIRouter()
 
-async def extract_text_from_pdf(file: UploadFile) -> str:
-    pdf_reader = PyPDF2.PdfReader(io.BytesIO(await file.read()))
-    text = ""
-    for page in pdf_reader.pages:
-        text += page.extract_text()
-    return text
+SUPPORTED_EXTENSIONS = ["pdf", "doc", "docx"]
 
-async def extract_text_from_docx(file: UploadFile) -> str:
-    document = docx.Document(io.BytesIO(await file.read()))
-    text = "\n".join([paragraph.text for paragraph in document.paragraphs])
-    return text
 
-@router.post("/documents")
+def _require_admin(current_user: schemas.User):
+    # For simplicity, only admin can upload documents
+    if current_user.role != "admin":
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Not enough permissions")
+
+
+def _extension(file: UploadFile) -> str:
+    return (file.filename or "").split(".")[-1].lower()
+
+
+def _queue_full() -> HTTPException:
+    return HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="Ingestion queue is full, retry later")
+
+
+async def _enqueue(file: UploadFile, category: str, current_user: schemas.User) -> dict:
+    # Spool to disk (hashing on the way); extraction, chunking and embedding run in a background worker
+    file_extension = _extension(file)
+    spooled = await spool_upload(file, suffix=f".{file_extension}")
+    try:
+        job = await ingestion_jobs.submit(spooled, file.filename, file_extension, category, current_user.email)
+    except asyncio.QueueFull:
+        os.remove(spooled.path)
+        raise _queue_full()
+    return {
+        "job_id": job.job_id,
+        "filename": file.filename,
+        "status": job.status,
+        "document_id": job.document_id,
+        "status_url": f"/upload/jobs/{job.job_id}",
+    }
+
+
+@router.post("/documents", status_code=status.HTTP_202_ACCEPTED)
 async def upload_document(
     file: UploadFile = File(...),
     category: str = "general",
-    db: Session = Depends(get_db),
     current_user: schemas.User = Depends(get_current_user),
 ):
-    # For simplicity, only admin can upload documents
-    if current_user.role != "admin":
-        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Not enough permissions")
-
-    # Avoid reading the file twice; branch by extension and read once
-    file_extension = (file.filename or "").split(".")[-1].lower()
-    extracted_text = ""
+    _require_admin(current_user)
 
-    if file_extension == "pdf":
-        extracted_text = await extract_text_from_pdf(file)
-    elif file_extension in ["doc", "docx"]:
-        extracted_text = await extract_text_from_docx(file)
-    else:
+    if _extension(file) not in SUPPORTED_EXTENSIONS:
         raise HTTPException(status_code=400, detail="Unsupported file type. Only PDF and DOCX are supported.")
+    if ingestion_jobs.full():
+        raise _queue_full()
 
-    # Store in vector DB regardless of relational DB availability
-    doc_id = str(uuid.uuid4())
-    chroma_vectorizer.add_document(
-        doc_id,
-        extracted_text,
-        {"source": f"upload_by_{current_user.email}", "filename": file.filename, "file_type": file_extension, "category": category}
-    )
+    return await _enqueue(file, category, current_user)
 
-    # Optionally persist metadata in relational DB (best-effort)
-    # Best effort DB write disabled in dev mode if tables missing
-    try:
-        hr_document = schemas.HRDocument(
-            title=file.filename,
-            content=extracted_text,
-            source=f"upload_by_{current_user.email}",
-            category=category,
-            metadata={"filename": file.filename, "file_type": file_extension},
-        )
-        hr_service.create_hr_document(db, hr_document)
-    except Exception:
-        ...
-
-    return {"filename": file.filename, "message": "Document uploaded and processed successfully", "document_id": doc_id}
+
+@router.post("/documents/batch", status_code=status.HTTP_202_ACCEPTED)
+async def upload_documents_batch(
+    files: List[UploadFile] = File(...),
+    category: str = "general",
+    current_user: schemas.User = Depends(get_current_user),
+):
+    _require_admin(current_user)
+
+    jobs, rejected = [], []
+    for file in files:
+        if _extension(file) not in SUPPORTED_EXTENSIONS:
+            rejected.append({"filename": file.filename, "detail": "Unsupported file type. Only PDF and DOCX are supported."})
+            continue
+        try:
+            jobs.append(await _enqueue(file, category, current_user))
+        except HTTPException as e:
+            rejected.append({"filename": file.filename, "detail": e.detail})
+    return {"jobs": jobs, "rejected": rejected}
+
+
+@router.get("/jobs/{job_id}")
+async def get_ingestion_job(
+    job_id: str,
+    current_user: schemas.User = Depends(get_current_user),
+):
+    _require_admin(current_user)
+
+    job = await ingestion_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Ingestion job not found")
+    return job
@@ -0,0 +1,329 @@
+import asyncio
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from loguru import logger
+
+from app.core.config import settings
+
+
+class LRUTTLCache:
+    """In-process cache bounded by entry count (LRU eviction) and entry age (TTL)."""
+
+    def __init__(self, max_entries: int = 1024, ttl_seconds: float = 300.0, clock: Callable[[], float] = time.monotonic):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._clock = clock
+        self._entries: "OrderedDict[str, tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires_at, value = entry
+            if expires_at <= self._clock():
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: str, value: Any, ttl_seconds: Optional[float] = None):
+        ttl = self.ttl_seconds if ttl_seconds is None else ttl_seconds
+        with self._lock:
+            self._entries[key] = (self._clock() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def delete(self, key: str):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+        }
+
+
+class RedisCache:
+    """Shared cache tier stored in Redis as JSON, so every worker process sees the same entries.
+
+    Redis failures never propagate: the call is counted as an error and treated as a miss,
+    and the tier is skipped for `retry_after_seconds` so a dead Redis does not add a socket
+    timeout to every request.
+    """
+
+    def __init__(
+        self,
+        url: Optional[str] = None,
+        namespace: str = "cache",
+        ttl_seconds: float = 300.0,
+        client: Any = None,
+        retry_after_seconds: float = 30.0,
+    ):
+        if client is None:
+            import redis.asyncio as redis_asyncio
+
+            client = redis_asyncio.from_url(
+                url or settings.REDIS_URL,
+                decode_responses=True,
+                socket_timeout=settings.REDIS_SOCKET_TIMEOUT,
+                socket_connect_timeout=settings.REDIS_SOCKET_TIMEOUT,
+            )
+        self._client = client
+        self.prefix = f"rh:{namespace}:"
+        self.ttl_seconds = ttl_seconds
+        self.retry_after_seconds = retry_after_seconds
+        self._disabled_until = 0.0
+        self.hits = 0
+        self.misses = 0
+        self.errors = 0
+
+    def _available(self) -> bool:
+        return time.monotonic() >= self._disabled_until
+
+    def _record_error(self, operation: str, error: Exception):
+        self.errors += 1
+        self._disabled_until = time.monotonic() + self.retry_after_seconds
+        logger.warning(f"Redis cache {operation} failed, tier disabled for {self.retry_after_seconds}s: {error}")
+
+    async def get(self, key: str) -> Optional[Any]:
+        if not self._available():
+            self.misses += 1
+            return None
+        try:
+            raw = await self._client.get(self.prefix + key)
+        except Exception as e:
+            self._record_error("get", e)
+            self.misses += 1
+            return None
+        if raw is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return json.loads(raw)
+
+    async def set(self, key: str, value: Any, ttl_seconds: Optional[float] = None):
+        if not self._available():
+            return
+        ttl = self.ttl_seconds if ttl_seconds is None else ttl_seconds
+        try:
+            await self._client.set(self.prefix + key, json.dumps(value, default=str), ex=max(1, int(ttl)))
+        except Exception as e:
+            self._record_error("set", e)
+
+    async def delete(self, key: str):
+        try:
+            await self._client.delete(self.prefix + key)
+        except Exception as e:
+            self._record_error("delete", e)
+
+    async def clear(self):
+        try:
+            keys = [key async for key in self._client.scan_iter(match=f"{self.prefix}*")]
+            if keys:
+                await self._client.delete(*keys)
+        except Exception as e:
+            self._record_error("clear", e)
+
+    async def close(self):
+        try:
+            await self._client.aclose()
+        except AttributeError:
+            await self._client.close()
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "errors": self.errors,
+            "available": self._available(),
+        }
+
+
+class TieredCache:
+    """Local LRU+TTL tier in front of an optional shared Redis tier."""
+
+    def __init__(self, local: LRUTTLCache, shared: Optional[RedisCache] = None):
+        self.local = local
+        self.shared = shared
+        self.hits = 0
+        self.misses = 0
+
+    async def get(self, key: str) -> Optional[Any]:
+        value = self.local.get(key)
+        if value is None and self.shared is not None:
+            value = await self.shared.get(key)
+            if value is not None:
+                self.local.set(key, value)
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return value
+
+    async def set(self, key: str, value: Any, ttl_seconds: Optional[float] = None):
+        self.local.set(key, value, ttl_seconds)
+        if self.shared is not None:
+            await self.shared.set(key, value, ttl_seconds)
+
+    async def delete(self, key: str):
+        self.local.delete(key)
+        if self.shared is not None:
+            await self.shared.delete(key)
+
+    async def clear(self):
+        self.local.clear()
+        if self.shared is not None:
+            await self.shared.clear()
+
+    async def close(self):
+        if self.shared is not None:
+            await self.shared.close()
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "local": self.local.stats(),
+            "shared": self.shared.stats() if self.shared is not None else None,
+        }
+
+
+class StaleWhileRevalidateCache:
+    """Cache for slow upstream values that must never block a request once warm.
+
+    A value younger than `ttl_seconds` is fresh. Up to `max_stale_seconds` past the TTL it
+    is still served immediately while a single background refresh runs. Only a cold or
+    too-stale key waits for the loader. A loader returning None or raising is a failed
+    refresh: nothing is stored and the previous value, if any, is kept.
+    """
+
+    def __init__(self, name: str, ttl_seconds: float, max_stale_seconds: float, clock: Callable[[], float] = time.monotonic):
+        self.name = name
+        self.ttl_seconds = ttl_seconds
+        self.max_stale_seconds = max_stale_seconds
+        self._clock = clock
+        self._entries: Dict[str, tuple[float, Any]] = {}
+        self._refreshes: Dict[str, asyncio.Task] = {}
+        self.fresh_hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.refresh_count = 0
+        self.refresh_failures = 0
+        self.refresh_time_total = 0.0
+        self.refresh_time_max = 0.0
+        self.last_refresh_seconds = 0.0
+        self.last_staleness_seconds = 0.0
+        self.max_staleness_seconds = 0.0
+
+    async def _refresh(self, key: str, loader: Callable[[], Awaitable[Any]]) -> Optional[Any]:
+        start = time.perf_counter()
+        try:
+            value = await loader()
+        except Exception as e:
+            logger.warning(f"Refresh of '{self.name}:{key}' failed: {e!r}")
+            value = None
+        elapsed = time.perf_counter() - start
+        self.refresh_count += 1
+        self.refresh_time_total += elapsed
+        self.refresh_time_max = max(self.refresh_time_max, elapsed)
+        self.last_refresh_seconds = elapsed
+        if value is None:
+            self.refresh_failures += 1
+        else:
+            self._entries[key] = (self._clock(), value)
+        return value
+
+    def _start_refresh(self, key: str, loader: Callable[[], Awaitable[Any]]) -> asyncio.Task:
+        task = self._refreshes.get(key)
+        if task is None or task.done():
+            task = asyncio.create_task(self._refresh(key, loader))
+            self._refreshes[key] = task
+        return task
+
+    async def get(self, key: str, loader: Callable[[], Awaitable[Any]]) -> Optional[Any]:
+        entry = self._entries.get(key)
+        if entry is not None:
+            fetched_at, value = entry
+            age = self._clock() - fetched_at
+            if age < self.ttl_seconds:
+                self.fresh_hits += 1
+                return value
+            staleness = age - self.ttl_seconds
+            if staleness < self.max_stale_seconds:
+                self.stale_hits += 1
+                self.last_staleness_seconds = staleness
+                self.max_staleness_seconds = max(self.max_staleness_seconds, staleness)
+                self._start_refresh(key, loader)
+                return value
+        self.misses += 1
+        # shield: a caller timing out must not cancel the refresh other callers rely on
+        return await asyncio.shield(self._start_refresh(key, loader))
+
+    def warm(self, key: str, loader: Callable[[], Awaitable[Any]]):
+        """Start loading `key` in the background without waiting for it."""
+        self._start_refresh(key, loader)
+
+    async def close(self):
+        for task in self._refreshes.values():
+            task.cancel()
+        self._refreshes.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        now = self._clock()
+        return {
+            "entries": len(self._entries),
+            "fresh_hits": self.fresh_hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+            "refreshes": self.refresh_count,
+            "refresh_failures": self.refresh_failures,
+            "refresh_latency_avg_ms": round(self.refresh_time_total / self.refresh_count * 1000, 2) if self.refresh_count else 0.0,
+            "refresh_latency_max_ms": round(self.refresh_time_max * 1000, 2),
+            "refresh_latency_last_ms": round(self.last_refresh_seconds * 1000, 2),
+            "staleness_last_s": round(self.last_staleness_seconds, 1),
+            "staleness_max_s": round(self.max_staleness_seconds, 1),
+            "age_s": {key: round(now - fetched_at, 1) for key, (fetched_at, _) in self._entries.items()},
+        }
+
+
+def build_cache(namespace: str, max_entries: int, ttl_seconds: float, redis_client: Any = None) -> TieredCache:
+    """Build a tiered cache; the Redis tier is enabled by CACHE_BACKEND="redis" or an explicit client
+    (e.g. a fakeredis.aioredis.FakeRedis instance in tests)."""
+    shared = None
+    if redis_client is not None or settings.CACHE_BACKEND == "redis":
+        shared = RedisCache(namespace=namespace, ttl_seconds=ttl_seconds, client=redis_client)
+    return TieredCache(LRUTTLCache(max_entries=max_entries, ttl_seconds=ttl_seconds), shared)
@@ -1,5 +1,5 @@
 from pydantic_settings import BaseSettings, SettingsConfigDict
-from typing import Optional
+from typing import Dict, Optional
 import secrets
 
 
@@ -8,11 +8,131 @@ class Settings(BaseSettings):
 
     # Make keys optional with safe defaults to avoid import-time crashes in dev
     OPENAI_API_KEY: Optional[str] = None
+    # "openai" or "stub" (offline generator with LLM-like timing, for demos and benchmarks)
+    LLM_BACKEND: str = "openai"
+    LLM_MODEL: str = "gpt-4"
+    LLM_STUB_FIRST_TOKEN_MS: float = 300.0
+    LLM_STUB_TOKEN_MS: float = 20.0
+    # OpenAI-compatible endpoint (None = api.openai.com); point at a local mock server for tests
+    LLM_BASE_URL: Optional[str] = None
+    # Per-attempt timeout, overall deadline shared by the retries, max gap between streamed chunks
+    LLM_TIMEOUT_SECONDS: float = 20.0
+    LLM_DEADLINE_SECONDS: float = 30.0
+    LLM_STREAM_IDLE_TIMEOUT_SECONDS: float = 10.0
+    LLM_MAX_CONCURRENCY: int = 16
+    LLM_MAX_CONNECTIONS: int = 32
+    # Jittered retries on 429/5xx/timeouts; the breaker then fails fast to the CDG answer
+    LLM_MAX_RETRIES: int = 2
+    LLM_RETRY_BASE_DELAY: float = 0.25
+    LLM_RETRY_MAX_DELAY: float = 4.0
+    LLM_BREAKER_FAILURE_THRESHOLD: int = 5
+    LLM_BREAKER_RESET_SECONDS: float = 30.0
     DATABASE_URL: Optional[str] = None
+    # Async engine pool (ignored for SQLite); recycle before the server/proxy idle timeout
+    DB_POOL_SIZE: int = 10
+    DB_MAX_OVERFLOW: int = 20
+    DB_POOL_TIMEOUT: float = 10.0
+    DB_POOL_RECYCLE: int = 1800
+    DB_POOL_PRE_PING: bool = True
     SECRET_KEY: str = secrets.token_urlsafe(32)
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
+    # Authenticated users cached by token (bounded by the token expiry as well)
+    PRINCIPAL_CACHE_TTL_SECONDS: float = 60.0
+    PRINCIPAL_CACHE_MAX_ENTRIES: int = 10000
+    # bcrypt cost: hashes with another cost are transparently rehashed at the next login
+    BCRYPT_ROUNDS: int = 12
+    # Password hashing runs on its own threads; logins beyond the queue limit get a 503
+    PASSWORD_HASH_WORKERS: int = 2
+    PASSWORD_HASH_MAX_QUEUE: int = 64
     REDIS_URL: str = "redis://localhost:6379/0"
+    REDIS_SOCKET_TIMEOUT: float = 0.25
+
+    # Response caching: "memory" keeps entries per process, "redis" adds a shared tier on REDIS_URL
+    CACHE_BACKEND: str = "memory"
+    # Revision of the imported documents, part of every cache key; a file so all workers share it
+    KB_REVISION_FILE: str = "./kb_revision"
+    # Answers are session-independent: one entry per normalized question, shared by all users
+    SHARED_QUERY_CACHE_MAX_ENTRIES: int = 1024
+    SHARED_QUERY_CACHE_TTL_SECONDS: int = 900
+    # Semantic cache: paraphrases of an answered question get the stored answer when the cosine
+    # similarity of the nearest answered question reaches the threshold of its category
+    SEMANTIC_CACHE_ENABLED: bool = True
+    SEMANTIC_CACHE_THRESHOLD: float = 0.9
+    SEMANTIC_CACHE_CATEGORY_THRESHOLDS: Dict[str, float] = {}
+    SEMANTIC_CACHE_APPROVED_ONLY: bool = False
+    # Share of the question's terms the CDG base must match for an LLM answer to be reused
+    SEMANTIC_CACHE_MIN_COVERAGE: float = 0.6
+
+    # Chat interactions are buffered and bulk-inserted by size or interval (write-behind)
+    CHAT_LOG_BATCH_SIZE: int = 100
+    CHAT_LOG_FLUSH_INTERVAL_SECONDS: float = 2.0
+    CHAT_LOG_MAX_BUFFER: int = 10000
+    CHAT_LOG_STORE_EMBEDDINGS: bool = True
+    # After a failed flush, retries back off from CHAT_LOG_FLUSH_INTERVAL_SECONDS up to this delay
+    CHAT_LOG_RETRY_MAX_DELAY_SECONDS: float = 60.0
+    CHAT_HISTORY_PAGE_SIZE: int = 20
+
+    # External context providers; "demo_key" keeps the simulated data
+    WEATHER_API_KEY: str = "demo_key"  # OpenWeatherMap free tier
+    WEATHER_API_URL: str = "http://api.openweathermap.org/data/2.5/weather"
+    CURRENCY_API_KEY: str = "demo_key"  # Fixer.io free tier
+    CURRENCY_API_URL: str = "http://data.fixer.io/api/latest"
+    EXTERNAL_API_PROVIDER_TIMEOUT: float = 1.5
+    EXTERNAL_API_DEADLINE: float = 2.0
+    EXTERNAL_API_POOL_SIZE: int = 20
+    # Context data is served from cache and refreshed in the background once older than its TTL
+    WEATHER_CACHE_TTL_SECONDS: int = 1800
+    CURRENCY_CACHE_TTL_SECONDS: int = 3600
+    HOLIDAYS_CACHE_TTL_SECONDS: int = 86400
+    EXTERNAL_CACHE_MAX_STALE_SECONDS: int = 86400
+
+    # Prometheus text metrics on /metrics (per worker process); Server-Timing on /chat responses
+    METRICS_ENABLED: bool = True
+
+    # Load the embedding model, vector store and CDG index in the background at startup
+    WARMUP_ON_STARTUP: bool = True
+
+    # Sentence-transformer model shared by the embedding service and the vector store
+    EMBEDDING_MODEL_NAME: str = "paraphrase-MiniLM-L6-v2"
+
+    # Vector store for imported documents and the semantic cache: "chroma" (persistent client in
+    # ./chroma_db) or "numpy" (exact in-process search, suited to a few thousand chunks)
+    VECTOR_STORE_BACKEND: str = "chroma"
+    VECTOR_STORE_DIR: str = "./vector_store"
+
+    # Document ingestion: chunk size/overlap in characters (MiniLM truncates at 128 tokens)
+    INGESTION_CHUNK_SIZE: int = 600
+    INGESTION_CHUNK_OVERLAP: int = 100
+    INGESTION_BATCH_SIZE: int = 64
+    # PDF/DOCX parsing runs in a process pool (0 = min(4, CPU count)); PDFs are split in page ranges
+    EXTRACTION_PROCESSES: int = 0
+    EXTRACTION_PAGES_PER_TASK: int = 16
+    UPLOAD_MAX_CONCURRENCY: int = 2
+    # Background ingestion jobs: worker tasks per process and pending uploads accepted before 503
+    INGESTION_WORKERS: int = 2
+    INGESTION_QUEUE_SIZE: int = 100
+
+    # Embedding micro-batching: a batch is encoded when full or after the wait window
+    EMBEDDING_MAX_BATCH_SIZE: int = 32
+    EMBEDDING_MAX_WAIT_MS: float = 5.0
+
+    # Retrieval-augmented answers: top-k passages per source (CDG index, imported documents),
+    # packed by relevance per token into the prompt budget; a strong FAQ match skips the LLM
+    RAG_CONTEXT_TOKEN_BUDGET: int = 1500
+    RAG_TOP_K: int = 5
+    RAG_MIN_RELEVANCE: float = 0.2
+    RAG_VECTOR_SEARCH_ENABLED: bool = True
+    RAG_FAQ_DIRECT_THRESHOLD: float = 0.8
+    # A FAQ is served without the LLM only when it matches enough of the question's terms
+    RAG_FAQ_DIRECT_MIN_TERMS: int = 2
+    RAG_FAQ_DIRECT_MIN_COVERAGE: float = 0.6
+
+    # CDG knowledge-base embeddings, encoded once by `python -m app.data.kb_snapshot` and
+    # memory-mapped read-only by every worker; searched by the RAG pipeline with the documents
+    KB_SNAPSHOT_ENABLED: bool = True
+    KB_SNAPSHOT_DIR: str = "./kb_snapshot"
+    KB_SNAPSHOT_DTYPE: str = "float16"
 
 
 settings = Settings()
@@ -0,0 +1,237 @@
+"""
+Lightweight in-process metrics: counters, histograms and timing spans.
+
+Spans use the monotonic clock and cost a couple of microseconds: two perf_counter
+calls, a bucket bisect and a context-variable lookup. Durations go to the
+`rh_stage_duration_seconds` histogram and, while a request is being traced by
+ServerTimingMiddleware, to its `Server-Timing` response header.
+
+`render()` produces the Prometheus text exposition format served on /metrics.
+Values are per worker process, like the /admin/performance counters.
+"""
+
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+# Latency buckets in seconds, from sub-millisecond cache hits to multi-second LLM calls
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# Stage durations (seconds) of the request being traced; None outside traced requests
+_server_timing: ContextVar[Optional[Dict[str, float]]] = ContextVar("server_timing", default=None)
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Counter:
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, *labels: str, amount: float = 1.0):
+        self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def value(self, *labels: str) -> float:
+        return self._values.get(labels, 0.0)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        for labels, value in sorted(self._values.items()):
+            lines.append(f"{self.name}{_format_labels(self.labelnames, labels)} {value}")
+        return lines
+
+
+class Histogram:
+    """Fixed-bucket histogram; buckets are stored per bucket and made cumulative on render"""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # labels -> [bucket counts..., +Inf count, sum]
+        self._series: Dict[Tuple[str, ...], List[float]] = {}
+
+    def observe(self, value: float, *labels: str):
+        series = self._series.get(labels)
+        if series is None:
+            series = self._series[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+        series[bisect_left(self.buckets, value)] += 1
+        series[-1] += value
+
+    def snapshot(self, *labels: str) -> Dict[str, float]:
+        series = self._series.get(labels)
+        if series is None:
+            return {"count": 0, "sum": 0.0}
+        return {"count": sum(series[:-1]), "sum": series[-1]}
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        for labels, series in sorted(self._series.items()):
+            cumulative = 0
+            for bound, count in zip((*self.buckets, "+Inf"), series):
+                cumulative += count
+                le = f'le="{bound}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, labels, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, labels)} {series[-1]}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, labels)} {cumulative}")
+        return lines
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics: Dict[str, object] = {}
+        self._collectors: Dict[str, Callable[[], dict]] = {}
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._metrics.setdefault(name, Counter(name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self._metrics.setdefault(name, Histogram(name, documentation, labelnames, buckets))
+
+    def register_collector(self, component: str, stats: Callable[[], dict]):
+        """Export a component's stats() dict as `rh_component_stat` gauges (numeric leaves only)"""
+        self._collectors[component] = stats
+
+    def _collector_lines(self) -> List[str]:
+        lines = ["# HELP rh_component_stat Runtime counters reported by the component stats()", "# TYPE rh_component_stat gauge"]
+        for component, stats in sorted(self._collectors.items()):
+            try:
+                values = stats()
+            except Exception:
+                continue
+            for stat, value in _flatten(values):
+                lines.append(f'rh_component_stat{{component="{_escape(component)}",stat="{_escape(stat)}"}} {float(value)}')
+        return lines
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        if self._collectors:
+            lines.extend(self._collector_lines())
+        return "\n".join(lines) + "\n"
+
+
+def _flatten(values: dict, prefix: str = "") -> Iterable[Tuple[str, float]]:
+    for key, value in values.items():
+        name = f"{prefix}{key}"
+        if isinstance(value, bool):
+            yield name, int(value)
+        elif isinstance(value, (int, float)):
+            yield name, value
+        elif isinstance(value, dict):
+            yield from _flatten(value, f"{name}.")
+
+
+metrics = MetricsRegistry()
+
+stage_duration = metrics.histogram(
+    "rh_stage_duration_seconds", "Duration of instrumented processing stages", ("stage",)
+)
+db_query_duration = metrics.histogram(
+    "rh_db_query_duration_seconds", "Duration of SQL statements", ("statement",)
+)
+http_request_duration = metrics.histogram(
+    "rh_http_request_duration_seconds", "Time to the response headers, by route", ("method", "route", "status")
+)
+
+
+def record_stage(name: str, seconds: float):
+    stage_duration.observe(seconds, name)
+    timings = _server_timing.get()
+    if timings is not None:
+        timings[name] = timings.get(name, 0.0) + seconds
+
+
+class span:
+    """`with span("cdg_search"):` times a block into the stage histogram and Server-Timing"""
+
+    __slots__ = ("name", "start")
+
+    def __init__(self, name: str):
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        record_stage(self.name, time.perf_counter() - self.start)
+        return False
+
+
+def server_timing_header(timings: Dict[str, float], total: float) -> str:
+    parts = [f"{name};dur={seconds * 1000:.2f}" for name, seconds in timings.items()]
+    parts.append(f"total;dur={total * 1000:.2f}")
+    return ", ".join(parts)
+
+
+class ServerTimingMiddleware:
+    """ASGI middleware: per-route request latency, and a Server-Timing header for paths
+    under `prefixes`. Streamed responses only report the stages finished before the
+    headers were sent."""
+
+    def __init__(self, app, prefixes: Sequence[str] = ("/chat",)):
+        self.app = app
+        self.prefixes = tuple(prefixes)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        traced = scope["path"].startswith(self.prefixes)
+        timings: Dict[str, float] = {}
+        token = _server_timing.set(timings) if traced else None
+
+        async def send_with_timing(message):
+            if message["type"] == "http.response.start":
+                elapsed = time.perf_counter() - start
+                route = scope.get("route")
+                http_request_duration.observe(
+                    elapsed, scope["method"], getattr(route, "path", "unmatched"), str(message["status"])
+                )
+                if traced:
+                    headers = list(message.get("headers", []))
+                    headers.append((b"server-timing", server_timing_header(timings, elapsed).encode("latin-1")))
+                    message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            if token is not None:
+                _server_timing.reset(token)
+
+
+def instrument_engine(engine):
+    """Time every SQL statement of an (async) SQLAlchemy engine via cursor events"""
+    from sqlalchemy import event
+
+    sync_engine = getattr(engine, "sync_engine", engine)
+
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        conn.info["query_start"] = time.perf_counter()
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        start = conn.info.pop("query_start", None)
+        if start is not None:
+            elapsed = time.perf_counter() - start
+            db_query_duration.observe(elapsed, statement.split(None, 1)[0].upper() if statement else "")
+            record_stage("db", elapsed)
@@ -0,0 +1,80 @@
+import hashlib
+import threading
+import time
+from types import SimpleNamespace
+from typing import Any, Dict, Optional
+
+from app.core.cache import LRUTTLCache
+from app.core.config import settings
+
+PRINCIPAL_FIELDS = ("id", "email", "full_name", "is_active", "role")
+
+
+def _token_key(token: str) -> str:
+    # Never keep raw bearer tokens as dictionary keys
+    return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+
+class PrincipalCache:
+    """Authenticated users by bearer token, so repeat requests skip JWT verification and the users query.
+
+    Entries live at most `ttl_seconds` and never past the token's own `exp`. Values are
+    detached snapshots of the user row, not ORM objects bound to a closed session.
+    `invalidate_user` bumps a per-email generation: every cached token of that user
+    becomes a miss at once, without tracking which tokens belong to whom. Invalidation
+    is per process; other workers pick up the change within `ttl_seconds`.
+    """
+
+    def __init__(self, max_entries: int = settings.PRINCIPAL_CACHE_MAX_ENTRIES, ttl_seconds: float = settings.PRINCIPAL_CACHE_TTL_SECONDS):
+        self._cache = LRUTTLCache(max_entries=max_entries, ttl_seconds=ttl_seconds)
+        self._generations: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self.invalidations = 0
+        self.stale_generation_misses = 0
+
+    def get(self, token: str) -> Optional[SimpleNamespace]:
+        key = _token_key(token)
+        entry = self._cache.get(key)
+        if entry is None:
+            return None
+        generation, principal = entry
+        if generation != self._generations.get(principal.email, 0):
+            self._cache.delete(key)
+            self.stale_generation_misses += 1
+            return None
+        return principal
+
+    def set(self, token: str, user: Any, expires_at: Optional[float] = None) -> SimpleNamespace:
+        principal = SimpleNamespace(**{name: getattr(user, name, None) for name in PRINCIPAL_FIELDS})
+        ttl = self._cache.ttl_seconds
+        if expires_at is not None:
+            ttl = min(ttl, expires_at - time.time())
+        if ttl > 0:
+            self._cache.set(_token_key(token), (self._generations.get(principal.email, 0), principal), ttl)
+        return principal
+
+    def invalidate_user(self, email: str):
+        with self._lock:
+            self._generations[email] = self._generations.get(email, 0) + 1
+        self.invalidations += 1
+
+    def clear(self):
+        self._cache.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        stats = self._cache.stats()
+        # An entry of an invalidated user is a miss, not a hit
+        hits = stats["hits"] - self.stale_generation_misses
+        misses = stats["misses"] + self.stale_generation_misses
+        return {
+            **stats,
+            "hits": hits,
+            "misses": misses,
+            "hit_rate": round(hits / (hits + misses), 4) if hits + misses else 0.0,
+            "ttl_seconds": self._cache.ttl_seconds,
+            "invalidations": self.invalidations,
+            "stale_generation_misses": self.stale_generation_misses,
+        }
+
+
+principal_cache = PrincipalCache()
@@ -0,0 +1,91 @@
+import random
+import time
+from typing import Any, Callable, Dict, Optional
+
+
+class CircuitOpenError(RuntimeError):
+    """The upstream is considered down; the call was not attempted."""
+
+
+class CircuitBreaker:
+    """Closed -> open after `failure_threshold` consecutive failures; open -> half-open after
+    `reset_timeout` seconds, where a single probe call decides between closed and open again.
+    A probe that reports nothing within `probe_timeout` seconds (default: `reset_timeout`)
+    is considered lost and the next call probes instead.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        failure_threshold: int = 5,
+        reset_timeout: float = 30.0,
+        probe_timeout: Optional[float] = None,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.probe_timeout = reset_timeout if probe_timeout is None else probe_timeout
+        self._clock = clock
+        self.state = "closed"
+        self.consecutive_failures = 0
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        self._probe_started_at = 0.0
+        self.opened_count = 0
+        self.rejected = 0
+
+    def allow(self) -> bool:
+        if self.state == "open" and self._clock() - self._opened_at >= self.reset_timeout:
+            self.state = "half_open"
+            self._probe_in_flight = False
+        if self.state == "closed":
+            return True
+        if self.state == "half_open" and (
+            not self._probe_in_flight or self._clock() - self._probe_started_at >= self.probe_timeout
+        ):
+            self._probe_in_flight = True
+            self._probe_started_at = self._clock()
+            return True
+        self.rejected += 1
+        return False
+
+    def release_probe(self):
+        """The call ended without a verdict (e.g. cancelled): let the next call probe."""
+        if self.state == "half_open":
+            self._probe_in_flight = False
+
+    def check(self):
+        if not self.allow():
+            raise CircuitOpenError(f"Circuit '{self.name}' is open")
+
+    def record_success(self):
+        self.state = "closed"
+        self.consecutive_failures = 0
+        self._probe_in_flight = False
+
+    def record_failure(self):
+        self.consecutive_failures += 1
+        self._probe_in_flight = False
+        if self.state == "half_open" or self.consecutive_failures >= self.failure_threshold:
+            if self.state != "open":
+                self.opened_count += 1
+            self.state = "open"
+            self._opened_at = self._clock()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "state": self.state,
+            "consecutive_failures": self.consecutive_failures,
+            "opened": self.opened_count,
+            "rejected": self.rejected,
+        }
+
+
+def backoff_delay(attempt: int, base_delay: float, max_delay: float, retry_after: Optional[float] = None) -> float:
+    """Full-jitter exponential backoff: uniform in [0, min(max_delay, base * 2**attempt)].
+    A server-provided Retry-After is honoured as a lower bound (still capped by max_delay)."""
+    delay = random.uniform(0, min(max_delay, base_delay * (2 ** attempt)))
+    if retry_after is not None:
+        delay = max(delay, min(retry_after, max_delay))
+    return delay
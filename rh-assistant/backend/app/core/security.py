@@ -1,12 +1,22 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta, timezone
-from typing import Any
+from typing import Any, Callable, Dict, Optional, Tuple
 
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 
 from app.core.config import settings
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# min = max = default: any stored hash with a different cost is flagged for update on verify
+pwd_context = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__default_rounds=settings.BCRYPT_ROUNDS,
+    bcrypt__min_rounds=settings.BCRYPT_ROUNDS,
+    bcrypt__max_rounds=settings.BCRYPT_ROUNDS,
+)
 
 
 def create_access_token(data: dict, expires_delta: timedelta | None = None):
@@ -34,3 +44,93 @@ def get_password_hash(password: str) -> str:
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     return pwd_context.verify(plain_password, hashed_password)
+
+
+class PasswordHasherBusyError(RuntimeError):
+    """Too many password operations are already waiting."""
+
+
+class PasswordHasher:
+    """Runs bcrypt on a small dedicated thread pool so logins never block the event loop.
+
+    bcrypt releases the GIL, so `max_workers` hashes really run in parallel. At most
+    `max_queue` operations may be in flight (running or waiting); beyond that callers get
+    PasswordHasherBusyError instead of piling up behind a login burst.
+    """
+
+    def __init__(
+        self,
+        context: CryptContext = pwd_context,
+        max_workers: int = settings.PASSWORD_HASH_WORKERS,
+        max_queue: int = settings.PASSWORD_HASH_MAX_QUEUE,
+    ):
+        self.context = context
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.calls = 0
+        self.rejected = 0
+        self.wait_time_total = 0.0
+        self.wait_time_max = 0.0
+        self.run_time_total = 0.0
+        self.run_time_max = 0.0
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="password-hash")
+        return self._executor
+
+    async def _run(self, fn: Callable[..., Any], *args) -> Any:
+        if self.in_flight >= self.max_queue:
+            self.rejected += 1
+            raise PasswordHasherBusyError(f"{self.in_flight} password operations already in flight")
+        submitted = time.perf_counter()
+
+        def timed():
+            started = time.perf_counter()
+            return started, fn(*args), time.perf_counter()
+
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            started, value, finished = await asyncio.get_running_loop().run_in_executor(self._get_executor(), timed)
+        finally:
+            self.in_flight -= 1
+        self.calls += 1
+        self.wait_time_total += started - submitted
+        self.wait_time_max = max(self.wait_time_max, started - submitted)
+        self.run_time_total += finished - started
+        self.run_time_max = max(self.run_time_max, finished - started)
+        return value
+
+    async def hash(self, password: str) -> str:
+        return await self._run(self.context.hash, password)
+
+    async def verify_and_update(self, password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+        """(valid, new_hash): new_hash is set when the stored hash should be replaced (cost changed)."""
+        return await self._run(self.context.verify_and_update, password, hashed_password)
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "workers": self.max_workers,
+            "rounds": settings.BCRYPT_ROUNDS,
+            "in_flight": self.in_flight,
+            "max_in_flight": self.max_in_flight,
+            "max_queue": self.max_queue,
+            "calls": self.calls,
+            "rejected": self.rejected,
+            "queue_wait_avg_ms": round(self.wait_time_total / self.calls * 1000, 2) if self.calls else 0.0,
+            "queue_wait_max_ms": round(self.wait_time_max * 1000, 2),
+            "hash_time_avg_ms": round(self.run_time_total / self.calls * 1000, 2) if self.calls else 0.0,
+            "hash_time_max_ms": round(self.run_time_max * 1000, 2),
+        }
+
+
+password_hasher = PasswordHasher()
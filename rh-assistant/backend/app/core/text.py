@@ -0,0 +1,63 @@
+import hashlib
+import re
+import unicodedata
+from typing import List
+
+# Mots vides français les plus fréquents dans les questions RH ; ils n'apportent
+# rien au classement et gonflent inutilement les listes de postings.
+FRENCH_STOPWORDS = frozenset(
+    {
+        "a", "au", "aux", "avec", "ce", "ces", "comment", "dans", "de", "des", "du",
+        "elle", "en", "est", "et", "etre", "il", "ils", "je", "la", "le", "les",
+        "leur", "lui", "ma", "mais", "me", "mes", "mon", "ne", "nos", "notre",
+        "nous", "on", "ou", "par", "pas", "pour", "qu", "que", "quel", "quelle",
+        "quelles", "quels", "qui", "sa", "se", "ses", "son", "sont", "sur", "ta",
+        "te", "tes", "ton", "tu", "un", "une", "vos", "votre", "vous", "y",
+    }
+)
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+_NON_WORD_RE = re.compile(r"[^a-z0-9]+")
+
+
+# Combining marks of the "Combining Diacritical Marks" block, the only ones French text produces
+_COMBINING_MARKS_RE = re.compile(
+    "[" + "".join(chr(code) for code in range(0x300, 0x370) if unicodedata.combining(chr(code))) + "]"
+)
+
+
+def fold_text(text: str) -> str:
+    """Lowercase and strip accents ("Congé Payé" -> "conge paye")."""
+    decomposed = unicodedata.normalize("NFKD", text.lower())
+    # Fast path: one regex pass instead of a per-character combining() check; text
+    # that still holds non-ASCII characters may carry other marks and takes the full scan.
+    folded = _COMBINING_MARKS_RE.sub("", decomposed)
+    if folded.isascii():
+        return folded
+    return "".join(char for char in decomposed if not unicodedata.combining(char))
+
+
+def _light_stem(token: str) -> str:
+    # Plural folding only: "conges" -> "conge", "jours" -> "jour", "travaux" -> "travau".
+    if len(token) > 3 and token[-1] in "sx":
+        return token[:-1]
+    return token
+
+
+def tokenize(text: str) -> List[str]:
+    """Split text into accent-folded, lightly stemmed search terms without stopwords."""
+    return [
+        _light_stem(token)
+        for token in _TOKEN_RE.findall(fold_text(text))
+        if len(token) > 1 and token not in FRENCH_STOPWORDS
+    ]
+
+
+def normalize_query(text: str) -> str:
+    """Canonical form of a question: folded case/accents, punctuation and extra spaces removed."""
+    return _NON_WORD_RE.sub(" ", fold_text(text)).strip()
+
+
+def query_fingerprint(text: str) -> str:
+    """Stable key for questions that differ only by case, accents, punctuation or whitespace."""
+    return hashlib.sha1(normalize_query(text).encode("utf-8")).hexdigest()
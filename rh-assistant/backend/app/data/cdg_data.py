@@ -3,6 +3,17 @@ Données de démonstration de la Caisse de Dépôt et de Gestion (CDG) Maroc
 Ces données servent de base de connaissances pour l'assistant RH
 """
 
+import hashlib
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Optional, Tuple
+
+from app.core.config import settings
+from app.data.cdg_index import BM25Index, build_cdg_index
+
 CDG_FAQ = [
     {
         "question": "Quelles sont les conditions d'adhésion à la CDG ?",
@@ -237,6 +248,13 @@ CDG_HOLIDAYS = [
     {"date": "2024-11-18", "name": "Fête de l'Indépendance", "type": "national"}
 ]
 
+_cdg_index: Optional[BM25Index] = None
+_cdg_index_lock = threading.Lock()
+_kb_fingerprint: Optional[str] = None
+# Révision des documents importés, lue dans KB_REVISION_FILE (partagé par tous les workers)
+_kb_revision = ""
+_kb_revision_signature: Optional[Tuple[int, int]] = None
+
 def get_cdg_knowledge_base():
     """Retourne la base de connaissances CDG complète"""
     return {
@@ -246,52 +264,61 @@ def get_cdg_knowledge_base():
         "holidays": CDG_HOLIDAYS
     }
 
-def search_cdg_content(query, category=None):
-    """Recherche dans le contenu CDG"""
-    results = []
-    query_lower = query.lower()
-    
-    # Recherche dans FAQ
-    for item in CDG_FAQ:
-        if category and item.get("category") != category:
-            continue
-        if (query_lower in item["question"].lower() or 
-            query_lower in item["answer"].lower()):
-            results.append({
-                "type": "faq",
-                "content": item,
-                "relevance": 0.9
-            })
-    
-    # Recherche dans politiques
-    for item in CDG_POLICIES:
-        if category and item.get("category") != category:
-            continue
-        if query_lower in item["title"].lower() or query_lower in item["content"].lower():
-            results.append({
-                "type": "policy",
-                "content": item,
-                "relevance": 0.8
-            })
-    
-    # Recherche dans procédures
-    for item in CDG_PROCEDURES:
-        if category and item.get("category") != category:
-            continue
-        if query_lower in item["title"].lower() or any(query_lower in step.lower() for step in item["procedure"]):
-            results.append({
-                "type": "procedure",
-                "content": item,
-                "relevance": 0.7
-            })
-    
-    # Recherche dans jours fériés
-    for item in CDG_HOLIDAYS:
-        if query_lower in item["name"].lower() or "férié" in query_lower or "congé" in query_lower:
-            results.append({
-                "type": "holiday",
-                "content": item,
-                "relevance": 0.8
-            })
-    
-    return results
+def get_cdg_index() -> BM25Index:
+    """Retourne l'index BM25 de la base CDG, construit une seule fois au premier appel"""
+    global _cdg_index
+    if _cdg_index is None:
+        with _cdg_index_lock:
+            if _cdg_index is None:
+                _cdg_index = build_cdg_index(get_cdg_knowledge_base())
+    return _cdg_index
+
+def search_cdg_content(query, category=None, limit=None):
+    """Recherche dans le contenu CDG (BM25 sur index inversé, résultats triés par pertinence)"""
+    return get_cdg_index().search(query, category=category, limit=limit)
+
+def knowledge_base_fingerprint() -> str:
+    """Empreinte du contenu CDG (change à chaque modification des données sources)"""
+    global _kb_fingerprint
+    if _kb_fingerprint is None:
+        payload = json.dumps(get_cdg_knowledge_base(), sort_keys=True, ensure_ascii=False)
+        _kb_fingerprint = hashlib.sha1(payload.encode("utf-8")).hexdigest()[:12]
+    return _kb_fingerprint
+
+def _documents_revision() -> str:
+    """Révision écrite par le dernier worker ayant modifié la base ; relue quand le fichier change"""
+    global _kb_revision, _kb_revision_signature
+    try:
+        stat = os.stat(settings.KB_REVISION_FILE)
+    except FileNotFoundError:
+        return "0"
+    signature = (stat.st_mtime_ns, stat.st_size)
+    if signature != _kb_revision_signature:
+        _kb_revision = Path(settings.KB_REVISION_FILE).read_text(encoding="utf-8").strip() or "0"
+        _kb_revision_signature = signature
+    return _kb_revision
+
+def knowledge_base_version() -> str:
+    """Version courante de la base de connaissances, utilisée dans les clés de cache.
+
+    Empreinte du contenu CDG + révision des documents importés : les deux sont les mêmes
+    dans tous les workers, une modification faite par l'un invalide les caches de tous.
+    """
+    return f"{knowledge_base_fingerprint()}-{_documents_revision()}"
+
+def notify_knowledge_base_changed(change: str = ""):
+    """À appeler après toute modification de la base (données CDG, documents importés).
+
+    `change` décrit la modification (ex. "document_id:file_hash") ; la nouvelle révision
+    en dérive et est écrite dans KB_REVISION_FILE pour les autres workers.
+    """
+    global _cdg_index, _kb_fingerprint
+    with _cdg_index_lock:
+        _cdg_index = None
+        _kb_fingerprint = None
+        seed = f"{_documents_revision()}:{change or time.time_ns()}"
+        path = Path(settings.KB_REVISION_FILE)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(path.name + f".{os.getpid()}.tmp")
+        tmp_path.write_text(hashlib.sha1(seed.encode("utf-8")).hexdigest()[:12], encoding="utf-8")
+        os.replace(tmp_path, path)
@@ -0,0 +1,120 @@
+"""
+Index inversé BM25 sur la base de connaissances CDG
+Remplace le parcours linéaire de search_cdg_content : le coût d'une recherche
+dépend des termes de la requête (taille des listes de postings), pas du corpus.
+"""
+
+import heapq
+import math
+from collections import Counter, defaultdict
+from typing import Dict, List, Optional, Tuple
+
+from app.core.text import tokenize
+
+
+class BM25Index:
+    def __init__(self, k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self._postings: Dict[str, List[Tuple[int, int]]] = defaultdict(list)
+        self._doc_lengths: List[int] = []
+        self._documents: List[dict] = []
+        self._total_length = 0
+        self._norms: Optional[List[float]] = None
+
+    def __len__(self) -> int:
+        return len(self._documents)
+
+    def add(self, doc_type: str, content: dict, text: str, category: Optional[str] = None):
+        """Indexe une entrée ; `text` est le texte recherchable, `content` l'objet renvoyé tel quel."""
+        terms = Counter(tokenize(text))
+        doc_id = len(self._documents)
+        for term, frequency in terms.items():
+            self._postings[term].append((doc_id, frequency))
+        length = sum(terms.values())
+        self._doc_lengths.append(length)
+        self._total_length += length
+        self._documents.append({"type": doc_type, "content": content, "category": category})
+        self._norms = None
+
+    def _length_norms(self) -> List[float]:
+        # Partie du dénominateur BM25 qui ne dépend que du document, recalculée après ajout
+        if self._norms is None:
+            average_length = self._total_length / len(self._documents) or 1.0
+            self._norms = [self.k1 * (1 - self.b + self.b * length / average_length) for length in self._doc_lengths]
+        return self._norms
+
+    def _idf(self, term: str) -> float:
+        document_frequency = len(self._postings.get(term, ()))
+        return math.log(1 + (len(self._documents) - document_frequency + 0.5) / (document_frequency + 0.5))
+
+    def search(self, query: str, category: Optional[str] = None, limit: Optional[int] = None) -> List[dict]:
+        """Retourne les entrées triées par pertinence décroissante.
+
+        La pertinence est le score BM25 normalisé par le score qu'obtiendrait une
+        entrée de longueur moyenne contenant une fois chaque terme de la requête.
+        Les termes absents de l'index comptent avec l'idf d'un terme inconnu (df=0) :
+        une couverture partielle de la question abaisse la pertinence, et 1.0
+        signifie une couverture complète. `matched_terms` et `coverage` donnent le
+        nombre et la part des termes de la question présents dans l'entrée.
+        """
+        if not self._documents:
+            return []
+
+        terms = set(tokenize(query))
+        query_terms = [term for term in terms if term in self._postings]
+        if not query_terms:
+            return []
+
+        norms = self._length_norms()
+        scores: Dict[int, float] = defaultdict(float)
+        matched: Dict[int, int] = defaultdict(int)
+        reference_score = sum(self._idf(term) for term in terms)
+        for term in query_terms:
+            idf = self._idf(term)
+            weight = idf * (self.k1 + 1)
+            for doc_id, frequency in self._postings[term]:
+                scores[doc_id] += weight * frequency / (frequency + norms[doc_id])
+                matched[doc_id] += 1
+
+        candidates = scores.items()
+        if category:
+            candidates = [(doc_id, score) for doc_id, score in candidates
+                          if self._documents[doc_id]["category"] in (None, category)]
+        if limit is not None:
+            ranked = heapq.nlargest(limit, candidates, key=lambda item: item[1])
+        else:
+            ranked = sorted(candidates, key=lambda item: item[1], reverse=True)
+
+        return [
+            {
+                "type": self._documents[doc_id]["type"],
+                "content": self._documents[doc_id]["content"],
+                "relevance": round(min(1.0, score / reference_score), 4),
+                "matched_terms": matched[doc_id],
+                "coverage": round(matched[doc_id] / len(terms), 4),
+            }
+            for doc_id, score in ranked
+        ]
+
+
+def build_cdg_index(knowledge_base: dict) -> BM25Index:
+    """Construit l'index à partir de la structure renvoyée par get_cdg_knowledge_base()"""
+    index = BM25Index()
+
+    # Les titres et questions sont répétés pour peser davantage que le corps du texte
+    for item in knowledge_base.get("faq", []):
+        index.add("faq", item, f"{item['question']} {item['question']} {item['answer']}", item.get("category"))
+
+    for item in knowledge_base.get("policies", []):
+        index.add("policy", item, f"{item['title']} {item['title']} {item['content']}", item.get("category"))
+
+    for item in knowledge_base.get("procedures", []):
+        steps = " ".join(item["procedure"])
+        index.add("procedure", item, f"{item['title']} {item['title']} {steps}", item.get("category"))
+
+    # Les jours fériés ne sont pas filtrés par catégorie (comportement historique)
+    for item in knowledge_base.get("holidays", []):
+        index.add("holiday", item, f"{item['name']} jour férié {item['type']}")
+
+    return index
@@ -0,0 +1,206 @@
+"""
+Instantané des embeddings de la base de connaissances CDG
+L'étape de construction (`python -m app.data.kb_snapshot`) encode une seule fois les FAQ,
+politiques et procédures, puis écrit dans KB_SNAPSHOT_DIR une matrice .npy (vecteurs
+normalisés, float16 par défaut) et une table JSON (identifiant, type, position, catégorie).
+Le nom des fichiers porte l'empreinte du contenu CDG et le modèle d'embeddings : une
+modification de la base ou un changement de modèle rend l'ancien instantané invisible.
+Les workers ouvrent la matrice en lecture seule avec np.load(mmap_mode="r") : rien n'est
+encodé au démarrage et les pages sont partagées par tous les processus. numpy n'est importé
+qu'à l'ouverture ou à la construction de l'instantané, pas à l'import de l'application.
+"""
+
+import argparse
+import json
+import os
+import re
+import threading
+from pathlib import Path
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple
+
+from loguru import logger
+
+from app.core.config import settings
+from app.data.cdg_data import get_cdg_knowledge_base, knowledge_base_fingerprint
+
+if TYPE_CHECKING:
+    import numpy as np
+
+# Sections encodées et type des résultats correspondants (mêmes types que l'index BM25)
+SNAPSHOT_SECTIONS = (("faq", "faq"), ("policies", "policy"), ("procedures", "procedure"))
+FORMAT_VERSION = 1
+
+
+def entry_text(doc_type: str, item: dict) -> str:
+    if doc_type == "faq":
+        return f"{item['question']} {item['answer']}"
+    if doc_type == "procedure":
+        return f"{item['title']} : " + " ; ".join(item["procedure"])
+    return f"{item['title']} : " + " ".join(item["content"].split())
+
+
+def snapshot_entries(knowledge_base: dict) -> List[dict]:
+    """Table des entrées encodées, dans l'ordre des lignes de la matrice"""
+    entries = []
+    for section, doc_type in SNAPSHOT_SECTIONS:
+        for position, item in enumerate(knowledge_base.get(section, [])):
+            entries.append(
+                {"id": f"{doc_type}-{position}", "type": doc_type, "section": section, "position": position, "category": item.get("category")}
+            )
+    return entries
+
+
+def snapshot_paths(directory: str, fingerprint: str, model_name: str) -> Tuple[Path, Path]:
+    model_slug = re.sub(r"[^A-Za-z0-9_.-]+", "_", model_name)
+    base = Path(directory) / f"cdg_kb-{fingerprint}-{model_slug}"
+    return base.with_suffix(".npy"), base.with_suffix(".json")
+
+
+class KBSnapshot:
+    def __init__(self, vectors: "np.ndarray", entries: List[dict], fingerprint: str, model_name: str, knowledge_base: dict):
+        self.vectors = vectors
+        self.entries = entries
+        self.fingerprint = fingerprint
+        self.model_name = model_name
+        self._knowledge_base = knowledge_base
+        self.searches = 0
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def search(self, embedding, top_k: int = 5) -> List[dict]:
+        """Entrées les plus proches (similarité cosinus), au format des résultats BM25"""
+        import numpy as np
+
+        if not self.entries or top_k <= 0:
+            return []
+        self.searches += 1
+        query = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(query)
+        if norm:
+            query = query / norm
+        scores = self.vectors @ query.astype(self.vectors.dtype)
+        if top_k < len(scores):
+            best = np.argpartition(-scores, top_k - 1)[:top_k]
+        else:
+            best = np.arange(len(scores))
+        best = best[np.argsort(-scores[best])]
+
+        results = []
+        for row in best:
+            entry = self.entries[row]
+            results.append(
+                {
+                    "type": entry["type"],
+                    "content": self._knowledge_base[entry["section"]][entry["position"]],
+                    "category": entry["category"],
+                    "relevance": max(0.0, float(scores[row])),
+                }
+            )
+        return results
+
+    def stats(self) -> dict:
+        return {
+            "entries": len(self.entries),
+            "dimension": int(self.vectors.shape[1]) if self.vectors.ndim == 2 else 0,
+            "bytes": int(self.vectors.nbytes),
+            "searches": self.searches,
+        }
+
+
+def build_snapshot(directory: Optional[str] = None, model_name: Optional[str] = None, dtype: Optional[str] = None) -> Path:
+    """Encode la base CDG et écrit l'instantané ; les fichiers sont remplacés atomiquement"""
+    import numpy as np
+
+    from app.ml.model_registry import get_sentence_transformer
+
+    directory = directory or settings.KB_SNAPSHOT_DIR
+    model_name = model_name or settings.EMBEDDING_MODEL_NAME
+    dtype = np.dtype(dtype or settings.KB_SNAPSHOT_DTYPE)
+    knowledge_base = get_cdg_knowledge_base()
+    fingerprint = knowledge_base_fingerprint()
+    entries = snapshot_entries(knowledge_base)
+
+    texts = [entry_text(entry["type"], knowledge_base[entry["section"]][entry["position"]]) for entry in entries]
+    vectors = get_sentence_transformer(model_name).encode(
+        texts, batch_size=64, normalize_embeddings=True, convert_to_numpy=True
+    ).astype(dtype)
+
+    npy_path, json_path = snapshot_paths(directory, fingerprint, model_name)
+    npy_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_npy = npy_path.with_name(npy_path.name + ".tmp")
+    with open(tmp_npy, "wb") as f:
+        np.save(f, vectors)
+    os.replace(tmp_npy, npy_path)
+    # La table est écrite en dernier : sa présence signale un instantané complet
+    metadata = {
+        "format": FORMAT_VERSION,
+        "fingerprint": fingerprint,
+        "model": model_name,
+        "dtype": dtype.name,
+        "dimension": int(vectors.shape[1]),
+        "entries": entries,
+    }
+    tmp_json = json_path.with_name(json_path.name + ".tmp")
+    tmp_json.write_text(json.dumps(metadata, ensure_ascii=False), encoding="utf-8")
+    os.replace(tmp_json, json_path)
+    logger.info(f"KB snapshot written: {len(entries)} entries, {vectors.nbytes} bytes -> {npy_path}")
+    return npy_path
+
+
+def load_snapshot(directory: Optional[str] = None, model_name: Optional[str] = None) -> Optional[KBSnapshot]:
+    """Ouvre l'instantané de la version courante de la base ; None s'il n'a pas été construit"""
+    directory = directory or settings.KB_SNAPSHOT_DIR
+    model_name = model_name or settings.EMBEDDING_MODEL_NAME
+    fingerprint = knowledge_base_fingerprint()
+    npy_path, json_path = snapshot_paths(directory, fingerprint, model_name)
+    if not json_path.exists() or not npy_path.exists():
+        return None
+
+    import numpy as np
+
+    metadata = json.loads(json_path.read_text(encoding="utf-8"))
+    vectors = np.load(npy_path, mmap_mode="r")
+    entries = metadata["entries"]
+    if metadata.get("format") != FORMAT_VERSION or vectors.shape != (len(entries), metadata["dimension"]):
+        logger.warning(f"KB snapshot {npy_path} does not match its metadata, ignoring it")
+        return None
+    return KBSnapshot(vectors, entries, fingerprint, model_name, get_cdg_knowledge_base())
+
+
+_snapshot: Optional[KBSnapshot] = None
+_snapshot_fingerprint: Optional[str] = None
+_snapshot_lock = threading.Lock()
+
+
+def get_kb_snapshot() -> Optional[KBSnapshot]:
+    """Instantané du processus, rouvert quand l'empreinte de la base change"""
+    global _snapshot, _snapshot_fingerprint
+    fingerprint = knowledge_base_fingerprint()
+    if _snapshot_fingerprint != fingerprint:
+        with _snapshot_lock:
+            if _snapshot_fingerprint != fingerprint:
+                _snapshot = load_snapshot()
+                _snapshot_fingerprint = fingerprint
+                if _snapshot is None:
+                    logger.warning(
+                        f"No KB snapshot for fingerprint {fingerprint} in {settings.KB_SNAPSHOT_DIR}: "
+                        "run `python -m app.data.kb_snapshot` to enable semantic search over the CDG base"
+                    )
+    return _snapshot
+
+
+def kb_snapshot_stats() -> Dict[str, object]:
+    snapshot = _snapshot
+    if snapshot is None:
+        return {"loaded": False}
+    return {"loaded": True, "fingerprint": snapshot.fingerprint, **snapshot.stats()}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Encode la base de connaissances CDG et écrit l'instantané")
+    parser.add_argument("--dir", default=settings.KB_SNAPSHOT_DIR)
+    parser.add_argument("--model", default=settings.EMBEDDING_MODEL_NAME)
+    parser.add_argument("--dtype", default=settings.KB_SNAPSHOT_DTYPE, choices=("float16", "float32"))
+    args = parser.parse_args()
+    print(build_snapshot(args.dir, args.model, args.dtype))
@@ -1,24 +1,44 @@
-from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.orm import declarative_base
-from sqlalchemy.orm import sessionmaker
 
 from app.core.config import settings
+from app.core.metrics import instrument_engine
 
 # Use DATABASE_URL from settings, or fallback to a file-based SQLite database for development stability
 SQLALCHEMY_DATABASE_URL = settings.DATABASE_URL if settings.DATABASE_URL else "sqlite:///./app.db"
 
-# For SQLite, connect_args are needed to allow multiple threads to interact with the database
-# For other databases like PostgreSQL, these arguments are not necessary.
-connect_args = {"check_same_thread": False} if "sqlite" in SQLALCHEMY_DATABASE_URL else {}
 
-engine = create_engine(SQLALCHEMY_DATABASE_URL, connect_args=connect_args)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+def to_async_url(url: str) -> str:
+    """Swap the sync driver of a database URL for its asyncio counterpart (asyncpg / aiosqlite).
+    Alembic keeps using the sync URL from settings."""
+    scheme, separator, rest = url.partition("://")
+    driver = scheme.split("+")[0]
+    if driver in ("postgresql", "postgres"):
+        return f"postgresql+asyncpg{separator}{rest}"
+    if driver == "sqlite":
+        return f"sqlite+aiosqlite{separator}{rest}"
+    return url
+
+
+ASYNC_DATABASE_URL = to_async_url(SQLALCHEMY_DATABASE_URL)
+
+# SQLite (aiosqlite) manages its own connections; pool sizing only applies to server databases
+engine_options = {} if ASYNC_DATABASE_URL.startswith("sqlite") else {
+    "pool_size": settings.DB_POOL_SIZE,
+    "max_overflow": settings.DB_MAX_OVERFLOW,
+    "pool_timeout": settings.DB_POOL_TIMEOUT,
+    "pool_recycle": settings.DB_POOL_RECYCLE,
+    "pool_pre_ping": settings.DB_POOL_PRE_PING,
+}
+
+engine = create_async_engine(ASYNC_DATABASE_URL, **engine_options)
+# Statement latencies for /metrics (and the Server-Timing header of traced requests)
+instrument_engine(engine)
+# expire_on_commit=False: ORM objects stay readable after commit without another round trip
+SessionLocal = async_sessionmaker(engine, autoflush=False, expire_on_commit=False)
 
 Base = declarative_base()
 
-def get_db():
-    db = SessionLocal()
-    try:
+async def get_db():
+    async with SessionLocal() as db:
         yield db
-    finally:
-        db.close() 
\ No newline at end of file
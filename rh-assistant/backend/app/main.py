@@ -1,13 +1,56 @@
+import asyncio
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, PlainTextResponse
 
 from app.core.config import settings
+from app.core.metrics import ServerTimingMiddleware, metrics
+from app.core.security import password_hasher
+from app.database import engine
 from app.api.endpoints import chat, admin, upload # type: ignore
+from app.ml.embeddings import embedding_service
+from app.ml.llm_engine import llm_engine
+from app.services.chat_service import chat_service
+from app.services.external_api import external_api_service
+from app.services.extraction import shutdown_extraction_executor
+from app.services.ingestion_jobs import ingestion_jobs
+from app.services.interaction_log import interaction_log
+from app.services.warmup import warm_up, warmup_state
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Removed Base.metadata.create_all for SQLite in --reload mode
+    # It's recommended to run migrations or a separate script to create tables once.
+    # For SQLite file-based development, manually run 'alembic upgrade head' or a simple script.
+    await external_api_service.startup()
+    external_api_service.warm_cache()
+    await ingestion_jobs.start()
+    interaction_log.start()
+    # Heavy ML/storage singletons load in the background; /ready reports when they are warm
+    warmup_task = asyncio.create_task(warm_up()) if settings.WARMUP_ON_STARTUP else None
+    yield
+    if warmup_task is not None:
+        warmup_task.cancel()
+    await ingestion_jobs.stop()
+    # Write out buffered chat interactions before the engine is disposed
+    await interaction_log.stop()
+    await external_api_service.shutdown()
+    await chat_service.query_cache.close()
+    await embedding_service.close()
+    await llm_engine.close()
+    shutdown_extraction_executor()
+    password_hasher.close()
+    await engine.dispose()
+
 
 app = FastAPI(
     title="RH Assistant API",
     description="API for the Smart HR Assistant",
     version="0.1.0",
+    lifespan=lifespan,
 )
 
 # Configure CORS
@@ -24,20 +67,30 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+if settings.METRICS_ENABLED:
+    app.add_middleware(ServerTimingMiddleware, prefixes=("/chat",))
+    for component, stats in admin.PERFORMANCE_STATS.items():
+        metrics.register_collector(component, stats)
+
 # Include routers
 app.include_router(chat.router, prefix="/chat", tags=["chat"])
 app.include_router(admin.router, prefix="/admin", tags=["admin"])
 app.include_router(upload.router, prefix="/upload", tags=["upload"])
 
 
-@app.on_event("startup")
-async def startup_event():
-    # Removed Base.metadata.create_all for SQLite in --reload mode
-    # It's recommended to run migrations or a separate script to create tables once.
-    # For SQLite file-based development, manually run 'alembic upgrade head' or a simple script.
-    pass
-
-
 @app.get("/", tags=["root"])
 async def read_root():
     return {"message": "Welcome to the RH Assistant API"}
+
+
+@app.get("/ready", tags=["root"])
+async def read_readiness():
+    status_code = 200 if warmup_state.ready else 503
+    return JSONResponse(status_code=status_code, content=warmup_state.as_dict())
+
+
+@app.get("/metrics", tags=["root"], include_in_schema=False)
+async def read_metrics():
+    if not settings.METRICS_ENABLED:
+        return PlainTextResponse("metrics disabled\n", status_code=404)
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
@@ -1,10 +1,111 @@
-from sentence_transformers import SentenceTransformer
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional
+
+from app.core.config import settings
+from app.core.metrics import span, stage_duration
+from app.ml.model_registry import get_sentence_transformer
 
 class EmbeddingsGenerator:
-    def __init__(self, model_name: str = "paraphrase-MiniLM-L6-v2"):
-        self.model = SentenceTransformer(model_name)
+    def __init__(self, model_name: Optional[str] = None):
+        self.model_name = model_name or settings.EMBEDDING_MODEL_NAME
+
+    @property
+    def model(self):
+        # Loaded lazily and shared with the vector store through the model registry
+        return get_sentence_transformer(self.model_name)
 
     def generate_embedding(self, text: str) -> list[float]:
         return self.model.encode(text).tolist()
 
+    def generate_embeddings(self, texts: List[str], batch_size: int = 32) -> list[list[float]]:
+        return self.model.encode(texts, batch_size=batch_size).tolist()
+
+
+class BatchingEmbeddingService:
+    """Async front-end that groups concurrent embed() calls into micro-batches.
+
+    A batch is flushed when it reaches `max_batch_size` or `max_wait_ms` after its first
+    request, and is encoded on a dedicated worker thread so the event loop keeps running.
+    """
+
+    def __init__(self, generator: EmbeddingsGenerator, max_batch_size: int = 32, max_wait_ms: float = 5.0):
+        self.generator = generator
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="embeddings")
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+        self.batches = 0
+        self.items = 0
+
+    def _ensure_started(self):
+        if self._worker is None or self._worker.done():
+            self._queue = asyncio.Queue()
+            self._worker = asyncio.create_task(self._run())
+
+    async def embed(self, text: str) -> list[float]:
+        self._ensure_started()
+        future = asyncio.get_running_loop().create_future()
+        self._queue.put_nowait((text, future))
+        with span("embedding"):
+            return await future
+
+    async def embed_many(self, texts: List[str]) -> list[list[float]]:
+        return list(await asyncio.gather(*(self.embed(text) for text in texts)))
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            if self._queue.qsize() < self.max_batch_size - 1:
+                await asyncio.sleep(self.max_wait)
+            while len(batch) < self.max_batch_size and not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+
+            pending = [(text, future) for text, future in batch if not future.cancelled()]
+            if not pending:
+                continue
+            start = time.perf_counter()
+            try:
+                vectors = await loop.run_in_executor(
+                    self._executor,
+                    self.generator.generate_embeddings,
+                    [text for text, _ in pending],
+                    self.max_batch_size,
+                )
+            except Exception as e:
+                for _, future in pending:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+            # Shared by concurrent requests: histogram only, not their Server-Timing
+            stage_duration.observe(time.perf_counter() - start, "embedding_batch")
+            self.batches += 1
+            self.items += len(pending)
+            for (_, future), vector in zip(pending, vectors):
+                if not future.done():
+                    future.set_result(vector)
+
+    async def close(self):
+        if self._worker is not None:
+            self._worker.cancel()
+            self._worker = None
+        self._executor.shutdown(wait=False)
+
+    def stats(self) -> dict:
+        return {
+            "batches": self.batches,
+            "items": self.items,
+            "avg_batch_size": round(self.items / self.batches, 2) if self.batches else 0.0,
+            "queued": self._queue.qsize() if self._queue is not None else 0,
+        }
+
+
 embeddings_generator = EmbeddingsGenerator()
+embedding_service = BatchingEmbeddingService(
+    embeddings_generator,
+    max_batch_size=settings.EMBEDDING_MAX_BATCH_SIZE,
+    max_wait_ms=settings.EMBEDDING_MAX_WAIT_MS,
+)
@@ -1,23 +1,292 @@
-import openai
+import asyncio
+import re
+import time
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, Optional
+
+from loguru import logger
+
 from app.core.config import settings
+from app.core.resilience import CircuitBreaker, backoff_delay
+
+class LLMUnavailableError(RuntimeError):
+    """No completion could be obtained (circuit open, deadline exceeded or retries exhausted).
+    Callers answer from the CDG knowledge base instead."""
+
+
+def _retry_after(error: Exception) -> Optional[float]:
+    response = getattr(error, "response", None)
+    try:
+        return float(response.headers.get("retry-after")) if response is not None else None
+    except (TypeError, ValueError):
+        return None
+
+
+def _is_retryable(error: Exception) -> bool:
+    import openai
+
+    if isinstance(error, (asyncio.TimeoutError, openai.APIConnectionError)):
+        return True
+    if isinstance(error, openai.APIStatusError):
+        return error.status_code == 429 or error.status_code >= 500
+    return False
 
-openai.api_key = settings.OPENAI_API_KEY
 
 class LLMEngine:
-    def __init__(self, model: str = "gpt-4"):
+    """OpenAI chat client with a pooled HTTP connection, deadlines, bounded concurrency,
+    jittered retries on 429/5xx/timeouts and a circuit breaker.
+
+    Each call has an overall deadline (LLM_DEADLINE_SECONDS) shared by its attempts. At
+    most LLM_MAX_CONCURRENCY calls run at once; the others wait on a semaphore and are
+    counted in `waiting`. The wait counts against the call's deadline: a call still queued
+    when it expires fails without touching the breaker (counted in `queue_timeouts`). After LLM_BREAKER_FAILURE_THRESHOLD consecutive unavailable
+    calls the breaker opens and calls fail immediately with LLMUnavailableError.
+    """
+
+    def __init__(self, model: str = settings.LLM_MODEL, client: Any = None):
         self.model = model
+        self._client = client
+        self._slots = asyncio.Semaphore(settings.LLM_MAX_CONCURRENCY)
+        self.breaker = CircuitBreaker(
+            "llm",
+            failure_threshold=settings.LLM_BREAKER_FAILURE_THRESHOLD,
+            reset_timeout=settings.LLM_BREAKER_RESET_SECONDS,
+        )
+        self.waiting = 0
+        self.max_waiting = 0
+        self.queue_timeouts = 0
+        self.empty_answers = 0
+        self.in_flight = 0
+        self.calls = 0
+        self.failures = 0
+        self.retries = 0
+        self.timeouts = 0
+        self.call_time_total = 0.0
+
+    @property
+    def configured(self) -> bool:
+        # A custom endpoint (e.g. a local mock) may not need a key
+        return bool(settings.OPENAI_API_KEY or settings.LLM_BASE_URL)
+
+    def _check_available(self):
+        if not self.configured:
+            raise LLMUnavailableError("OPENAI_API_KEY is not set")
+        if not self.breaker.allow():
+            raise LLMUnavailableError("LLM circuit breaker is open")
+
+    def _get_client(self):
+        if self._client is None:
+            import httpx
+            import openai
+
+            # SDK defaults (redirects, timeouts) with our own pool size
+            http_client = openai.DefaultAsyncHttpxClient(
+                limits=httpx.Limits(
+                    max_connections=settings.LLM_MAX_CONNECTIONS,
+                    max_keepalive_connections=settings.LLM_MAX_CONNECTIONS,
+                ),
+                timeout=httpx.Timeout(settings.LLM_TIMEOUT_SECONDS, connect=5.0),
+            )
+            # Retries are handled here (shared deadline, breaker accounting), not by the SDK
+            self._client = openai.AsyncOpenAI(
+                api_key=settings.OPENAI_API_KEY or "missing",
+                base_url=settings.LLM_BASE_URL,
+                http_client=http_client,
+                max_retries=0,
+            )
+        return self._client
+
+    async def close(self):
+        if self._client is not None:
+            await self._client.close()
+            self._client = None
+
+    @asynccontextmanager
+    async def _slot(self, deadline: float):
+        self.waiting += 1
+        self.max_waiting = max(self.max_waiting, self.waiting)
+        try:
+            await asyncio.wait_for(self._slots.acquire(), timeout=max(0.0, deadline - time.monotonic()))
+        except asyncio.TimeoutError:
+            self.queue_timeouts += 1
+            # Local saturation, not a provider failure: the breaker keeps its state
+            self.breaker.release_probe()
+            raise LLMUnavailableError("LLM queue wait exceeded the deadline") from None
+        finally:
+            self.waiting -= 1
+        self.in_flight += 1
+        try:
+            yield
+        finally:
+            self.in_flight -= 1
+            self._slots.release()
+
+    async def _with_retries(self, attempt_call, deadline: float):
+        """Run `attempt_call()` until it succeeds, fails for good or the deadline passes."""
+        attempt = 0
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise asyncio.TimeoutError()
+            try:
+                return await asyncio.wait_for(attempt_call(), timeout=min(settings.LLM_TIMEOUT_SECONDS, remaining))
+            except Exception as e:
+                if isinstance(e, asyncio.TimeoutError):
+                    self.timeouts += 1
+                if not _is_retryable(e) or attempt >= settings.LLM_MAX_RETRIES:
+                    raise
+                delay = backoff_delay(attempt, settings.LLM_RETRY_BASE_DELAY, settings.LLM_RETRY_MAX_DELAY, _retry_after(e))
+                if time.monotonic() + delay >= deadline:
+                    raise
+                attempt += 1
+                self.retries += 1
+                logger.info(f"LLM call failed ({e!r}), retry {attempt} in {delay:.2f}s")
+                await asyncio.sleep(delay)
+
+    def _failed(self, error: Exception) -> LLMUnavailableError:
+        self.failures += 1
+        if _is_retryable(error):
+            self.breaker.record_failure()
+        else:
+            # The upstream answered (e.g. a rejected prompt): not an availability failure
+            self.breaker.record_success()
+        logger.warning(f"LLM unavailable: {error!r}")
+        return LLMUnavailableError(str(error) or error.__class__.__name__)
+
+    def _messages(self, prompt: str):
+        return [{"role": "user", "content": prompt}]
 
     async def get_completion(self, prompt: str, temperature: float = 0.7) -> str:
+        self._check_available()
         try:
-            response = await openai.ChatCompletion.acreate(
-                model=self.model,
-                messages=[{"role": "user", "content": prompt}],
-                temperature=temperature,
-            )
-            return response.choices[0].message.content.strip()
-        except Exception as e:
-            # Log the error and potentially re-raise or return a default message
-            print(f"Error getting completion from OpenAI: {e}")
-            return "Désolé, je n'ai pas pu générer de réponse pour le moment."
+            client = self._get_client()
+            start = time.monotonic()
+            async with self._slot(start + settings.LLM_DEADLINE_SECONDS):
+                try:
+                    response = await self._with_retries(
+                        lambda: client.chat.completions.create(model=self.model, messages=self._messages(prompt), temperature=temperature),
+                        start + settings.LLM_DEADLINE_SECONDS,
+                    )
+                except Exception as e:
+                    raise self._failed(e) from e
+        except asyncio.CancelledError:
+            # Cancelled before any verdict: a half-open probe must not stay taken
+            self.breaker.release_probe()
+            raise
+        self.calls += 1
+        self.call_time_total += time.monotonic() - start
+        self.breaker.record_success()
+        # Refusals and tool-only completions carry no content: the caller falls back
+        answer = (response.choices[0].message.content or "").strip()
+        if not answer:
+            self.empty_answers += 1
+            raise LLMUnavailableError("LLM returned an empty answer")
+        return answer
+
+    async def stream_completion(self, prompt: str, temperature: float = 0.7) -> AsyncIterator[str]:
+        """Yield content deltas as they arrive. Retries only happen until the first delta;
+        once streaming, a chunk gap longer than LLM_STREAM_IDLE_TIMEOUT_SECONDS aborts."""
+        self._check_available()
+        try:
+            client = self._get_client()
+            start = time.monotonic()
+            async with self._slot(start + settings.LLM_DEADLINE_SECONDS):
+
+                async def open_stream():
+                    stream = await client.chat.completions.create(
+                        model=self.model, messages=self._messages(prompt), temperature=temperature, stream=True
+                    )
+                    chunks = stream.__aiter__()
+                    try:
+                        first = await chunks.__anext__()
+                    except BaseException:
+                        await stream.close()
+                        raise
+                    return stream, chunks, first
+
+                try:
+                    stream, chunks, chunk = await self._with_retries(open_stream, start + settings.LLM_DEADLINE_SECONDS)
+                except StopAsyncIteration:
+                    stream, chunks, chunk = None, None, None
+                except Exception as e:
+                    raise self._failed(e) from e
+
+                try:
+                    while chunk is not None:
+                        if chunk.choices and chunk.choices[0].delta.content:
+                            yield chunk.choices[0].delta.content
+                        try:
+                            chunk = await asyncio.wait_for(chunks.__anext__(), timeout=settings.LLM_STREAM_IDLE_TIMEOUT_SECONDS)
+                        except StopAsyncIteration:
+                            chunk = None
+                except Exception as e:
+                    if isinstance(e, asyncio.TimeoutError):
+                        self.timeouts += 1
+                    raise self._failed(e) from e
+                finally:
+                    if stream is not None:
+                        await stream.close()
+            self.calls += 1
+            self.call_time_total += time.monotonic() - start
+            self.breaker.record_success()
+        except (asyncio.CancelledError, GeneratorExit):
+            # Cancelled, or the consumer stopped reading, before any verdict: a half-open
+            # probe must not stay taken
+            self.breaker.release_probe()
+            raise
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "model": self.model,
+            "configured": self.configured,
+            "in_flight": self.in_flight,
+            "waiting": self.waiting,
+            "max_waiting": self.max_waiting,
+            "queue_timeouts": self.queue_timeouts,
+            "empty_answers": self.empty_answers,
+            "max_concurrency": settings.LLM_MAX_CONCURRENCY,
+            "calls": self.calls,
+            "failures": self.failures,
+            "retries": self.retries,
+            "timeouts": self.timeouts,
+            "call_latency_avg_ms": round(self.call_time_total / self.calls * 1000, 1) if self.calls else 0.0,
+            "circuit_breaker": self.breaker.stats(),
+        }
+
+
+class StubLLMEngine:
+    """Offline stand-in with LLM-like timing: a first-token delay, then one word per tick.
+
+    The answer is the first context passage of the prompt, so responses stay relevant
+    in demos and benchmarks without an API key.
+    """
+
+    def __init__(self, first_token_ms: float = settings.LLM_STUB_FIRST_TOKEN_MS, token_ms: float = settings.LLM_STUB_TOKEN_MS):
+        self.model = "stub"
+        self.first_token_delay = first_token_ms / 1000
+        self.token_delay = token_ms / 1000
+
+    @staticmethod
+    def _answer(prompt: str) -> str:
+        # First context passage, without its "[source]" label
+        match = re.search(r"CONTEXTE\s*:\s*\n(?:\[[^\]\n]*\]\s*)?([^\n]+)", prompt)
+        return (match.group(1) if match else "Je n'ai pas trouvé d'information précise sur ce point.").strip()
+
+    async def get_completion(self, prompt: str, temperature: float = 0.7) -> str:
+        return "".join([token async for token in self.stream_completion(prompt, temperature)])
+
+    async def stream_completion(self, prompt: str, temperature: float = 0.7) -> AsyncIterator[str]:
+        await asyncio.sleep(self.first_token_delay)
+        for index, word in enumerate(self._answer(prompt).split(" ")):
+            if index:
+                await asyncio.sleep(self.token_delay)
+            yield word if index == 0 else " " + word
+
+    async def close(self):
+        pass
+
+    def stats(self) -> Dict[str, Any]:
+        return {"model": self.model}
+
 
-llm_engine = LLMEngine()
+llm_engine = StubLLMEngine() if settings.LLM_BACKEND == "stub" else LLMEngine()
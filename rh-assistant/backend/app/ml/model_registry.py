@@ -0,0 +1,30 @@
+import threading
+from typing import TYPE_CHECKING, Dict, List, Optional
+
+from app.core.config import settings
+
+if TYPE_CHECKING:
+    from sentence_transformers import SentenceTransformer
+
+# One instance per model name for the whole process, shared by embeddings.py and the vector store
+_models: Dict[str, "SentenceTransformer"] = {}
+_lock = threading.Lock()
+
+
+def get_sentence_transformer(model_name: Optional[str] = None) -> "SentenceTransformer":
+    """Return the process-wide SentenceTransformer for `model_name`, loading it on first use."""
+    name = model_name or settings.EMBEDDING_MODEL_NAME
+    model = _models.get(name)
+    if model is None:
+        with _lock:
+            model = _models.get(name)
+            if model is None:
+                from sentence_transformers import SentenceTransformer
+
+                model = SentenceTransformer(name)
+                _models[name] = model
+    return model
+
+
+def loaded_models() -> List[str]:
+    return list(_models)
@@ -0,0 +1,402 @@
+"""
+In-process vector store: exact nearest-neighbour search over a NumPy matrix.
+
+Same interface as ChromaVectorizer (app/ml/vectorizer.py), selected with
+VECTOR_STORE_BACKEND=numpy. Embeddings are L2-normalised and kept in one contiguous
+float32 matrix, so a query is one matrix-vector product (a matrix product for a batch of
+queries) followed by argpartition for the top k. `where` filters become boolean masks
+over per-key metadata columns, applied before the top-k selection. At the corpus sizes
+of this application (a few thousand chunks) the search is exact and cheaper than a
+round trip through Chroma.
+
+Each collection is persisted as a base snapshot, <VECTOR_STORE_DIR>/<name>.npy + <name>.json,
+plus an append-only log, <name>.log, with one JSON line per write (vectors base64-encoded).
+A write costs its own batch, not the collection. Once the log outgrows the snapshot (and
+COMPACT_MIN_LOG_BYTES), it is folded into a new snapshot, so the total rewrite cost stays
+linear. Writers hold an exclusive flock on <name>.lock across catch-up, apply and append,
+so workers sharing the directory never overwrite each other's rows. Readers replay the log
+lines written since their last call, under a shared lock. Distances follow
+the collection's "hnsw:space" like Chroma: cosine and ip give 1 - similarity, l2 the
+squared distance between the normalised vectors (2 - 2 * similarity).
+"""
+
+import base64
+import json
+import operator
+import os
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from loguru import logger
+
+from app.core.config import settings
+from app.core.metrics import span
+from app.ml.model_registry import get_sentence_transformer
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - no flock outside POSIX: one writing process per directory
+    fcntl = None
+
+# The log is folded into the snapshot once it is larger than both this and the snapshot itself
+COMPACT_MIN_LOG_BYTES = 4 * 1024 * 1024
+
+_COMPARISONS = {"$gt": operator.gt, "$gte": operator.ge, "$lt": operator.lt, "$lte": operator.le}
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.where(norms == 0, 1.0, norms)
+
+
+def _compare(values: np.ndarray, op: str, operand) -> np.ndarray:
+    if op == "$eq":
+        return values == operand
+    if op == "$ne":
+        return values != operand
+    if op in ("$in", "$nin"):
+        members = set(operand)
+        found = np.fromiter((value in members for value in values), dtype=bool, count=len(values))
+        return found if op == "$in" else ~found
+    compare = _COMPARISONS.get(op)
+    if compare is None:
+        raise ValueError(f"Unsupported where operator: {op}")
+    return np.fromiter((value is not None and compare(value, operand) for value in values), dtype=bool, count=len(values))
+
+
+class NumpyVectorStore:
+    def __init__(self, collection_name: str = "hr_documents", metadata: Optional[dict] = None, directory: Optional[str] = None):
+        self.collection_name = collection_name
+        self.space = (metadata or {}).get("hnsw:space", "l2")
+        directory = Path(directory or settings.VECTOR_STORE_DIR)
+        self._npy_path = directory / f"{collection_name}.npy"
+        self._json_path = directory / f"{collection_name}.json"
+        self._log_path = directory / f"{collection_name}.log"
+        self._lock_path = directory / f"{collection_name}.lock"
+        # Every public method holds the lock: calls arrive from asyncio.to_thread workers
+        self._lock = threading.RLock()
+        self._matrix = np.zeros((0, 0), dtype=np.float32)
+        self._ids: List[str] = []
+        self._documents: List[str] = []
+        self._metadatas: List[dict] = []
+        self._rows: Dict[str, int] = {}
+        # Metadata key -> (values, present) columns for the where masks; cleared on every change
+        self._columns: Dict[str, Tuple[np.ndarray, np.ndarray]] = {}
+        # What has been read: snapshot (mtime, size), then the log file (inode) up to an offset
+        self._base_signature: Optional[Tuple[int, int]] = None
+        self._base_bytes = 0
+        self._log_inode: Optional[int] = None
+        self._log_offset = 0
+        self.queries = 0
+        self.compactions = 0
+        with self._lock:
+            self._sync()
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    # Persistence
+
+    @contextmanager
+    def _file_lock(self, exclusive: bool):
+        if fcntl is None:
+            yield
+            return
+        self._lock_path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self._lock_path, "a") as handle:
+            fcntl.flock(handle, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+            try:
+                yield
+            finally:
+                fcntl.flock(handle, fcntl.LOCK_UN)
+
+    @staticmethod
+    def _stat(path: Path):
+        try:
+            return path.stat()
+        except FileNotFoundError:
+            return None
+
+    def _changed(self) -> bool:
+        base, log = self._stat(self._json_path), self._stat(self._log_path)
+        base_signature = (base.st_mtime_ns, base.st_size) if base else None
+        log_position = (log.st_ino, log.st_size) if log else (None, 0)
+        return base_signature != self._base_signature or log_position != (self._log_inode, self._log_offset)
+
+    def _sync(self):
+        """Catch up with the writes of other workers, if the files changed since our last call"""
+        if self._changed():
+            with self._file_lock(exclusive=False):
+                self._catch_up()
+
+    def _catch_up(self):
+        """Reload the snapshot if it was rewritten, then replay the new log lines (caller holds the file lock)"""
+        base = self._stat(self._json_path)
+        base_signature = (base.st_mtime_ns, base.st_size) if base else None
+        log = self._stat(self._log_path)
+        log_inode = log.st_ino if log else None
+        if base_signature != self._base_signature or (self._log_inode is not None and log_inode != self._log_inode):
+            self._load_base()
+            self._base_signature = base_signature
+            self._log_offset = 0
+        if log_inode != self._log_inode:
+            self._log_inode, self._log_offset = log_inode, 0
+        if log is None or log.st_size <= self._log_offset:
+            return
+        with open(self._log_path, "rb") as f:
+            f.seek(self._log_offset)
+            data = f.read()
+        # Writers append whole lines under the exclusive lock; a partial line is never expected
+        # but would be left for the next call
+        complete = data[: data.rfind(b"\n") + 1]
+        for line in complete.splitlines():
+            self._apply(json.loads(line))
+        self._log_offset += len(complete)
+
+    def _load_base(self):
+        self._columns = {}
+        if not self._json_path.exists():
+            self._matrix, self._ids, self._documents, self._metadatas, self._rows = np.zeros((0, 0), dtype=np.float32), [], [], [], {}
+            self._base_bytes = 0
+            return
+        data = json.loads(self._json_path.read_text(encoding="utf-8"))
+        matrix = np.load(self._npy_path) if data["ids"] else np.zeros((0, 0), dtype=np.float32)
+        if len(matrix) != len(data["ids"]):
+            raise RuntimeError(f"Vector store {self.collection_name}: snapshot matrix and metadata out of step")
+        self._matrix = np.ascontiguousarray(matrix, dtype=np.float32)
+        self._ids, self._documents, self._metadatas = data["ids"], data["documents"], data["metadatas"]
+        self._rows = {doc_id: row for row, doc_id in enumerate(self._ids)}
+        self._base_bytes = self._json_path.stat().st_size + (self._npy_path.stat().st_size if data["ids"] else 0)
+
+    def _write(self, record: dict):
+        """Apply a change and append it to the log (caller holds the exclusive file lock, caught up)"""
+        self._apply(record)
+        self._log_path.parent.mkdir(parents=True, exist_ok=True)
+        line = (json.dumps(record, ensure_ascii=False) + "\n").encode("utf-8")
+        with open(self._log_path, "ab") as f:
+            f.write(line)
+            self._log_inode = os.fstat(f.fileno()).st_ino
+        self._log_offset += len(line)
+        if self._log_offset > max(COMPACT_MIN_LOG_BYTES, self._base_bytes):
+            self._compact()
+
+    def _compact(self):
+        """Fold the log into a new snapshot, then start an empty log (caller holds the exclusive file lock).
+
+        A crash between the two replacements leaves the new snapshot with the old log: the
+        log is replayed on top of it, which gives the same state (every record sets values).
+        """
+        tmp_npy = self._npy_path.with_name(self._npy_path.name + ".tmp")
+        with open(tmp_npy, "wb") as f:
+            np.save(f, self._matrix)
+        os.replace(tmp_npy, self._npy_path)
+        tmp_json = self._json_path.with_name(self._json_path.name + ".tmp")
+        payload = {"space": self.space, "ids": self._ids, "documents": self._documents, "metadatas": self._metadatas}
+        tmp_json.write_text(json.dumps(payload, ensure_ascii=False), encoding="utf-8")
+        os.replace(tmp_json, self._json_path)
+        tmp_log = self._log_path.with_name(self._log_path.name + ".tmp")
+        tmp_log.write_bytes(b"")
+        os.replace(tmp_log, self._log_path)
+        base = self._json_path.stat()
+        self._base_signature = (base.st_mtime_ns, base.st_size)
+        self._base_bytes = base.st_size + self._npy_path.stat().st_size
+        self._log_inode, self._log_offset = self._log_path.stat().st_ino, 0
+        self.compactions += 1
+        logger.info(f"Vector store {self.collection_name}: log folded into a snapshot of {len(self._ids)} rows")
+
+    def _apply(self, record: dict):
+        self._columns = {}
+        op = record["op"]
+        if op == "upsert":
+            vectors = np.frombuffer(base64.b64decode(record["vectors"]), dtype="<f4").reshape(len(record["ids"]), -1)
+            self._apply_upsert(record["ids"], record["documents"], record["metadatas"], vectors)
+        elif op == "update":
+            for doc_id, metadata in zip(record["ids"], record["metadatas"]):
+                row = self._rows.get(doc_id)
+                if row is not None:
+                    self._metadatas[row] = {**self._metadatas[row], **metadata}
+        elif op == "delete":
+            keep = np.ones(len(self._ids), dtype=bool)
+            keep[[self._rows[doc_id] for doc_id in record["ids"] if doc_id in self._rows]] = False
+            rows = np.flatnonzero(keep)
+            self._matrix = np.ascontiguousarray(self._matrix[rows])
+            self._ids = [self._ids[row] for row in rows]
+            self._documents = [self._documents[row] for row in rows]
+            self._metadatas = [self._metadatas[row] for row in rows]
+            self._rows = {doc_id: row for row, doc_id in enumerate(self._ids)}
+        else:
+            raise ValueError(f"Unknown vector store log record: {op}")
+
+    def _apply_upsert(self, ids: List[str], documents: List[str], metadatas: List[dict], vectors: np.ndarray):
+        matrix = self._matrix if self._ids else np.zeros((0, vectors.shape[1]), dtype=np.float32)
+        appended = []
+        for i, doc_id in enumerate(ids):
+            row = self._rows.get(doc_id)
+            if row is None:
+                self._rows[doc_id] = len(self._ids)
+                self._ids.append(doc_id)
+                self._documents.append(documents[i])
+                self._metadatas.append(metadatas[i])
+                appended.append(i)
+            else:
+                matrix[row] = vectors[i]
+                self._documents[row] = documents[i]
+                self._metadatas[row] = metadatas[i]
+        if appended:
+            matrix = np.concatenate([matrix, vectors[appended]])
+        self._matrix = matrix
+
+    # Filtering
+
+    def _column(self, key: str) -> Tuple[np.ndarray, np.ndarray]:
+        column = self._columns.get(key)
+        if column is None:
+            values = np.empty(len(self._ids), dtype=object)
+            present = np.zeros(len(self._ids), dtype=bool)
+            for row, metadata in enumerate(self._metadatas):
+                if key in metadata:
+                    values[row] = metadata[key]
+                    present[row] = True
+            column = self._columns[key] = (values, present)
+        return column
+
+    def _mask(self, where: dict) -> np.ndarray:
+        """Boolean row mask for a Chroma-style `where` ($eq, $ne, $in, $nin, $gt(e), $lt(e), $and, $or)"""
+        mask = np.ones(len(self._ids), dtype=bool)
+        for key, condition in where.items():
+            if key == "$and":
+                for clause in condition:
+                    mask &= self._mask(clause)
+            elif key == "$or":
+                matched = np.zeros(len(self._ids), dtype=bool)
+                for clause in condition:
+                    matched |= self._mask(clause)
+                mask &= matched
+            else:
+                values, present = self._column(key)
+                # Like Chroma, a record without the key never matches, even for $ne / $nin
+                for op, operand in (condition.items() if isinstance(condition, dict) else [("$eq", condition)]):
+                    mask &= present & _compare(values, op, operand)
+        return mask
+
+    def _select(self, where: Optional[dict] = None, ids: Optional[Sequence[str]] = None) -> np.ndarray:
+        mask = self._mask(where) if where else np.ones(len(self._ids), dtype=bool)
+        if ids is not None:
+            wanted = np.zeros(len(self._ids), dtype=bool)
+            wanted[[self._rows[doc_id] for doc_id in ids if doc_id in self._rows]] = True
+            mask &= wanted
+        return np.flatnonzero(mask)
+
+    # Writes
+
+    def _encode(self, texts: Sequence[str]) -> np.ndarray:
+        return get_sentence_transformer(settings.EMBEDDING_MODEL_NAME).encode(list(texts), convert_to_numpy=True)
+
+    def add_document(self, doc_id: str, document: str, metadata: dict):
+        self.upsert_chunks([doc_id], [document], [metadata])
+
+    def upsert_chunks(self, ids: List[str], documents: List[str], metadatas: List[dict], embeddings: Optional[List[List[float]]] = None):
+        """Bulk upsert; precomputed embeddings skip the model call."""
+        if embeddings is None:
+            embeddings = self._encode(documents)
+        vectors = _normalize(np.asarray(embeddings, dtype=np.float32).reshape(len(ids), -1))
+        # Last occurrence wins when an id is repeated within the batch
+        positions = list({doc_id: i for i, doc_id in enumerate(ids)}.values())
+        record = {
+            "op": "upsert",
+            "ids": [ids[i] for i in positions],
+            "documents": [documents[i] for i in positions],
+            "metadatas": [dict(metadatas[i] or {}) for i in positions],
+            "vectors": base64.b64encode(vectors[positions].astype("<f4").tobytes()).decode("ascii"),
+        }
+        with span("vector_upsert"), self._lock, self._file_lock(exclusive=True):
+            self._catch_up()
+            if self._ids and vectors.shape[1] != self._matrix.shape[1]:
+                raise ValueError(f"Embedding dimension {vectors.shape[1]} does not match collection dimensionality {self._matrix.shape[1]}")
+            self._write(record)
+
+    def update_metadatas(self, ids: List[str], metadatas: List[dict]):
+        """Metadata-only update: documents and embeddings are left untouched."""
+        with self._lock, self._file_lock(exclusive=True):
+            self._catch_up()
+            self._write({"op": "update", "ids": list(ids), "metadatas": [dict(metadata) for metadata in metadatas]})
+
+    def delete_documents(self, ids: Optional[List[str]] = None, where: Optional[dict] = None):
+        with self._lock, self._file_lock(exclusive=True):
+            self._catch_up()
+            deleted = self._select(where, ids)
+            if not len(deleted):
+                return
+            self._write({"op": "delete", "ids": [self._ids[row] for row in deleted]})
+
+    # Reads
+
+    def get_ids(self, where: dict) -> List[str]:
+        with self._lock:
+            self._sync()
+            return [self._ids[row] for row in self._select(where)]
+
+    def get_metadatas(self, where: Optional[dict] = None, limit: Optional[int] = None, ids: Optional[List[str]] = None) -> List[dict]:
+        with self._lock:
+            self._sync()
+            return [dict(self._metadatas[row]) for row in self._select(where, ids)[:limit]]
+
+    def query_by_embeddings(self, embeddings: List[List[float]], n_results: int = 1, where: Optional[dict] = None):
+        """Nearest neighbours of several embeddings at once, in Chroma's result layout."""
+        queries = _normalize(np.asarray(embeddings, dtype=np.float32).reshape(len(embeddings), -1))
+        with span("vector_query"), self._lock:
+            self._sync()
+            self.queries += len(queries)
+            results = {"ids": [], "documents": [], "metadatas": [], "distances": []}
+            if not self._ids:
+                for key in results:
+                    results[key] = [[] for _ in queries]
+                return results
+            if queries.shape[1] != self._matrix.shape[1]:
+                raise ValueError(f"Embedding dimension {queries.shape[1]} does not match collection dimensionality {self._matrix.shape[1]}")
+
+            similarities = queries @ self._matrix.T
+            candidates = len(self._ids)
+            if where:
+                mask = self._mask(where)
+                candidates = int(mask.sum())
+                similarities = np.where(mask, similarities, -np.inf)
+            k = min(n_results, candidates)
+            if k <= 0:
+                top = np.zeros((len(queries), 0), dtype=np.intp)
+            elif k < len(self._ids):
+                top = np.argpartition(similarities, -k, axis=1)[:, -k:]
+            else:
+                top = np.tile(np.arange(len(self._ids)), (len(queries), 1))
+            scores = np.take_along_axis(similarities, top, axis=1)
+            order = np.argsort(-scores, axis=1, kind="stable")
+            top = np.take_along_axis(top, order, axis=1)
+            scores = np.take_along_axis(scores, order, axis=1)
+            distances = np.maximum(0.0, 2.0 - 2.0 * scores) if self.space == "l2" else 1.0 - scores
+
+            for rows, row_distances in zip(top, distances):
+                results["ids"].append([self._ids[row] for row in rows])
+                results["documents"].append([self._documents[row] for row in rows])
+                results["metadatas"].append([self._metadatas[row] for row in rows])
+                results["distances"].append(row_distances.tolist())
+            return results
+
+    def query_by_embedding(self, embedding: List[float], n_results: int = 1, where: Optional[dict] = None):
+        """Nearest neighbours of an already computed embedding (no model call)."""
+        return self.query_by_embeddings([embedding], n_results, where)
+
+    def search_documents(self, query: str, n_results: int = 5):
+        return self.query_by_embeddings(self._encode([query]), n_results)
+
+    def stats(self) -> dict:
+        return {
+            "documents": len(self._ids),
+            "dimension": int(self._matrix.shape[1]) if self._ids else 0,
+            "bytes": int(self._matrix.nbytes),
+            "queries": self.queries,
+            "log_bytes": self._log_offset,
+            "compactions": self.compactions,
+        }
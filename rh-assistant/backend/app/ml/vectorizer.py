@@ -1,16 +1,56 @@
-import chromadb
-from chromadb.utils import embedding_functions
+import threading
+from functools import lru_cache
+from typing import Dict, List, Optional
+
 from app.core.config import settings
-from app.ml.embeddings import embeddings_generator
+from app.core.metrics import span
+from app.ml.model_registry import get_sentence_transformer
+
+
+@lru_cache(maxsize=None)
+def _shared_embedding_function_class():
+    # chromadb is only imported when the vector store is first built, not when this module is
+    from chromadb.utils import embedding_functions
+
+    class SharedSentenceTransformerEmbeddingFunction(embedding_functions.SentenceTransformerEmbeddingFunction):
+        """Chroma's sentence-transformer embedding function backed by the shared model registry.
+
+        Subclassing keeps the embedding-function name and config that existing collections
+        were created with, but no model is loaded here: encoding goes through the same
+        instance as app.ml.embeddings.
+        """
+
+        def __init__(self, model_name: str):
+            self.model_name = model_name
+            self.device = "cpu"
+            self.normalize_embeddings = False
+            self.kwargs = {}
+
+        def __call__(self, input):
+            return get_sentence_transformer(self.model_name).encode(list(input), convert_to_numpy=True).tolist()
+
+    return SharedSentenceTransformerEmbeddingFunction
+
+
+@lru_cache(maxsize=None)
+def _chroma_client():
+    import chromadb
+
+    return chromadb.PersistentClient(path="./chroma_db")
+
 
 class ChromaVectorizer:
-    def __init__(self):
-        self.client = chromadb.PersistentClient(path="./chroma_db")
-        self.embedding_function = embedding_functions.SentenceTransformerEmbeddingFunction(model_name="paraphrase-MiniLM-L6-v2")
+    def __init__(self, collection_name: str = "hr_documents", metadata: Optional[dict] = None):
+        # Every collection shares one persistent client per process
+        self.client = _chroma_client()
+        self.embedding_function = _shared_embedding_function_class()(model_name=settings.EMBEDDING_MODEL_NAME)
         self.collection = self.client.get_or_create_collection(
-            name="hr_documents",
-            embedding_function=self.embedding_function
+            name=collection_name,
+            embedding_function=self.embedding_function,
+            metadata=metadata,
         )
+        # Distance of query results, as for NumpyVectorStore: set when the collection was created
+        self.space = (self.collection.metadata or {}).get("hnsw:space", "l2")
 
     def add_document(self, doc_id: str, document: str, metadata: dict):
         self.collection.upsert(
@@ -19,6 +59,43 @@ class ChromaVectorizer:
             ids=[doc_id]
         )
 
+    def upsert_chunks(self, ids: List[str], documents: List[str], metadatas: List[dict], embeddings: Optional[List[List[float]]] = None):
+        """Bulk upsert; precomputed embeddings skip the collection's embedding function."""
+        with span("chroma_upsert"):
+            self.collection.upsert(
+                ids=ids,
+                documents=documents,
+                metadatas=metadatas,
+                embeddings=embeddings,
+            )
+
+    def get_ids(self, where: dict) -> List[str]:
+        return self.collection.get(where=where, include=[])["ids"]
+
+    def get_metadatas(self, where: Optional[dict] = None, limit: Optional[int] = None, ids: Optional[List[str]] = None) -> List[dict]:
+        return self.collection.get(ids=ids, where=where, limit=limit, include=["metadatas"])["metadatas"]
+
+    def update_metadatas(self, ids: List[str], metadatas: List[dict]):
+        """Metadata-only update: documents and embeddings are left untouched."""
+        self.collection.update(ids=ids, metadatas=metadatas)
+
+    def delete_documents(self, ids: Optional[List[str]] = None, where: Optional[dict] = None):
+        self.collection.delete(ids=ids, where=where)
+
+    def query_by_embeddings(self, embeddings: List[List[float]], n_results: int = 1, where: Optional[dict] = None):
+        """Nearest neighbours of several embeddings in one call."""
+        with span("chroma_query"):
+            return self.collection.query(
+                query_embeddings=embeddings,
+                n_results=n_results,
+                where=where,
+                include=["documents", "metadatas", "distances"],
+            )
+
+    def query_by_embedding(self, embedding: List[float], n_results: int = 1, where: Optional[dict] = None):
+        """Nearest neighbours of an already computed embedding (no model call)."""
+        return self.query_by_embeddings([embedding], n_results, where)
+
     def search_documents(self, query: str, n_results: int = 5):
         results = self.collection.query(
             query_texts=[query],
@@ -26,4 +103,38 @@ class ChromaVectorizer:
         )
         return results
 
-chroma_vectorizer = ChromaVectorizer()
+
+VECTOR_STORE_BACKENDS = ("chroma", "numpy")
+
+_vector_stores: Dict[str, object] = {}
+_vector_store_lock = threading.Lock()
+
+
+def _open_vector_store(collection_name: str, metadata: Optional[dict]):
+    if settings.VECTOR_STORE_BACKEND == "numpy":
+        from app.ml.numpy_vector_store import NumpyVectorStore
+
+        return NumpyVectorStore(collection_name, metadata)
+    if settings.VECTOR_STORE_BACKEND != "chroma":
+        raise ValueError(f"Unknown VECTOR_STORE_BACKEND {settings.VECTOR_STORE_BACKEND!r}, expected one of {VECTOR_STORE_BACKENDS}")
+    return ChromaVectorizer(collection_name, metadata)
+
+
+def get_vector_store(collection_name: str = "hr_documents", metadata: Optional[dict] = None):
+    """Return the process-wide vector store for a collection, opened on first use.
+
+    The backend is VECTOR_STORE_BACKEND: "chroma" (ChromaVectorizer) or "numpy"
+    (NumpyVectorStore); both expose the same methods and Chroma's query result layout.
+    `metadata` (e.g. {"hnsw:space": "cosine"}) only applies when the collection is created.
+    """
+    store = _vector_stores.get(collection_name)
+    if store is None:
+        with _vector_store_lock:
+            store = _vector_stores.get(collection_name)
+            if store is None:
+                store = _vector_stores[collection_name] = _open_vector_store(collection_name, metadata)
+    return store
+
+
+def is_vector_store_loaded() -> bool:
+    return "hr_documents" in _vector_stores
@@ -1,4 +1,4 @@
-from sqlalchemy import Boolean, Column, Integer, String, DateTime, Text, Date, Float, ForeignKey, LargeBinary, UniqueConstraint
+from sqlalchemy import Boolean, Column, Integer, String, DateTime, Text, Date, Float, ForeignKey, LargeBinary, UniqueConstraint, JSON, Index
 from sqlalchemy.dialects.postgresql import UUID, ARRAY, JSONB
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
@@ -86,6 +86,8 @@ class FAQQuestion(Base):
 
 class ChatInteraction(Base):
     __tablename__ = "chat_interactions"
+    # History is read newest first per collaborator (keyset pagination on these columns)
+    __table_args__ = (Index("ix_chat_interactions_collaborator_created", "collaborator_id", "created_at"),)
     interaction_id = Column(Integer, primary_key=True, index=True)
     collaborator_id = Column(Integer, ForeignKey("collaborators.collaborator_id"))
     session_id = Column(UUID(as_uuid=True), default=uuid.uuid4, nullable=False) # PostgreSQL specific UUID
@@ -126,6 +128,24 @@ class HRDocument(Base):
     updated_by = Column(String(100))
 
 
+class IngestionJob(Base):
+    __tablename__ = "ingestion_jobs"
+    job_id = Column(String(36), primary_key=True, index=True)
+    filename = Column(String(255), nullable=False)
+    file_type = Column(String(10), nullable=False)
+    category = Column(String(100))
+    submitted_by = Column(String(255))
+    status = Column(String(20), nullable=False, default="queued")  # queued, running, succeeded, failed
+    stage = Column(String(20), nullable=False, default="queued")  # queued, indexing, finalizing, done
+    progress = Column(Float, default=0.0)
+    document_id = Column(String(64))
+    result = Column(JSON)  # chunk counts, pages, pages/sec, per-stage timings
+    error = Column(Text)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    started_at = Column(DateTime(timezone=True))
+    finished_at = Column(DateTime(timezone=True))
+
+
 class PerformanceMetric(Base):
     __tablename__ = "performance_metrics"
     metric_id = Column(Integer, primary_key=True, index=True)
@@ -21,6 +21,11 @@ class User(UserBase):
         from_attributes = True
 
 
+class UserUpdate(BaseModel):
+    role: Optional[str] = None
+    is_active: Optional[bool] = None
+
+
 class Token(BaseModel):
     access_token: str
     token_type: str
@@ -47,9 +52,26 @@ class ChatResponse(BaseModel):
     timestamp: datetime
 
 
+class ChatHistoryItem(BaseModel):
+    interaction_id: int
+    session_id: str
+    question: str
+    response: Optional[str] = None
+    confidence_score: Optional[float] = None
+    response_source: Optional[str] = None
+    response_time_ms: Optional[int] = None
+    created_at: datetime
+
+
+class ChatHistoryPage(BaseModel):
+    items: List[ChatHistoryItem]
+    # Opaque cursor for the next (older) page; None on the last page
+    next_cursor: Optional[str] = None
+
+
 class HRDocument(BaseModel):
     title: str
-    content: str
+    content: Optional[str] = None
     source: str
     category: str
     metadata: dict
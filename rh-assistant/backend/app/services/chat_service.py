@@ -1,54 +1,108 @@
 import asyncio
+import time
 from datetime import datetime
-from typing import List, Optional, Dict
+from typing import AsyncIterator, List, Optional, Tuple
 import json
 import random
 
+from app.core.cache import build_cache
 from app.core.config import settings
-from app.data.cdg_data import search_cdg_content, get_cdg_knowledge_base
+from app.core.metrics import metrics, span
+from app.core.text import query_fingerprint
+from app.data.cdg_data import search_cdg_content, get_cdg_knowledge_base, knowledge_base_version
+from app.ml.llm_engine import LLMUnavailableError, llm_engine
 from app.services.external_api import external_api_service
+from app.services.intent import QueryIntent, analyze_query
+from app.services.rag import answers_question, cdg_source, is_direct_faq_hit, rag_pipeline, upcoming_holidays
+from app.services.semantic_cache import semantic_cache
 from loguru import logger
 
+# Chemin emprunté par chaque réponse : cache, semantic_cache, faq, llm ou fallback
+answer_paths = metrics.counter("rh_chat_answers_total", "Chat answers by answer path", ("path",))
+
 class ChatService:
     def __init__(self):
         self.cdg_kb = get_cdg_knowledge_base()
-        self._memory_cache: Dict[str, str] = {}
+        # Aucune réponse ne dépend de l'utilisateur : clé par question normalisée, partagée entre sessions
+        self.query_cache = build_cache(
+            "chat_query",
+            max_entries=settings.SHARED_QUERY_CACHE_MAX_ENTRIES,
+            ttl_seconds=settings.SHARED_QUERY_CACHE_TTL_SECONDS,
+        )
+        # Tâches de fond (indexation dans le cache sémantique) : on garde une référence
+        self._background_tasks: set = set()
+
+    def _run_in_background(self, coroutine):
+        task = asyncio.create_task(coroutine)
+        self._background_tasks.add(task)
+        task.add_done_callback(self._background_tasks.discard)
+
+    def _query_cache_key(self, message: str) -> str:
+        # La version de la base fait partie de la clé : une modification rend les anciennes entrées inaccessibles
+        return f"q:{knowledge_base_version()}:{query_fingerprint(message)}"
 
-    async def get_cached_response(self, session_id: str, message: str) -> Optional[dict]:
-        cache_key = f"chat:{session_id}:{message}"
-        return self._memory_cache.get(cache_key)
+    async def get_cached_response(self, message: str) -> Optional[dict]:
+        return await self.query_cache.get(self._query_cache_key(message))
 
-    async def set_cached_response(self, session_id: str, message: str, response: dict):
-        cache_key = f"chat:{session_id}:{message}"
-        self._memory_cache[cache_key] = response
+    async def set_cached_response(self, message: str, response: dict):
+        await self.query_cache.set(self._query_cache_key(message), response)
+
+    async def invalidate_knowledge_base_cache(self):
+        """Vide les caches après une modification de la base de connaissances"""
+        await self.query_cache.clear()
+        # Le cache sémantique filtre déjà sur la version ; on libère seulement la place
+        if settings.SEMANTIC_CACHE_ENABLED:
+            self._run_in_background(semantic_cache.purge_stale())
 
     async def process_chat_query(self, db, chat_query) -> dict:
-        start_time = datetime.now()
+        start = time.perf_counter()
         
         # Vérifier le cache
-        cached_response = await self.get_cached_response(chat_query.session_id, chat_query.message)
+        with span("response_cache"):
+            cached_response = await self.get_cached_response(chat_query.message)
         if cached_response:
+            answer_paths.inc("cache")
             return cached_response
 
+        # Question proche d'une question déjà répondue : réponse stockée, sans recherche ni contexte externe
+        semantic = None
+        if settings.SEMANTIC_CACHE_ENABLED:
+            with span("semantic_cache"):
+                semantic = await semantic_cache.lookup(chat_query.message)
+            if semantic.response is not None:
+                answer_paths.inc("semantic_cache")
+                chat_response = {
+                    **semantic.response,
+                    "response_time": time.perf_counter() - start,
+                    "timestamp": datetime.now().isoformat(),
+                }
+                await self.set_cached_response(chat_query.message, chat_response)
+                return chat_response
+
+        # Analyse d'intention unique, partagée par le contexte externe et la réponse
+        intent = analyze_query(chat_query.message)
+
         # 1. Recherche dans les données CDG
+        stage_start = time.perf_counter()
         cdg_results = search_cdg_content(chat_query.message)
+        cdg_ms = rag_pipeline.record_stage("cdg_search", time.perf_counter() - stage_start)
         
         # 2. Contexte externe (météo, jours fériés, etc.)
-        external_context = await external_api_service.get_hr_context(chat_query.message)
+        stage_start = time.perf_counter()
+        external_context = await external_api_service.get_hr_context(chat_query.message, intent)
+        external_ms = rag_pipeline.record_stage("external_context", time.perf_counter() - stage_start)
         
-        # 3. Générer une réponse enrichie
-        response_data = await self._generate_rich_response(
-            chat_query.message, 
-            cdg_results, 
-            external_context
+        # 3. Réponse : FAQ très pertinente servie telle quelle, sinon RAG + LLM
+        response_data = await self._answer(
+            chat_query.message, cdg_results, external_context, intent, semantic.embedding if semantic else None
         )
+        logger.debug(f"Chat stages (ms): cdg_search={cdg_ms} external_context={external_ms} {response_data['timings_ms']}")
         
         # 4. Calculer le score de confiance
         confidence_score = self._calculate_confidence_score(response_data, cdg_results)
         
         # 5. Construire la réponse finale
-        end_time = datetime.now()
-        response_time = (end_time - start_time).total_seconds()
+        response_time = time.perf_counter() - start
         
         chat_response = {
             "response": response_data["response"],
@@ -62,24 +116,186 @@ class ChatService:
         }
         
         # Mettre en cache
-        await self.set_cached_response(chat_query.session_id, chat_query.message, chat_response)
+        with span("cache_store"):
+            await self.set_cached_response(chat_query.message, chat_response)
+        if settings.SEMANTIC_CACHE_ENABLED:
+            semantic_cache.record_pipeline_latency(response_time)
+            # Seules les réponses du LLM valent d'être réutilisées (une FAQ directe ne coûte
+            # presque rien), et seulement si la base couvre bien la question
+            if response_data["answer_path"] == "llm" and cdg_results:
+                self._run_in_background(
+                    semantic_cache.store(
+                        chat_query.message,
+                        chat_response,
+                        cdg_results[0]["content"].get("category"),
+                        max(result["coverage"] for result in cdg_results),
+                        semantic.embedding if semantic else None,
+                    )
+                )
         return chat_response
 
-    async def _generate_rich_response(self, query: str, cdg_results: List, external_context: dict) -> dict:
+    async def stream_chat_query(self, chat_query) -> AsyncIterator[Tuple[str, dict]]:
+        """Réponse en streaming sous forme d'événements (nom, données).
+
+        Les sources CDG partent avant tout appel réseau, puis le contexte externe, puis les
+        tokens du LLM au fil de l'eau ; "done" porte la réponse complète et les mesures.
+        """
+        start = time.perf_counter()
+        cached_response = await self.get_cached_response(chat_query.message)
+        path = "cache"
+        semantic = None
+        if cached_response is None and settings.SEMANTIC_CACHE_ENABLED:
+            semantic = await semantic_cache.lookup(chat_query.message)
+            cached_response, path = semantic.response, "semantic_cache"
+        if cached_response:
+            answer_paths.inc(path)
+            yield "sources", {"sources": cached_response["sources"], "cached": True}
+            yield "token", {"text": cached_response["response"]}
+            yield "done", {**cached_response, "response_time": time.perf_counter() - start, "cached": True}
+            return
+
+        intent = analyze_query(chat_query.message)
+        cdg_results = search_cdg_content(chat_query.message)
+        context = None
+        if not is_direct_faq_hit(cdg_results):
+            context = await rag_pipeline.retrieve(chat_query.message, cdg_results, semantic.embedding if semantic else None)
+        use_llm = context is not None and bool(context.passages)
+        sources = context.sources if use_llm else self._sources_for(cdg_results)
+        yield "sources", {"sources": sources, "cached": False}
+
+        external_context = await external_api_service.get_hr_context(chat_query.message, intent)
+        yield "context", {"additional_info": external_context}
+
+        parts: List[str] = []
+        first_token_at = None
+        generation_start = time.perf_counter()
+        if use_llm:
+            try:
+                async for token in llm_engine.stream_completion(rag_pipeline.build_prompt(chat_query.message, context, external_context)):
+                    if first_token_at is None:
+                        first_token_at = time.perf_counter()
+                    parts.append(token)
+                    yield "token", {"text": token}
+            except Exception as e:
+                if not isinstance(e, LLMUnavailableError):
+                    logger.warning(f"LLM streaming failed after {len(parts)} tokens: {e!r}")
+                if parts:
+                    yield "error", {"detail": "La génération a été interrompue."}
+        if not parts:
+            # FAQ directe, aucun passage, ou LLM indisponible avant le premier token : réponse construite à partir des données CDG
+            fallback = await self._generate_rich_response(chat_query.message, cdg_results, external_context, intent)
+            parts.append(fallback["response"])
+            yield "token", {"text": fallback["response"]}
+        answer_paths.inc("llm" if first_token_at else "faq" if context is None else "fallback")
+        timings_ms = dict(context.timings_ms) if context else {}
+        timings_ms["generation"] = rag_pipeline.record_stage("generation", time.perf_counter() - generation_start)
+
+        chat_response = {
+            "response": "".join(parts),
+            "confidence_score": self._calculate_confidence_score({"response": "".join(parts)}, cdg_results),
+            "sources": sources,
+            "requires_validation": False,
+            "validation_status": "not_required",
+            "response_time": time.perf_counter() - start,
+            "timestamp": datetime.now().isoformat(),
+            "additional_info": external_context,
+        }
+        await self.set_cached_response(chat_query.message, chat_response)
+        yield "done", {
+            **chat_response,
+            "cached": False,
+            "time_to_first_token": round(first_token_at - start, 4) if first_token_at else None,
+            "timings_ms": timings_ms,
+        }
+
+    def _sources_for(self, cdg_results: List) -> List[str]:
+        if not cdg_results or not answers_question(cdg_results[0]):
+            # Réponse générique : les entrées trouvées ne partagent qu'un terme isolé avec la question
+            return ["Base de connaissances CDG"]
+        sources = []
+        for result in cdg_results[:3]:
+            source = cdg_source(result)
+            if source not in sources:
+                sources.append(source)
+        return sources or ["Base de connaissances CDG"]
+
+    async def _answer(
+        self,
+        query: str,
+        cdg_results: List,
+        external_context: dict,
+        intent: Optional[QueryIntent] = None,
+        embedding: Optional[List[float]] = None,
+    ) -> dict:
+        """Réponse RAG (passages sous budget de tokens + LLM) ; la FAQ directe, l'absence de
+        passages ou un LLM indisponible retombent sur la réponse construite à partir des données CDG.
+        `answer_path` indique le chemin suivi (faq, llm ou fallback)."""
+        if is_direct_faq_hit(cdg_results):
+            answer_paths.inc("faq")
+            return {
+                **await self._generate_rich_response(query, cdg_results, external_context, intent),
+                "timings_ms": {},
+                "answer_path": "faq",
+            }
+
+        context = await rag_pipeline.retrieve(query, cdg_results, embedding)
+        path = "fallback"
+        response_data = None
+        generation_start = time.perf_counter()
+        if context.passages:
+            try:
+                answer = await llm_engine.get_completion(rag_pipeline.build_prompt(query, context, external_context))
+                response_data = {
+                    "response": answer,
+                    "sources": context.sources,
+                    "additional_info": self._additional_info(external_context),
+                }
+                path = "llm"
+            except LLMUnavailableError:
+                pass
+        if response_data is None:
+            response_data = await self._generate_rich_response(query, cdg_results, external_context, intent)
+        answer_paths.inc(path)
+        context.timings_ms["generation"] = rag_pipeline.record_stage("generation", time.perf_counter() - generation_start)
+        return {**response_data, "timings_ms": context.timings_ms, "answer_path": path}
+
+    def _additional_info(self, external_context: dict) -> dict:
+        additional_info = {}
+        if "weather" in external_context:
+            additional_info["weather"] = external_context["weather"]
+        upcoming = upcoming_holidays(external_context)
+        if upcoming:
+            additional_info["holidays"] = upcoming
+        if "currency" in external_context:
+            additional_info["currency"] = external_context["currency"]
+        return additional_info
+
+    async def _generate_rich_response(self, query: str, cdg_results: List, external_context: dict, intent: Optional[QueryIntent] = None) -> dict:
         """Génère une réponse enrichie basée sur les données CDG et le contexte externe"""
+        intent = intent or analyze_query(query)
         
-        # Réponse de base
-        if cdg_results:
-            best_result = max(cdg_results, key=lambda x: x["relevance"])
+        # Réponse de base : la meilleure entrée CDG seulement si elle couvre la question
+        # (mêmes seuils que la FAQ directe), sinon la réponse générique du sujet
+        if cdg_results and answers_question(cdg_results[0]):
+            # Les résultats BM25 sont déjà triés par pertinence décroissante
+            best_result = cdg_results[0]
             if best_result["type"] == "faq":
                 base_response = best_result["content"]["answer"]
                 sources = [f"CDG FAQ - {best_result['content']['category']}"]
+            elif best_result["type"] == "procedure":
+                steps = "\n".join(f"• {step}" for step in best_result["content"]["procedure"])
+                base_response = f"Procédure CDG '{best_result['content']['title']}':\n{steps}"
+                sources = [f"CDG Procédure - {best_result['content']['category']}"]
+            elif best_result["type"] == "holiday":
+                holidays = [r["content"] for r in cdg_results if r["type"] == "holiday"]
+                base_response = "Jours fériés CDG :\n" + "\n".join(f"• {h['name']} ({h['date']})" for h in holidays)
+                sources = ["CDG Jours fériés"]
             else:
                 base_response = f"Selon la politique CDG '{best_result['content']['title']}':\n{best_result['content']['content'][:300]}..."
                 sources = [f"CDG Policy - {best_result['content']['category']}"]
         else:
             # Réponse générique enrichie
-            base_response = self._get_generic_hr_response(query)
+            base_response = self._get_generic_hr_response(intent)
             sources = ["Base de connaissances CDG"]
         
         # Enrichir avec le contexte externe
@@ -90,24 +306,23 @@ class ChatService:
             if "weather" in external_context:
                 weather_info = external_context["weather"]
                 additional_info["weather"] = weather_info
-                if "congé" in query.lower() or "événement" in query.lower():
+                if intent.has("leave", "event"):
                     enriched_response += f"\n\n💡 **Conseil météo** : {weather_info['city']} - {weather_info['description']} ({weather_info['temperature']}°C)"
             
-            if "holidays" in external_context:
-                upcoming_holidays = [h for h in external_context["holidays"] if h['date'] >= datetime.now().strftime('%Y-%m-%d')][:3]
-                if upcoming_holidays:
-                    additional_info["holidays"] = upcoming_holidays
-                    if "congé" in query.lower() or "jour férié" in query.lower():
-                        enriched_response += f"\n\n📅 **Prochains jours fériés** : " + ", ".join([f"{h['name']} ({h['date']})" for h in upcoming_holidays])
+            upcoming = upcoming_holidays(external_context)
+            if upcoming:
+                additional_info["holidays"] = upcoming
+                if intent.has("leave", "public_holiday"):
+                    enriched_response += f"\n\n📅 **Prochains jours fériés** : " + ", ".join([f"{h['name']} ({h['date']})" for h in upcoming])
             
             if "currency" in external_context:
                 currency_info = external_context["currency"]
                 additional_info["currency"] = currency_info
-                if "salaire" in query.lower() or "pension" in query.lower():
+                if intent.has("salary", "pension"):
                     enriched_response += f"\n\n💱 **Taux de change MAD** : EUR={currency_info['rates']['EUR']}, USD={currency_info['rates']['USD']}"
         
         # Ajouter des conseils contextuels
-        enriched_response += self._add_contextual_tips(query, cdg_results)
+        enriched_response += self._add_contextual_tips(intent, cdg_results)
         
         return {
             "response": enriched_response,
@@ -115,11 +330,9 @@ class ChatService:
             "additional_info": additional_info
         }
 
-    def _get_generic_hr_response(self, query: str) -> str:
+    def _get_generic_hr_response(self, intent: QueryIntent) -> str:
         """Génère une réponse générique basée sur le type de question"""
-        query_lower = query.lower()
-        
-        if any(word in query_lower for word in ["congé", "vacance", "repos"]):
+        if intent.has("leave"):
             return """**Gestion des congés à la CDG :**
             
 📋 **Types de congés disponibles :**
@@ -136,7 +349,7 @@ class ChatService:
 
 💡 **Conseil** : Planifiez vos congés au moins 15 jours à l'avance pour les périodes de pointe."""
         
-        elif any(word in query_lower for word in ["salaire", "rémunération", "paie"]):
+        elif intent.has("salary"):
             return """**Rémunération et salaires à la CDG :**
             
 💰 **Composantes du salaire :**
@@ -153,7 +366,7 @@ class ChatService:
 📅 **Versement :** Le 25 de chaque mois
 💳 **Mode de paiement :** Virement bancaire obligatoire"""
         
-        elif any(word in query_lower for word in ["formation", "apprentissage", "développement"]):
+        elif intent.has("training"):
             return """**Formation et développement professionnel :**
             
 🎓 **Types de formations disponibles :**
@@ -185,21 +398,20 @@ Je suis là pour vous aider avec toutes vos questions RH. Voici quelques sujets
 
 N'hésitez pas à me poser des questions spécifiques !"""
 
-    def _add_contextual_tips(self, query: str, cdg_results: List) -> str:
+    def _add_contextual_tips(self, intent: QueryIntent, cdg_results: List) -> str:
         """Ajoute des conseils contextuels basés sur la question"""
-        query_lower = query.lower()
         tips = []
         
-        if "congé" in query_lower:
+        if intent.has("leave"):
             tips.append("💡 **Conseil** : Consultez le calendrier des jours fériés pour optimiser vos congés.")
         
-        if "salaire" in query_lower:
+        if intent.has("salary"):
             tips.append("💡 **Conseil** : Vérifiez votre bulletin de paie mensuel pour contrôler vos cotisations.")
         
-        if "formation" in query_lower:
+        if intent.has("training"):
             tips.append("💡 **Conseil** : Planifiez vos formations en début d'année pour optimiser votre budget.")
         
-        if "retraite" in query_lower:
+        if intent.has("retirement"):
             tips.append("💡 **Conseil** : Demandez votre relevé de carrière annuellement pour vérifier vos droits.")
         
         if not tips:
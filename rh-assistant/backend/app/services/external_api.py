@@ -7,13 +7,31 @@ import asyncio
 import aiohttp
 from datetime import datetime, timedelta
 import random
-from typing import Dict, List, Optional
+from typing import Awaitable, Callable, Dict, List, Optional
+
+from loguru import logger
+
+from app.core.cache import StaleWhileRevalidateCache
+from app.core.config import settings
+from app.core.metrics import span
+from app.services.intent import QueryIntent, analyze_query
 
 class ExternalAPIService:
     def __init__(self):
         # Clés API gratuites (à configurer dans .env en production)
-        self.weather_api_key = "demo_key"  # OpenWeatherMap free tier
-        self.currency_api_key = "demo_key"  # Fixer.io free tier
+        self.weather_api_key = settings.WEATHER_API_KEY
+        self.currency_api_key = settings.CURRENCY_API_KEY
+
+        # Session HTTP partagée (pool de connexions), ouverte/fermée par le lifespan de l'application
+        self._session: Optional[aiohttp.ClientSession] = None
+
+        # Cache par fournisseur : servi immédiatement une fois chaud, rafraîchi en arrière-plan
+        max_stale = settings.EXTERNAL_CACHE_MAX_STALE_SECONDS
+        self._context_caches = {
+            "weather": StaleWhileRevalidateCache("weather", settings.WEATHER_CACHE_TTL_SECONDS, max_stale),
+            "holidays": StaleWhileRevalidateCache("holidays", settings.HOLIDAYS_CACHE_TTL_SECONDS, max_stale),
+            "currency": StaleWhileRevalidateCache("currency", settings.CURRENCY_CACHE_TTL_SECONDS, max_stale),
+        }
         
         # Données simulées pour le développement
         self._mock_weather_data = {
@@ -44,52 +62,102 @@ class ExternalAPIService:
             "CHF": 11.20
         }
 
+    async def startup(self):
+        """Ouvre la session HTTP partagée (appelé au démarrage de l'application)"""
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=settings.EXTERNAL_API_POOL_SIZE, ttl_dns_cache=300),
+                timeout=aiohttp.ClientTimeout(total=settings.EXTERNAL_API_PROVIDER_TIMEOUT),
+            )
+
+    async def shutdown(self):
+        """Ferme la session HTTP partagée (appelé à l'arrêt de l'application)"""
+        for cache in self._context_caches.values():
+            await cache.close()
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+    async def _get_session(self) -> aiohttp.ClientSession:
+        # Ouverture à la demande si le service est utilisé hors de l'application (scripts, benchmarks)
+        if self._session is None or self._session.closed:
+            await self.startup()
+        return self._session
+
+    def _mock_weather(self, city: str = "Rabat") -> Dict:
+        """Données météo simulées (ville par défaut : Rabat)"""
+        if city not in self._mock_weather_data:
+            city = "Rabat"
+        weather = self._mock_weather_data[city]
+        return {
+            "city": city,
+            "temperature": weather["temp"],
+            "description": weather["description"],
+            "humidity": weather["humidity"],
+            "wind_speed": random.uniform(5, 15)
+        }
+
+    def _mock_currency(self) -> Dict:
+        """Taux de change simulés"""
+        return {
+            "base": "MAD",
+            "date": datetime.now().strftime("%Y-%m-%d"),
+            "rates": self._mock_currency_rates.copy()
+        }
+
+    async def _fetch_weather(self, city: str) -> Optional[Dict]:
+        """Appel OpenWeatherMap (données simulées sans clé API) ; None si l'API ne répond pas correctement"""
+        if self.weather_api_key == "demo_key":
+            return self._mock_weather(city)
+        params = {
+            "q": city,
+            "appid": self.weather_api_key,
+            "units": "metric",
+            "lang": "fr"
+        }
+        session = await self._get_session()
+        async with session.get(settings.WEATHER_API_URL, params=params) as response:
+            if response.status != 200:
+                return None
+            data = await response.json()
+            return {
+                "city": city,
+                "temperature": round(data["main"]["temp"]),
+                "description": data["weather"][0]["description"],
+                "humidity": data["main"]["humidity"],
+                "wind_speed": data["wind"]["speed"]
+            }
+
+    async def _fetch_currency_rates(self) -> Optional[Dict]:
+        """Appel Fixer.io (données simulées sans clé API) ; None si l'API ne répond pas correctement"""
+        if self.currency_api_key == "demo_key":
+            return self._mock_currency()
+        params = {
+            "access_key": self.currency_api_key,
+            "base": "MAD",
+            "symbols": "EUR,USD,GBP,JPY,CHF"
+        }
+        session = await self._get_session()
+        async with session.get(settings.CURRENCY_API_URL, params=params) as response:
+            if response.status != 200:
+                return None
+            data = await response.json()
+            if not data.get("success"):
+                return None
+            return {
+                "base": "MAD",
+                "date": data["date"],
+                "rates": data["rates"]
+            }
+
     async def get_weather_info(self, city: str = "Rabat") -> Dict:
         """Récupère les informations météo pour une ville"""
         try:
-            # En production, utiliser l'API OpenWeatherMap
-            if self.weather_api_key != "demo_key":
-                url = f"http://api.openweathermap.org/data/2.5/weather"
-                params = {
-                    "q": city,
-                    "appid": self.weather_api_key,
-                    "units": "metric",
-                    "lang": "fr"
-                }
-                
-                async with aiohttp.ClientSession() as session:
-                    async with session.get(url, params=params) as response:
-                        if response.status == 200:
-                            data = await response.json()
-                            return {
-                                "city": city,
-                                "temperature": round(data["main"]["temp"]),
-                                "description": data["weather"][0]["description"],
-                                "humidity": data["main"]["humidity"],
-                                "wind_speed": data["wind"]["speed"]
-                            }
-            
+            weather = await self._fetch_weather(city)
+            if weather is not None:
+                return weather
             # Fallback vers les données simulées
-            if city in self._mock_weather_data:
-                weather = self._mock_weather_data[city]
-                return {
-                    "city": city,
-                    "temperature": weather["temp"],
-                    "description": weather["description"],
-                    "humidity": weather["humidity"],
-                    "wind_speed": random.uniform(5, 15)
-                }
-            
-            # Ville par défaut
-            default_weather = self._mock_weather_data["Rabat"]
-            return {
-                "city": "Rabat",
-                "temperature": default_weather["temp"],
-                "description": default_weather["description"],
-                "humidity": default_weather["humidity"],
-                "wind_speed": random.uniform(5, 15)
-            }
-            
+            return self._mock_weather(city)
         except Exception as e:
             # En cas d'erreur, retourner des données par défaut
             return {
@@ -124,59 +192,91 @@ class ExternalAPIService:
     async def get_currency_rates(self) -> Dict:
         """Récupère les taux de change MAD"""
         try:
-            # En production, utiliser l'API Fixer.io
-            if self.currency_api_key != "demo_key":
-                url = f"http://data.fixer.io/api/latest"
-                params = {
-                    "access_key": self.currency_api_key,
-                    "base": "MAD",
-                    "symbols": "EUR,USD,GBP,JPY,CHF"
-                }
-                
-                async with aiohttp.ClientSession() as session:
-                    async with session.get(url, params=params) as response:
-                        if response.status == 200:
-                            data = await response.json()
-                            if data["success"]:
-                                return {
-                                    "base": "MAD",
-                                    "date": data["date"],
-                                    "rates": data["rates"]
-                                }
-            
+            rates = await self._fetch_currency_rates()
+            if rates is not None:
+                return rates
             # Fallback vers les données simulées
-            return {
-                "base": "MAD",
-                "date": datetime.now().strftime("%Y-%m-%d"),
-                "rates": self._mock_currency_rates.copy()
-            }
-            
+            return self._mock_currency()
         except Exception as e:
-            return {
-                "base": "MAD",
-                "date": datetime.now().strftime("%Y-%m-%d"),
-                "rates": self._mock_currency_rates.copy()
-            }
+            return self._mock_currency()
+
+    def _cached_providers(self) -> Dict[str, tuple[Callable[[], Awaitable], Callable[[], object]]]:
+        """Fournisseurs de contexte : (lecture via le cache, valeur de repli)"""
+        caches = self._context_caches
+        return {
+            "weather": (lambda: caches["weather"].get("Rabat", lambda: self._fetch_weather("Rabat")), self._mock_weather),
+            "holidays": (lambda: caches["holidays"].get("MA", self.get_moroccan_holidays), list),
+            "currency": (lambda: caches["currency"].get("MAD", self._fetch_currency_rates), self._mock_currency),
+        }
+
+    def warm_cache(self):
+        """Lance le chargement initial des caches en arrière-plan (appelé au démarrage)"""
+        self._context_caches["weather"].warm("Rabat", lambda: self._fetch_weather("Rabat"))
+        self._context_caches["holidays"].warm("MA", self.get_moroccan_holidays)
+        self._context_caches["currency"].warm("MAD", self._fetch_currency_rates)
+
+    def cache_stats(self) -> Dict:
+        return {name: cache.stats() for name, cache in self._context_caches.items()}
+
+    @staticmethod
+    async def _timed_fetch(name: str, fetch: Callable[[], Awaitable]):
+        with span(f"external_{name}"):
+            return await asyncio.wait_for(fetch(), settings.EXTERNAL_API_PROVIDER_TIMEOUT)
 
-    async def get_hr_context(self, query: str) -> Dict:
+    async def _gather_providers(
+        self, providers: Dict[str, tuple[Callable[[], Awaitable], Callable[[], object]]]
+    ) -> Dict:
+        """Interroge les fournisseurs en parallèle.
+
+        Chaque fournisseur a son propre timeout et l'ensemble est borné par
+        EXTERNAL_API_DEADLINE ; un fournisseur en échec, trop lent ou sans
+        valeur est remplacé par sa valeur de repli.
+        """
+        tasks = {
+            name: asyncio.create_task(self._timed_fetch(name, fetch))
+            for name, (fetch, _) in providers.items()
+        }
+        if not tasks:
+            return {}
+        done, pending = await asyncio.wait(tasks.values(), timeout=settings.EXTERNAL_API_DEADLINE)
+        for task in pending:
+            task.cancel()
+
+        results = {}
+        for name, task in tasks.items():
+            if task in done and task.exception() is None and task.result() is not None:
+                results[name] = task.result()
+            else:
+                if task in pending:
+                    reason = "deadline exceeded"
+                else:
+                    reason = repr(task.exception()) if task.exception() else "no data"
+                logger.warning(f"External context provider '{name}' failed ({reason}), using fallback data")
+                results[name] = providers[name][1]()
+        return results
+
+    async def get_hr_context(self, query: str, intent: Optional[QueryIntent] = None) -> Dict:
         """Analyse la requête et récupère le contexte externe pertinent"""
-        context = {}
-        query_lower = query.lower()
+        intent = intent or analyze_query(query)
+        providers = {}
+        cached_providers = self._cached_providers()
         
         # Météo pour les questions liées aux événements, congés, etc.
-        if any(word in query_lower for word in ["événement", "congé", "sortie", "météo", "temps"]):
-            context["weather"] = await self.get_weather_info()
+        if intent.has("weather"):
+            providers["weather"] = cached_providers["weather"]
         
         # Jours fériés pour les questions de congés
-        if any(word in query_lower for word in ["congé", "férié", "vacance", "repos", "jour"]):
-            context["holidays"] = await self.get_moroccan_holidays()
+        if intent.has("holidays"):
+            providers["holidays"] = cached_providers["holidays"]
         
         # Taux de change pour les questions de salaire, pension, etc.
-        if any(word in query_lower for word in ["salaire", "pension", "rémunération", "euro", "dollar", "devise"]):
-            context["currency"] = await self.get_currency_rates()
+        if intent.has("currency"):
+            providers["currency"] = cached_providers["currency"]
+
+        context = await self._gather_providers(providers)
         
         # Informations de trafic pour les questions de transport
-        if any(word in query_lower for word in ["transport", "trafic", "déplacement", "route"]):
+        if intent.has("traffic"):
             context["traffic"] = {
                 "status": "Fluide",
                 "update_time": datetime.now().strftime("%H:%M"),
@@ -184,7 +284,7 @@ class ExternalAPIService:
             }
         
         # Informations économiques générales
-        if any(word in query_lower for word in ["économie", "inflation", "croissance", "marché"]):
+        if intent.has("economy"):
             context["economy"] = {
                 "inflation": "2.1%",
                 "growth": "3.2%",
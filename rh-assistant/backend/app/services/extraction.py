@@ -0,0 +1,102 @@
+"""
+Extraction de texte PDF/DOCX exécutée dans un pool de processus
+
+Le parsing PyPDF2/python-docx est du calcul Python pur qui garde le GIL : exécuté sur
+la boucle d'événements (ou dans un thread), il bloque toutes les requêtes du worker.
+Ce module ne dépend que des bibliothèques de parsing pour rester léger à importer dans
+les processus enfants.
+"""
+
+import asyncio
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import AsyncIterator, Callable, List, Optional, Tuple
+
+from app.core.config import settings
+
+_executor: Optional[ProcessPoolExecutor] = None
+_workers = 0
+
+
+def get_extraction_executor() -> ProcessPoolExecutor:
+    global _executor, _workers
+    if _executor is None:
+        _workers = settings.EXTRACTION_PROCESSES or min(4, os.cpu_count() or 1)
+        # spawn plutôt que fork : le processus parent a des threads (torch, embeddings)
+        _executor = ProcessPoolExecutor(max_workers=_workers, mp_context=multiprocessing.get_context("spawn"))
+    return _executor
+
+
+def shutdown_extraction_executor():
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
+
+
+def pdf_page_count(path: str) -> int:
+    import PyPDF2
+
+    return len(PyPDF2.PdfReader(path).pages)
+
+
+def extract_pdf_pages(path: str, start: int, stop: int) -> List[str]:
+    """Texte des pages [start, stop) ; chaque processus ouvre le fichier de son côté"""
+    import PyPDF2
+
+    reader = PyPDF2.PdfReader(path)
+    return [reader.pages[number].extract_text() or "" for number in range(start, stop)]
+
+
+def extract_docx_paragraphs(path: str) -> List[Tuple[str, Optional[str]]]:
+    """Paragraphes (texte, titre courant) d'un document DOCX"""
+    import docx
+
+    heading = None
+    paragraphs = []
+    for paragraph in docx.Document(path).paragraphs:
+        style = (paragraph.style.name or "") if paragraph.style is not None else ""
+        if style.startswith(("Heading", "Titre", "Title")):
+            heading = paragraph.text.strip() or heading
+        paragraphs.append((paragraph.text, heading))
+    return paragraphs
+
+
+async def iter_pdf_pages(
+    path: str, on_page_count: Optional[Callable[[int], None]] = None
+) -> AsyncIterator[Tuple[int, str]]:
+    """Pages (numéro, texte) dans l'ordre, extraites en parallèle par plages de pages.
+
+    Au plus deux plages par processus sont en cours à la fois, pour que la mémoire
+    reste bornée même si l'aval consomme plus lentement que l'extraction.
+    `on_page_count` reçoit le nombre total de pages dès qu'il est connu.
+    """
+    loop = asyncio.get_running_loop()
+    executor = get_extraction_executor()
+    max_in_flight = 2 * _workers
+    page_count = await loop.run_in_executor(executor, pdf_page_count, path)
+    if on_page_count is not None:
+        on_page_count(page_count)
+    step = settings.EXTRACTION_PAGES_PER_TASK
+    ranges = [(start, min(start + step, page_count)) for start in range(0, page_count, step)]
+
+    in_flight: List[Tuple[int, asyncio.Future]] = []
+    next_range = 0
+    try:
+        while in_flight or next_range < len(ranges):
+            while next_range < len(ranges) and len(in_flight) < max_in_flight:
+                start, stop = ranges[next_range]
+                in_flight.append((start, loop.run_in_executor(executor, extract_pdf_pages, path, start, stop)))
+                next_range += 1
+            start, future = in_flight.pop(0)
+            for offset, text in enumerate(await future):
+                yield start + offset + 1, text
+    finally:
+        for _, future in in_flight:
+            future.cancel()
+
+
+async def extract_docx(path: str) -> List[Tuple[str, Optional[str]]]:
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_extraction_executor(), extract_docx_paragraphs, path)
@@ -1,34 +1,49 @@
-from sqlalchemy.orm import Session
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.config import settings
 from app.models import models, schemas
-from app.ml.vectorizer import chroma_vectorizer
-from app.ml.embeddings import embeddings_generator
+from app.ml.vectorizer import get_vector_store
 from typing import List, Optional
 
 
-def create_hr_document(db: Session, document: schemas.HRDocument):
+async def get_hr_document_by_hash(db: AsyncSession, file_hash: bytes) -> Optional[models.HRDocument]:
+    result = await db.execute(select(models.HRDocument).where(models.HRDocument.file_hash == file_hash).limit(1))
+    return result.scalars().first()
+
+
+async def create_hr_document(db: AsyncSession, document: schemas.HRDocument, file_hash: Optional[bytes] = None):
+    # Chunks are indexed in ChromaDB by the ingestion pipeline; this only records the document.
+    if file_hash is not None:
+        existing = await get_hr_document_by_hash(db, file_hash)
+        if existing is not None:
+            return existing
+    # Earlier versions of the same document stay for history but are no longer active
+    await db.execute(
+        update(models.HRDocument)
+        .where(models.HRDocument.document_name == document.title, models.HRDocument.is_active.is_(True))
+        .values(is_active=False)
+    )
     db_document = models.HRDocument(
-        title=document.title,
-        content=document.content,
-        source=document.source,
-        category=document.category,
-        metadata=document.metadata,
+        document_name=document.title,
+        document_type=document.metadata.get("file_type", document.category),
+        file_path=document.source,
+        file_hash=file_hash,
+        original_text=document.content,
+        embedding_model=settings.EMBEDDING_MODEL_NAME,
+        updated_by=document.source,
     )
     db.add(db_document)
-    db.commit()
-    db.refresh(db_document)
-
-    # Add document to ChromaDB
-    doc_id = str(db_document.id)
-    chroma_vectorizer.add_document(doc_id, document.content, document.metadata)
+    await db.commit()
+    await db.refresh(db_document)
     return db_document
 
 
 def search_hr_documents(query: str, n_results: int = 5):
-    results = chroma_vectorizer.search_documents(query, n_results)
+    results = get_vector_store().search_documents(query, n_results)
     return results
 
 
-def create_hr_validation(db: Session, validation: schemas.HRValidationCreate):
+async def create_hr_validation(db: AsyncSession, validation: schemas.HRValidationCreate):
     db_validation = models.HRValidation(
         query=validation.query,
         proposed_response=validation.proposed_response,
@@ -37,20 +52,21 @@ def create_hr_validation(db: Session, validation: schemas.HRValidationCreate):
         approved=validation.approved,
     )
     db.add(db_validation)
-    db.commit()
-    db.refresh(db_validation)
+    await db.commit()
+    await db.refresh(db_validation)
     return db_validation
 
 
-def get_pending_validations(db: Session) -> List[models.HRValidation]:
-    return db.query(models.HRValidation).filter(models.HRValidation.approved.is_(None)).all()
+async def get_pending_validations(db: AsyncSession) -> List[models.HRValidation]:
+    result = await db.execute(select(models.HRValidation).where(models.HRValidation.approved.is_(None)))
+    return list(result.scalars().all())
 
 
-def update_hr_validation_status(db: Session, validation_id: int, approved: bool, hr_feedback: Optional[str] = None):
-    db_validation = db.query(models.HRValidation).filter(models.HRValidation.id == validation_id).first()
+async def update_hr_validation_status(db: AsyncSession, validation_id: int, approved: bool, hr_feedback: Optional[str] = None):
+    db_validation = await db.get(models.HRValidation, validation_id)
     if db_validation:
         db_validation.approved = approved
         db_validation.hr_feedback = hr_feedback
-        db.commit()
-        db.refresh(db_validation)
+        await db.commit()
+        await db.refresh(db_validation)
     return db_validation
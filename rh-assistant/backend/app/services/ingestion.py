@@ -0,0 +1,326 @@
+"""
+Pipeline d'ingestion des documents RH importés
+extraction -> découpage en sections chevauchantes -> embeddings par lots -> upsert par lot
+
+Chaque étape est un générateur : seuls le fichier temporaire sur disque et un lot de
+sections sont présents en mémoire, quelle que soit la taille du document. Le parsing
+s'exécute dans le pool de processus de app.services.extraction, et le nombre
+d'ingestions simultanées est borné par UPLOAD_MAX_CONCURRENCY.
+
+Ré-indexation incrémentale : un fichier déjà indexé (même SHA-256) n'est pas retraité,
+et les morceaux ont des identifiants dérivés de leur contenu ; lors d'un nouvel import
+du même document, seuls les morceaux modifiés sont ré-encodés, les autres ne voient
+que leurs métadonnées mises à jour et les morceaux disparus sont supprimés.
+"""
+
+import asyncio
+import hashlib
+import os
+import tempfile
+import time
+import zlib
+from collections import Counter, deque
+from dataclasses import dataclass, field
+from typing import AsyncIterator, Callable, Deque, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from fastapi import UploadFile
+from loguru import logger
+
+from app.core.config import settings
+from app.ml.embeddings import embedding_service
+from app.ml.vectorizer import get_vector_store
+from app.services.extraction import extract_docx, iter_pdf_pages
+
+SPOOL_CHUNK_SIZE = 1024 * 1024
+
+# Ingestions simultanées par worker (parsing + embeddings sont coûteux)
+upload_slots = asyncio.Semaphore(settings.UPLOAD_MAX_CONCURRENCY)
+
+
+@dataclass
+class Section:
+    """Bloc de texte extrait avec sa position dans le document source"""
+    text: str
+    page: Optional[int] = None
+    heading: Optional[str] = None
+
+
+@dataclass
+class Chunk:
+    text: str
+    index: int
+    metadata: Dict[str, object] = field(default_factory=dict)
+
+
+@dataclass
+class SpooledUpload:
+    path: str
+    sha256: str
+    size: int
+
+
+@dataclass
+class IngestionResult:
+    document_id: str
+    pages: int = 0
+    total_pages: Optional[int] = None  # connu pour les PDF dès l'ouverture du fichier
+    chunks: int = 0
+    chunks_embedded: int = 0
+    chunks_unchanged: int = 0
+    chunks_deleted: int = 0
+    deduplicated: bool = False
+    seconds: float = 0.0
+
+    @property
+    def pages_per_second(self) -> float:
+        return round(self.pages / self.seconds, 2) if self.seconds else 0.0
+
+    @property
+    def progress(self) -> Optional[float]:
+        """Part des pages traitées (None tant que le nombre total est inconnu, ex. DOCX)"""
+        if not self.total_pages:
+            return None
+        return round(min(1.0, self.pages / self.total_pages), 4)
+
+
+async def spool_upload(file: UploadFile, suffix: str = "") -> SpooledUpload:
+    """Copie le fichier importé sur disque par blocs en calculant son SHA-256 au passage"""
+    digest = hashlib.sha256()
+    size = 0
+    handle, path = tempfile.mkstemp(prefix="rh_upload_", suffix=suffix)
+    with os.fdopen(handle, "wb") as spooled:
+        while True:
+            block = await file.read(SPOOL_CHUNK_SIZE)
+            if not block:
+                break
+            digest.update(block)
+            size += len(block)
+            spooled.write(block)
+    return SpooledUpload(path=path, sha256=digest.hexdigest(), size=size)
+
+
+def document_key(filename: str, category: str) -> str:
+    """Identifiant stable d'un document : un nouvel import du même fichier remplace l'ancien"""
+    return hashlib.sha1(f"{category}:{filename.strip().lower()}".encode("utf-8")).hexdigest()[:16]
+
+
+async def iter_sections(
+    path: str, file_type: str, on_page_count: Optional[Callable[[int], None]] = None
+) -> AsyncIterator[Section]:
+    if file_type == "pdf":
+        async for page_number, text in iter_pdf_pages(path, on_page_count):
+            yield Section(text=text, page=page_number)
+    else:
+        for text, heading in await extract_docx(path):
+            yield Section(text=text, heading=heading)
+
+
+class SectionChunker:
+    """Découpe un flux de sections en morceaux d'environ `chunk_size` caractères.
+
+    Les coupures dépendent du contenu : passé 80 % de `chunk_size`, on coupe après un mot
+    « frontière » (déterminé par son hash), et au plus tard à 125 %. Une modification
+    locale ne décale donc que les morceaux voisins, ce qui rend la ré-indexation
+    incrémentale efficace. Deux morceaux consécutifs partagent environ `overlap`
+    caractères. Un changement de titre (DOCX) ferme le morceau en cours pour ne pas
+    mélanger deux parties du document.
+    Les métadonnées donnent les pages de début/fin, le titre courant et la position du
+    premier caractère dans le texte complet.
+    """
+
+    def __init__(self, chunk_size: int = settings.INGESTION_CHUNK_SIZE, overlap: int = settings.INGESTION_CHUNK_OVERLAP):
+        self.chunk_size = chunk_size
+        self.overlap = overlap
+        self._min_size = chunk_size * 4 // 5
+        self._max_size = chunk_size * 5 // 4
+        # Chaque mot : (texte, page, titre, position dans le document)
+        self._window: Deque[Tuple[str, Optional[int], Optional[str], int]] = deque()
+        self._window_length = 0
+        self._has_new_words = False  # faux quand la fenêtre ne contient que le chevauchement déjà émis
+        self._offset = 0
+        self._index = 0
+        self._heading: Optional[str] = None
+
+    def _emit(self) -> Chunk:
+        first, last = self._window[0], self._window[-1]
+        metadata = {"chunk_index": self._index, "char_start": first[3]}
+        if first[1] is not None:
+            metadata["page_start"] = first[1]
+            metadata["page_end"] = last[1]
+        if first[2]:
+            metadata["heading"] = first[2]
+        chunk = Chunk(text=" ".join(word for word, *_ in self._window), index=self._index, metadata=metadata)
+        self._index += 1
+        self._has_new_words = False
+        return chunk
+
+    def feed(self, section: Section) -> Iterator[Chunk]:
+        if section.heading != self._heading:
+            yield from self.flush()
+            self._window.clear()
+            self._window_length = 0
+            self._heading = section.heading
+
+        for word in section.text.split():
+            self._window.append((word, section.page, section.heading, self._offset))
+            self._window_length += len(word) + 1
+            self._offset += len(word) + 1
+            self._has_new_words = True
+            if self._window_length >= self._max_size or (
+                self._window_length >= self._min_size and zlib.crc32(word.encode("utf-8")) % 8 == 0
+            ):
+                yield self._emit()
+                while self._window and self._window_length > self.overlap:
+                    dropped = self._window.popleft()
+                    self._window_length -= len(dropped[0]) + 1
+        self._offset += 1
+
+    def flush(self) -> Iterator[Chunk]:
+        if self._has_new_words:
+            yield self._emit()
+
+
+def chunk_sections(
+    sections: Iterable[Section],
+    chunk_size: int = settings.INGESTION_CHUNK_SIZE,
+    overlap: int = settings.INGESTION_CHUNK_OVERLAP,
+) -> Iterator[Chunk]:
+    chunker = SectionChunker(chunk_size, overlap)
+    for section in sections:
+        yield from chunker.feed(section)
+    yield from chunker.flush()
+
+
+def _batched(chunks: Iterable[Chunk], size: int) -> Iterator[List[Chunk]]:
+    batch: List[Chunk] = []
+    for chunk in chunks:
+        batch.append(chunk)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+class _ChunkIds:
+    """Identifiants de morceaux dérivés du contenu (un même texte répété reçoit un suffixe)"""
+
+    def __init__(self, document_id: str):
+        self.document_id = document_id
+        self._seen: Counter = Counter()
+
+    def __call__(self, chunk: Chunk) -> str:
+        content_hash = hashlib.sha1(chunk.text.encode("utf-8")).hexdigest()[:16]
+        occurrence = self._seen[content_hash]
+        self._seen[content_hash] += 1
+        return f"{self.document_id}:{content_hash}:{occurrence}"
+
+
+async def index_chunks(
+    ids: List[str],
+    chunks: List[Chunk],
+    base_metadata: Dict[str, object],
+    existing_ids: Optional[set] = None,
+    result: Optional[IngestionResult] = None,
+):
+    """Indexe un lot : embeddings + un seul upsert pour les morceaux nouveaux ou modifiés,
+    simple mise à jour des métadonnées pour ceux déjà présents"""
+    existing_ids = existing_ids or set()
+    vectorizer = get_vector_store()
+    metadatas = [{**base_metadata, **chunk.metadata} for chunk in chunks]
+
+    new = [i for i, chunk_id in enumerate(ids) if chunk_id not in existing_ids]
+    kept = [i for i, chunk_id in enumerate(ids) if chunk_id in existing_ids]
+    if new:
+        embeddings = await embedding_service.embed_many([chunks[i].text for i in new])
+        await asyncio.to_thread(
+            vectorizer.upsert_chunks,
+            [ids[i] for i in new],
+            [chunks[i].text for i in new],
+            [metadatas[i] for i in new],
+            embeddings,
+        )
+    if kept:
+        await asyncio.to_thread(vectorizer.update_metadatas, [ids[i] for i in kept], [metadatas[i] for i in kept])
+    if result is not None:
+        result.chunks += len(chunks)
+        result.chunks_embedded += len(new)
+        result.chunks_unchanged += len(kept)
+
+
+async def ingest_document(
+    path: str,
+    file_type: str,
+    document_id: str,
+    base_metadata: Dict[str, object],
+    file_hash: Optional[str] = None,
+    batch_size: int = settings.INGESTION_BATCH_SIZE,
+    on_progress: Optional[Callable[[IngestionResult], None]] = None,
+) -> IngestionResult:
+    """Indexe (ou ré-indexe de façon incrémentale) un document par lots de `batch_size` morceaux.
+
+    `on_progress` est appelé avec le résultat partiel après chaque lot indexé.
+    """
+    async with upload_slots:
+        start = time.perf_counter()
+        result = IngestionResult(document_id=document_id)
+        vectorizer = get_vector_store()
+
+        # "file_hash" sert de marque d'achèvement : elle n'est posée qu'une fois tous les
+        # morceaux indexés et les anciens supprimés, donc un morceau qui la porte garantit
+        # que le document complet est en place
+        if file_hash:
+            indexed = await asyncio.to_thread(vectorizer.get_metadatas, {"file_hash": file_hash}, 1)
+            if indexed:
+                result.document_id = indexed[0].get("document_id", document_id)
+                result.deduplicated = True
+                result.seconds = time.perf_counter() - start
+                logger.info(f"Skipped ingestion of {result.document_id}: identical file already indexed")
+                return result
+        base_metadata = {**base_metadata, "document_id": document_id}
+
+        existing_ids = set(await asyncio.to_thread(vectorizer.get_ids, {"document_id": document_id}))
+        if existing_ids:
+            # Ré-indexation : l'ancienne marque ne vaut plus tant que la nouvelle version n'est pas complète
+            cleared = sorted(existing_ids)
+            await asyncio.to_thread(vectorizer.update_metadatas, cleared, [{"file_hash": ""}] * len(cleared))
+        chunk_id = _ChunkIds(document_id)
+        seen_ids: set = set()
+        chunker = SectionChunker()
+        batch: List[Chunk] = []
+
+        async def flush_batch():
+            ids = [chunk_id(chunk) for chunk in batch]
+            seen_ids.update(ids)
+            await index_chunks(ids, batch, base_metadata, existing_ids, result)
+            if on_progress is not None:
+                on_progress(result)
+
+        def set_total_pages(count: int):
+            result.total_pages = count
+
+        async for section in iter_sections(path, file_type, set_total_pages):
+            if section.page is not None:
+                result.pages = max(result.pages, section.page)
+            batch.extend(chunker.feed(section))
+            if len(batch) >= batch_size:
+                await flush_batch()
+                batch = []
+        batch.extend(chunker.flush())
+        if batch:
+            await flush_batch()
+
+        stale_ids = sorted(existing_ids - seen_ids)
+        if stale_ids:
+            await asyncio.to_thread(vectorizer.delete_documents, stale_ids)
+        result.chunks_deleted = len(stale_ids)
+        if file_hash and seen_ids:
+            indexed_ids = sorted(seen_ids)
+            await asyncio.to_thread(vectorizer.update_metadatas, indexed_ids, [{"file_hash": file_hash}] * len(indexed_ids))
+        result.seconds = time.perf_counter() - start
+    logger.info(
+        f"Ingested {document_id}: {result.chunks} chunks ({result.chunks_embedded} embedded, "
+        f"{result.chunks_unchanged} unchanged, {result.chunks_deleted} deleted), {result.pages} pages "
+        f"in {result.seconds:.2f}s ({result.pages_per_second} pages/s)"
+    )
+    return result
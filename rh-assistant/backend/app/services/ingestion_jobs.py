@@ -0,0 +1,332 @@
+"""
+Ingestion des documents en tâche de fond
+L'endpoint d'import écrit le fichier sur disque, crée un job et répond immédiatement ;
+un nombre borné de workers asyncio dépile la file et exécute le pipeline de
+app.services.ingestion. L'état des jobs est persisté en base (table ingestion_jobs)
+au mieux : si la base est indisponible, l'état reste consultable en mémoire dans ce
+processus.
+"""
+
+import asyncio
+import os
+import time
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Callable, Dict, List, Optional
+
+from loguru import logger
+
+from app.core.config import settings
+from app.data.cdg_data import notify_knowledge_base_changed
+from app.database import SessionLocal
+from app.models import models, schemas
+from app.services import hr_service
+from app.services.chat_service import chat_service
+from app.services.ingestion import IngestionResult, SpooledUpload, document_key, ingest_document
+
+# Jobs terminés gardés en mémoire pour /upload/jobs/{id} (les plus anciens sont oubliés)
+JOB_HISTORY_SIZE = 1000
+# Intervalle minimal entre deux écritures en base de la progression d'un même job
+PROGRESS_PERSIST_INTERVAL = 1.0
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+@dataclass
+class IngestionJobState:
+    job_id: str
+    filename: str
+    file_type: str
+    category: str
+    submitted_by: str
+    document_id: str
+    path: str
+    file_hash: str
+    status: str = "queued"  # queued, running, succeeded, failed
+    stage: str = "queued"  # queued, indexing, finalizing, done
+    progress: float = 0.0
+    result: Dict[str, object] = field(default_factory=dict)
+    timings_ms: Dict[str, float] = field(default_factory=dict)
+    error: Optional[str] = None
+    created_at: datetime = field(default_factory=_now)
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+
+    @property
+    def finished(self) -> bool:
+        return self.status in ("succeeded", "failed")
+
+    def as_dict(self) -> dict:
+        return {
+            "job_id": self.job_id,
+            "filename": self.filename,
+            "category": self.category,
+            "status": self.status,
+            "stage": self.stage,
+            "progress": self.progress,
+            "document_id": self.document_id,
+            "result": dict(self.result),
+            "timings_ms": dict(self.timings_ms),
+            "error": self.error,
+            "created_at": self.created_at.isoformat(),
+            "started_at": self.started_at.isoformat() if self.started_at else None,
+            "finished_at": self.finished_at.isoformat() if self.finished_at else None,
+        }
+
+
+def _row_as_dict(row: models.IngestionJob) -> dict:
+    result = dict(row.result or {})
+    timings = result.pop("timings_ms", {})
+    return {
+        "job_id": row.job_id,
+        "filename": row.filename,
+        "category": row.category,
+        "status": row.status,
+        "stage": row.stage,
+        "progress": row.progress,
+        "document_id": row.document_id,
+        "result": result,
+        "timings_ms": timings,
+        "error": row.error,
+        "created_at": row.created_at.isoformat() if row.created_at else None,
+        "started_at": row.started_at.isoformat() if row.started_at else None,
+        "finished_at": row.finished_at.isoformat() if row.finished_at else None,
+    }
+
+
+async def _write_job(job: IngestionJobState):
+    async with SessionLocal() as db:
+        await db.merge(
+            models.IngestionJob(
+                job_id=job.job_id,
+                filename=job.filename,
+                file_type=job.file_type,
+                category=job.category,
+                submitted_by=job.submitted_by,
+                status=job.status,
+                stage=job.stage,
+                progress=job.progress,
+                document_id=job.document_id,
+                result={**job.result, "timings_ms": job.timings_ms},
+                error=job.error,
+                created_at=job.created_at,
+                started_at=job.started_at,
+                finished_at=job.finished_at,
+            )
+        )
+        await db.commit()
+
+
+async def _read_job(job_id: str) -> Optional[dict]:
+    async with SessionLocal() as db:
+        row = await db.get(models.IngestionJob, job_id)
+        return _row_as_dict(row) if row is not None else None
+
+
+async def _record_document(job: IngestionJobState, chunks: int):
+    # Métadonnées du document en base relationnelle (au mieux, comme avant le passage en tâche de fond)
+    hr_document = schemas.HRDocument(
+        title=job.filename,
+        source=f"upload_by_{job.submitted_by}",
+        category=job.category,
+        metadata={"filename": job.filename, "file_type": job.file_type, "document_id": job.document_id, "chunks": chunks},
+    )
+    async with SessionLocal() as db:
+        await hr_service.create_hr_document(db, hr_document, file_hash=bytes.fromhex(job.file_hash))
+
+
+class IngestionJobManager:
+    """File bornée de jobs d'ingestion dépilée par `workers` tâches asyncio"""
+
+    def __init__(self, workers: int = settings.INGESTION_WORKERS, max_queue: int = settings.INGESTION_QUEUE_SIZE):
+        self.workers = workers
+        self.max_queue = max_queue
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks: List[asyncio.Task] = []
+        self._jobs: "OrderedDict[str, IngestionJobState]" = OrderedDict()
+        self._persist_failed = False
+        self._progress_writes: set = set()
+        self.completed = 0
+        self.failed = 0
+
+    @property
+    def running(self) -> bool:
+        return bool(self._tasks)
+
+    async def start(self):
+        if self.running:
+            return
+        self._queue = asyncio.Queue(maxsize=self.max_queue)
+        self._tasks = [asyncio.create_task(self._worker(), name=f"ingestion-worker-{i}") for i in range(self.workers)]
+        logger.info(f"Ingestion job queue started with {self.workers} workers")
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        # Les jobs encore en file ne seront pas repris : on libère leurs fichiers et on les marque en échec
+        while self._queue is not None and not self._queue.empty():
+            job = self._queue.get_nowait()
+            self._fail(job, "Interrupted by server shutdown")
+            self._remove_file(job)
+            await self._persist(job)
+
+    def full(self) -> bool:
+        return self._queue is not None and self._queue.full()
+
+    async def submit(
+        self, spooled: SpooledUpload, filename: str, file_type: str, category: str, submitted_by: str
+    ) -> IngestionJobState:
+        """Met en file un fichier déjà écrit sur disque ; lève asyncio.QueueFull si la file est pleine"""
+        await self.start()
+        job = IngestionJobState(
+            job_id=str(uuid.uuid4()),
+            filename=filename,
+            file_type=file_type,
+            category=category,
+            submitted_by=submitted_by,
+            document_id=document_key(filename, category),
+            path=spooled.path,
+            file_hash=spooled.sha256,
+            result={"size_bytes": spooled.size},
+        )
+        self._queue.put_nowait(job)
+        self._remember(job)
+        await self._persist(job)
+        return job
+
+    async def get(self, job_id: str) -> Optional[dict]:
+        job = self._jobs.get(job_id)
+        if job is not None:
+            return job.as_dict()
+        # Job soumis à un autre processus (ou avant un redémarrage) : on le cherche en base
+        try:
+            return await _read_job(job_id)
+        except Exception as e:
+            logger.debug(f"Lookup of ingestion job {job_id} failed: {e!r}")
+            return None
+
+    def stats(self) -> Dict[str, object]:
+        return {
+            "workers": len(self._tasks),
+            "queued": self._queue.qsize() if self._queue is not None else 0,
+            "max_queue": self.max_queue,
+            "running": sum(1 for job in self._jobs.values() if job.status == "running"),
+            "completed": self.completed,
+            "failed": self.failed,
+        }
+
+    def _remember(self, job: IngestionJobState):
+        self._jobs[job.job_id] = job
+        if len(self._jobs) > JOB_HISTORY_SIZE:
+            for job_id in [job_id for job_id, known in self._jobs.items() if known.finished]:
+                del self._jobs[job_id]
+                if len(self._jobs) <= JOB_HISTORY_SIZE:
+                    break
+
+    async def _persist(self, job: IngestionJobState):
+        try:
+            await _write_job(job)
+        except Exception as e:
+            # Table absente en développement, base indisponible... : l'état reste en mémoire
+            if not self._persist_failed:
+                logger.warning(f"Ingestion jobs are not persisted, keeping them in memory only: {e!r}")
+            self._persist_failed = True
+
+    def _fail(self, job: IngestionJobState, error: str):
+        job.status = "failed"
+        job.error = error
+        job.finished_at = _now()
+        self.failed += 1
+
+    @staticmethod
+    def _remove_file(job: IngestionJobState):
+        try:
+            os.remove(job.path)
+        except FileNotFoundError:
+            pass
+
+    def _progress_callback(self, job: IngestionJobState) -> Callable[[IngestionResult], None]:
+        last_persisted = time.monotonic()
+
+        def on_progress(result: IngestionResult):
+            nonlocal last_persisted
+            if result.progress is not None:
+                job.progress = result.progress
+            job.result.update(pages=result.pages, total_pages=result.total_pages, chunks=result.chunks)
+            if time.monotonic() - last_persisted >= PROGRESS_PERSIST_INTERVAL:
+                last_persisted = time.monotonic()
+                task = asyncio.create_task(self._persist(job))
+                self._progress_writes.add(task)
+                task.add_done_callback(self._progress_writes.discard)
+
+        return on_progress
+
+    async def _worker(self):
+        while True:
+            job = await self._queue.get()
+            try:
+                await self._run(job)
+            finally:
+                self._queue.task_done()
+
+    async def _run(self, job: IngestionJobState):
+        job.status, job.stage, job.started_at = "running", "indexing", _now()
+        job.timings_ms["queued"] = round((job.started_at - job.created_at).total_seconds() * 1000, 1)
+        await self._persist(job)
+        start = time.perf_counter()
+        try:
+            stage_start = time.perf_counter()
+            result = await ingest_document(
+                job.path,
+                "pdf" if job.file_type == "pdf" else "docx",
+                job.document_id,
+                {"source": f"upload_by_{job.submitted_by}", "filename": job.filename, "file_type": job.file_type, "category": job.category},
+                file_hash=job.file_hash,
+                on_progress=self._progress_callback(job),
+            )
+            job.timings_ms["indexing"] = round((time.perf_counter() - stage_start) * 1000, 1)
+            job.document_id = result.document_id
+
+            if not result.deduplicated:
+                job.stage = "finalizing"
+                stage_start = time.perf_counter()
+                # The knowledge base changed: cached answers may now be outdated
+                notify_knowledge_base_changed(f"{result.document_id}:{job.file_hash}")
+                await chat_service.invalidate_knowledge_base_cache()
+                try:
+                    await _record_document(job, result.chunks)
+                except Exception:
+                    ...
+                job.timings_ms["finalizing"] = round((time.perf_counter() - stage_start) * 1000, 1)
+
+            job.result.update(
+                deduplicated=result.deduplicated,
+                pages=result.pages,
+                total_pages=result.total_pages,
+                chunks=result.chunks,
+                chunks_embedded=result.chunks_embedded,
+                chunks_unchanged=result.chunks_unchanged,
+                chunks_deleted=result.chunks_deleted,
+                pages_per_second=result.pages_per_second,
+            )
+            job.status, job.stage, job.progress, job.finished_at = "succeeded", "done", 1.0, _now()
+            self.completed += 1
+        except asyncio.CancelledError:
+            self._fail(job, "Interrupted by server shutdown")
+            raise
+        except Exception as e:
+            logger.exception(f"Ingestion job {job.job_id} ({job.filename}) failed")
+            self._fail(job, repr(e))
+        finally:
+            job.timings_ms["total"] = round((time.perf_counter() - start) * 1000, 1)
+            self._remove_file(job)
+            await asyncio.shield(self._persist(job))
+
+
+ingestion_jobs = IngestionJobManager()
@@ -0,0 +1,91 @@
+"""
+Analyse d'intention des questions
+Une seule passe par question : le texte est normalisé (minuscules, sans accents) puis
+parcouru par une expression régulière précompilée qui réunit tous les mots-clés.
+Le résultat, un QueryIntent immuable, est partagé par le contexte externe, la réponse
+générique, l'enrichissement et les conseils, au lieu que chaque étape refasse ses
+propres recherches `mot in question.lower()`.
+"""
+
+import re
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Dict, FrozenSet, Tuple
+
+from app.core.text import fold_text
+
+# Sujet -> mots-clés (recherchés comme sous-chaînes, sans tenir compte des accents)
+TOPIC_KEYWORDS: Dict[str, Tuple[str, ...]] = {
+    # Contexte externe à récupérer
+    "weather": ("événement", "congé", "sortie", "météo", "temps"),
+    "holidays": ("congé", "férié", "vacance", "repos", "jour"),
+    "currency": ("salaire", "pension", "rémunération", "euro", "dollar", "devise"),
+    "traffic": ("transport", "trafic", "déplacement", "route"),
+    "economy": ("économie", "inflation", "croissance", "marché"),
+    # Sujets RH : réponse générique, enrichissement et conseils
+    "leave": ("congé", "vacance", "repos"),
+    "salary": ("salaire", "rémunération", "paie"),
+    "training": ("formation", "apprentissage", "développement"),
+    "retirement": ("retraite",),
+    "pension": ("pension",),
+    "event": ("événement",),
+    "public_holiday": ("jour férié",),
+}
+
+
+def _keyword_topics() -> Dict[str, FrozenSet[str]]:
+    topics: Dict[str, set] = {}
+    for topic, keywords in TOPIC_KEYWORDS.items():
+        for keyword in keywords:
+            topics.setdefault(fold_text(keyword), set()).add(topic)
+    # L'expression ne renvoie pas de correspondances chevauchantes : un mot-clé hérite des
+    # sujets des mots-clés qu'il contient ("jour ferie" vaut aussi pour "jour")
+    return {
+        keyword: frozenset().union(*(found for other, found in topics.items() if other in keyword))
+        for keyword in topics
+    }
+
+
+def _trie_pattern(node: dict) -> str:
+    # Alternative factorisée par préfixes communs ("c(?:onge|roissance)") : à chaque position
+    # du texte, le moteur ne teste qu'une branche par caractère au lieu de chaque mot-clé
+    branches = [re.escape(char) + _trie_pattern(child) for char, child in sorted(node.items()) if char]
+    if not branches:
+        return ""
+    pattern = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+    # Fin de mot-clé : la suite est optionnelle, et gloutonne pour que "jour ferie" l'emporte sur "jour"
+    return f"(?:{pattern})?" if "" in node else pattern
+
+
+def _compile_keywords(keywords) -> "re.Pattern":
+    trie: dict = {}
+    for keyword in keywords:
+        node = trie
+        for char in keyword:
+            node = node.setdefault(char, {})
+        node[""] = {}
+    return re.compile(_trie_pattern(trie))
+
+
+_KEYWORD_TOPICS = _keyword_topics()
+_KEYWORD_RE = _compile_keywords(_KEYWORD_TOPICS)
+
+
+@dataclass(frozen=True)
+class QueryIntent:
+    text: str
+    folded: str
+    keywords: FrozenSet[str]
+    topics: FrozenSet[str]
+
+    def has(self, *topics: str) -> bool:
+        """Vrai si la question relève d'au moins un des sujets"""
+        return not self.topics.isdisjoint(topics)
+
+
+@lru_cache(maxsize=4096)
+def analyze_query(text: str) -> QueryIntent:
+    folded = fold_text(text)
+    keywords = frozenset(_KEYWORD_RE.findall(folded))
+    topics = frozenset().union(*(_KEYWORD_TOPICS[keyword] for keyword in keywords))
+    return QueryIntent(text=text, folded=folded, keywords=keywords, topics=topics)
@@ -0,0 +1,320 @@
+"""
+Journal des échanges du chat (table chat_interactions) en écriture différée
+`record` ne fait qu'ajouter l'échange à un tampon mémoire : aucune écriture en base sur
+le chemin de la réponse. Une tâche de fond vide le tampon par INSERT groupés dès que
+CHAT_LOG_BATCH_SIZE échanges sont en attente ou toutes les
+CHAT_LOG_FLUSH_INTERVAL_SECONDS, et le lifespan vide ce qui reste à l'arrêt. Après un
+échec d'écriture, les tentatives suivantes s'espacent (backoff exponentiel borné par
+CHAT_LOG_RETRY_MAX_DELAY_SECONDS) et l'embedding déjà calculé d'un échange est conservé.
+L'historique se lit par pagination « keyset » sur (collaborator_id, created_at) ; avant
+la première page, les échanges en attente de l'utilisateur sont écrits sans embedding,
+complété ensuite par le vidage de fond.
+"""
+
+import asyncio
+import base64
+import json
+import time
+import uuid
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+from loguru import logger
+from sqlalchemy import and_, insert, or_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.database import SessionLocal
+from app.models import models, schemas
+
+
+@dataclass
+class PendingInteraction:
+    email: str
+    session_id: uuid.UUID
+    question: str
+    response: str
+    confidence_score: Optional[float]
+    response_source: Optional[str]
+    response_time_ms: int
+    created_at: datetime
+    # Calculé une seule fois, conservé si l'écriture échoue
+    embedding: Optional[List[float]] = None
+
+
+def _session_uuid(session_id: str) -> uuid.UUID:
+    # La colonne est un UUID ; les identifiants de session du front peuvent être libres
+    try:
+        return uuid.UUID(str(session_id))
+    except ValueError:
+        return uuid.uuid5(uuid.NAMESPACE_URL, f"rh-assistant:{session_id}")
+
+
+def encode_cursor(created_at: datetime, interaction_id: int) -> str:
+    raw = json.dumps({"t": created_at.isoformat(), "id": interaction_id}).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    """Lève ValueError si le curseur n'a pas été produit par encode_cursor"""
+    try:
+        raw = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        return datetime.fromisoformat(raw["t"]), int(raw["id"])
+    except Exception as e:
+        raise ValueError("Invalid history cursor") from e
+
+
+class InteractionLog:
+    """Tampon d'écriture différée des échanges, vidé par INSERT groupés"""
+
+    def __init__(
+        self,
+        batch_size: int = settings.CHAT_LOG_BATCH_SIZE,
+        flush_interval: float = settings.CHAT_LOG_FLUSH_INTERVAL_SECONDS,
+        max_buffer: int = settings.CHAT_LOG_MAX_BUFFER,
+        store_embeddings: bool = settings.CHAT_LOG_STORE_EMBEDDINGS,
+        retry_max_delay: float = settings.CHAT_LOG_RETRY_MAX_DELAY_SECONDS,
+    ):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_buffer = max_buffer
+        self.store_embeddings = store_embeddings
+        self.retry_max_delay = retry_max_delay
+        self._buffer: List[PendingInteraction] = []
+        # Lignes écrites sans embedding par write_pending : (interaction_id, échange)
+        self._backfill: List[Tuple[int, PendingInteraction]] = []
+        self._flush_lock = asyncio.Lock()
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self.recorded = 0
+        self.written = 0
+        self.flushes = 0
+        self.failed_flushes = 0
+        self.dropped = 0
+        self.last_flush_ms = 0.0
+        self._consecutive_failures = 0
+        self._retry_at = 0.0
+
+    def record(self, email: str, session_id: str, question: str, response: dict, response_time_ms: int):
+        """Ajoute un échange au tampon (pas d'E/S : appelé sur le chemin de la réponse)"""
+        sources = response.get("sources") or []
+        self._append([
+            PendingInteraction(
+                email=email,
+                session_id=_session_uuid(session_id),
+                question=question,
+                response=response.get("response", ""),
+                confidence_score=response.get("confidence_score"),
+                response_source=sources[0][:50] if sources else None,
+                response_time_ms=response_time_ms,
+                created_at=datetime.now(timezone.utc),
+            )
+        ])
+        self.recorded += 1
+        if len(self._buffer) >= self.batch_size:
+            self._wakeup.set()
+
+    def _append(self, interactions: List[PendingInteraction], front: bool = False):
+        self._buffer = interactions + self._buffer if front else self._buffer + interactions
+        overflow = len(self._buffer) - self.max_buffer
+        if overflow > 0:
+            # Base indisponible trop longtemps : on perd les plus anciens plutôt que la mémoire
+            del self._buffer[:overflow]
+            self.dropped += overflow
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run(), name="interaction-log-flusher")
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        await self.flush()
+
+    async def _run(self):
+        while True:
+            backoff = self._retry_at - time.monotonic()
+            if backoff > 0:
+                # Base indisponible : les réveils de record() sont ignorés jusqu'à la prochaine tentative
+                await asyncio.sleep(backoff)
+            else:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval)
+                except asyncio.TimeoutError:
+                    pass
+            self._wakeup.clear()
+            await self.flush()
+
+    def _flush_failed(self, error: Exception):
+        self.failed_flushes += 1
+        self._consecutive_failures += 1
+        delay = min(self.retry_max_delay, self.flush_interval * 2 ** (self._consecutive_failures - 1))
+        self._retry_at = time.monotonic() + delay
+        if self._consecutive_failures == 1:
+            logger.warning(f"Chat interaction flush failed, {len(self._buffer)} rows kept for retry: {error!r}")
+
+    async def flush(self):
+        async with self._flush_lock:
+            while self._buffer:
+                batch, self._buffer = self._buffer[: self.batch_size], self._buffer[self.batch_size :]
+                start = time.perf_counter()
+                try:
+                    await self._embed_questions(batch)
+                    await self._insert(batch)
+                except Exception as e:
+                    self._append(batch, front=True)
+                    self._flush_failed(e)
+                    return
+                if self._consecutive_failures:
+                    logger.info(f"Chat interaction flush recovered after {self._consecutive_failures} failed attempts")
+                    self._consecutive_failures = 0
+                    self._retry_at = 0.0
+                self.flushes += 1
+                self.written += len(batch)
+                self.last_flush_ms = round((time.perf_counter() - start) * 1000, 2)
+            try:
+                await self._backfill_embeddings()
+            except Exception as e:
+                self._flush_failed(e)
+
+    async def write_pending(self, email: str):
+        """Écrit tout de suite les échanges en attente de `email` (première page d'historique).
+
+        Appelé sur le chemin de la requête : ni verrou du vidage de fond, ni modèle
+        d'embeddings. Les lignes sont insérées sans embedding et le vidage de fond les
+        complète ensuite.
+        """
+        batch = [item for item in self._buffer if item.email == email]
+        if not batch:
+            return
+        self._buffer = [item for item in self._buffer if item.email != email]
+        try:
+            interaction_ids = await self._insert(batch, returning_ids=True)
+        except Exception as e:
+            self._append(batch, front=True)
+            logger.warning(f"Pending chat interactions of {email} not written: {e!r}")
+            return
+        self.written += len(batch)
+        if self.store_embeddings:
+            self._backfill.extend((interaction_id, item) for interaction_id, item in zip(interaction_ids, batch) if item.embedding is None)
+
+    async def _embed_questions(self, batch: List[PendingInteraction]):
+        """Encode les questions qui ne l'ont pas encore été (une nouvelle tentative ne repasse pas par le modèle)"""
+        missing = [item for item in batch if item.embedding is None]
+        if not self.store_embeddings or not missing:
+            return
+        from app.ml.embeddings import embedding_service
+
+        try:
+            embeddings = await embedding_service.embed_many([item.question for item in missing])
+        except Exception as e:
+            logger.warning(f"Question embeddings skipped for {len(missing)} interactions: {e!r}")
+            return
+        for item, embedding in zip(missing, embeddings):
+            item.embedding = embedding
+
+    async def _backfill_embeddings(self):
+        """Complète l'embedding des lignes écrites par write_pending"""
+        while self._backfill:
+            chunk = self._backfill[: self.batch_size]
+            await self._embed_questions([item for _, item in chunk])
+            rows = [
+                {"interaction_id": interaction_id, "embedding_vector": item.embedding}
+                for interaction_id, item in chunk
+                if item.embedding is not None
+            ]
+            if rows:
+                async with SessionLocal() as db:
+                    # UPDATE groupé par clé primaire
+                    await db.execute(update(models.ChatInteraction), rows)
+                    await db.commit()
+            del self._backfill[: len(chunk)]
+
+    async def _insert(self, batch: List[PendingInteraction], returning_ids: bool = False) -> List[int]:
+        async with SessionLocal() as db:
+            emails = {item.email for item in batch}
+            collaborator_ids = dict(
+                (await db.execute(
+                    select(models.Collaborator.email, models.Collaborator.collaborator_id).where(models.Collaborator.email.in_(emails))
+                )).all()
+            )
+            rows = [
+                {
+                    "collaborator_id": collaborator_ids.get(item.email),
+                    "session_id": item.session_id,
+                    "question_text": item.question,
+                    "response_text": item.response,
+                    "confidence_score": item.confidence_score,
+                    "response_source": item.response_source,
+                    "response_time_ms": item.response_time_ms,
+                    "created_at": item.created_at,
+                    "embedding_vector": item.embedding,
+                }
+                for item in batch
+            ]
+            # Un seul INSERT exécuté en executemany pour tout le lot
+            statement = insert(models.ChatInteraction)
+            if returning_ids:
+                statement = statement.returning(models.ChatInteraction.interaction_id, sort_by_parameter_order=True)
+            result = await db.execute(statement, rows)
+            interaction_ids = list(result.scalars().all()) if returning_ids else []
+            await db.commit()
+            return interaction_ids
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "buffered": len(self._buffer),
+            "recorded": self.recorded,
+            "written": self.written,
+            "flushes": self.flushes,
+            "failed_flushes": self.failed_flushes,
+            "dropped": self.dropped,
+            "last_flush_ms": self.last_flush_ms,
+            "consecutive_failures": self._consecutive_failures,
+            "embeddings_to_backfill": len(self._backfill),
+            "retry_in_s": round(max(0.0, self._retry_at - time.monotonic()), 1),
+        }
+
+
+async def get_history_page(
+    db: AsyncSession, email: str, limit: int = settings.CHAT_HISTORY_PAGE_SIZE, cursor: Optional[str] = None
+) -> schemas.ChatHistoryPage:
+    """Page d'historique la plus récente d'abord, après `cursor` s'il est fourni"""
+    collaborator_id = await db.scalar(select(models.Collaborator.collaborator_id).where(models.Collaborator.email == email))
+    if collaborator_id is None:
+        return schemas.ChatHistoryPage(items=[])
+
+    query = select(models.ChatInteraction).where(models.ChatInteraction.collaborator_id == collaborator_id)
+    if cursor:
+        created_at, interaction_id = decode_cursor(cursor)
+        # (created_at, interaction_id) < curseur : l'index (collaborator_id, created_at) borne le parcours
+        query = query.where(
+            or_(
+                models.ChatInteraction.created_at < created_at,
+                and_(models.ChatInteraction.created_at == created_at, models.ChatInteraction.interaction_id < interaction_id),
+            )
+        )
+    query = query.order_by(models.ChatInteraction.created_at.desc(), models.ChatInteraction.interaction_id.desc()).limit(limit + 1)
+    rows = list((await db.execute(query)).scalars().all())
+
+    next_cursor = encode_cursor(rows[limit - 1].created_at, rows[limit - 1].interaction_id) if len(rows) > limit else None
+    items = [
+        schemas.ChatHistoryItem(
+            interaction_id=row.interaction_id,
+            session_id=str(row.session_id),
+            question=row.question_text,
+            response=row.response_text,
+            confidence_score=row.confidence_score,
+            response_source=row.response_source,
+            response_time_ms=row.response_time_ms,
+            created_at=row.created_at,
+        )
+        for row in rows[:limit]
+    ]
+    return schemas.ChatHistoryPage(items=items, next_cursor=next_cursor)
+
+
+interaction_log = InteractionLog()
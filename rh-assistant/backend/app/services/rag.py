@@ -0,0 +1,264 @@
+"""
+Génération augmentée par la recherche (RAG)
+Les passages candidats viennent de l'index CDG (BM25), de l'instantané d'embeddings de
+la base CDG (app/data/kb_snapshot.py) et des documents importés (collection
+"hr_documents" du magasin vectoriel) ; la question n'est encodée qu'une fois pour les
+deux recherches vectorielles. Ils sont placés dans le prompt par ordre de pertinence
+par token tant que le budget RAG_CONTEXT_TOKEN_BUDGET n'est pas atteint,
+puis le LLM rédige la réponse. Une FAQ très pertinente est renvoyée telle quelle,
+sans appel au LLM. Chaque étape est chronométrée.
+"""
+
+import asyncio
+import math
+import time
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from loguru import logger
+
+from app.core.config import settings
+from app.core.metrics import record_stage
+
+SOURCE_LABELS = {"faq": "CDG FAQ", "procedure": "CDG Procédure", "policy": "CDG Policy", "holiday": "CDG Jours fériés"}
+
+PROMPT_HEADER = (
+    "Tu es l'assistant RH de la CDG. Réponds en français, de façon concise, "
+    "uniquement à partir du contexte ci-dessous."
+)
+
+
+def estimate_tokens(text: str) -> int:
+    """Estimation sans tokenizer : ~4 caractères par token (prudent pour le français)"""
+    return max(1, math.ceil(len(text) / 4))
+
+
+@dataclass
+class Passage:
+    text: str
+    source: str
+    relevance: float
+    tokens: int = 0
+
+    def __post_init__(self):
+        if not self.tokens:
+            self.tokens = estimate_tokens(self.text)
+
+
+@dataclass
+class RetrievedContext:
+    passages: List[Passage]
+    candidates: int
+    tokens: int
+    timings_ms: Dict[str, float] = field(default_factory=dict)
+
+    @property
+    def sources(self) -> List[str]:
+        sources = []
+        for passage in self.passages:
+            if passage.source not in sources:
+                sources.append(passage.source)
+        return sources or ["Base de connaissances CDG"]
+
+
+def cdg_source(result: dict) -> str:
+    label = SOURCE_LABELS.get(result["type"], "CDG")
+    category = result["content"].get("category")
+    return f"{label} - {category}" if category else label
+
+
+def cdg_passage_text(result: dict) -> str:
+    content = result["content"]
+    if result["type"] == "faq":
+        return f"{content['question']} {content['answer']}"
+    if result["type"] == "procedure":
+        return f"{content['title']} : " + " ; ".join(content["procedure"])
+    if result["type"] == "holiday":
+        return f"Jour férié : {content['name']} ({content['date']})"
+    return f"{content['title']} : " + " ".join(content["content"].split())
+
+
+def upcoming_holidays(external_context: dict, limit: int = 3) -> List[dict]:
+    today = datetime.now().strftime("%Y-%m-%d")
+    return [h for h in external_context.get("holidays", []) if h["date"] >= today][:limit]
+
+
+def pack_passages(passages: List[Passage], budget: int) -> List[Passage]:
+    """Sélection gloutonne par pertinence par token sous le budget ; résultat trié par pertinence"""
+    selected, used = [], 0
+    for passage in sorted(passages, key=lambda p: p.relevance / p.tokens, reverse=True):
+        if used + passage.tokens <= budget:
+            selected.append(passage)
+            used += passage.tokens
+    return sorted(selected, key=lambda p: p.relevance, reverse=True)
+
+
+def cosine_similarity(distance: float, space: str) -> float:
+    """Similarité cosinus, bornée à [0, 1], d'une distance du magasin vectoriel.
+
+    cosine et ip donnent 1 - similarité ; l2 la distance euclidienne au carré, soit
+    2 - 2 * similarité pour des vecteurs unitaires (exact avec le backend numpy, qui les normalise).
+    """
+    similarity = 1.0 - distance / 2.0 if space == "l2" else 1.0 - distance
+    return min(1.0, max(0.0, similarity))
+
+
+def answers_question(
+    result: dict,
+    threshold: float = settings.RAG_FAQ_DIRECT_THRESHOLD,
+    min_terms: int = settings.RAG_FAQ_DIRECT_MIN_TERMS,
+    min_coverage: float = settings.RAG_FAQ_DIRECT_MIN_COVERAGE,
+) -> bool:
+    """Le résultat BM25 répond à la question tel quel, sans LLM.
+
+    Un score élevé sur un seul terme ne suffit pas : l'entrée doit aussi contenir assez de
+    termes de la question (`matched_terms`, `coverage` de l'index BM25).
+    """
+    return result["relevance"] >= threshold and result["matched_terms"] >= min_terms and result["coverage"] >= min_coverage
+
+
+def is_direct_faq_hit(cdg_results: List[dict]) -> bool:
+    """La meilleure entrée CDG est une FAQ assez pertinente pour être servie sans LLM"""
+    return bool(cdg_results) and cdg_results[0]["type"] == "faq" and answers_question(cdg_results[0])
+
+
+class RAGPipeline:
+    def __init__(
+        self,
+        token_budget: int = settings.RAG_CONTEXT_TOKEN_BUDGET,
+        top_k: int = settings.RAG_TOP_K,
+        min_relevance: float = settings.RAG_MIN_RELEVANCE,
+        vector_search: bool = settings.RAG_VECTOR_SEARCH_ENABLED,
+        kb_snapshot: bool = settings.KB_SNAPSHOT_ENABLED,
+    ):
+        self.token_budget = token_budget
+        self.top_k = top_k
+        self.min_relevance = min_relevance
+        self.vector_search = vector_search
+        self.kb_snapshot = kb_snapshot
+        self.retrievals = 0
+        self.vector_errors = 0
+        self.stage_time_total: Dict[str, float] = {}
+        self.stage_counts: Dict[str, int] = {}
+        self._vector_failing = False
+
+    def record_stage(self, name: str, seconds: float) -> float:
+        record_stage(name, seconds)
+        self.stage_time_total[name] = self.stage_time_total.get(name, 0.0) + seconds
+        self.stage_counts[name] = self.stage_counts.get(name, 0) + 1
+        return round(seconds * 1000, 2)
+
+    def _cdg_passages(self, cdg_results: List[dict]) -> List[Passage]:
+        return [
+            Passage(text=cdg_passage_text(result), source=cdg_source(result), relevance=result["relevance"])
+            for result in cdg_results[: self.top_k]
+        ]
+
+    def _vector_unavailable(self, e: Exception):
+        self.vector_errors += 1
+        if not self._vector_failing:
+            logger.warning(f"RAG vector search unavailable, continuing with the other sources: {e!r}")
+        self._vector_failing = True
+
+    async def _vector_passages(self, query: str, embedding: Optional[List[float]] = None) -> List[Passage]:
+        if not self.vector_search:
+            return []
+        from app.ml.embeddings import embedding_service
+
+        if embedding is None:
+            try:
+                embedding = await embedding_service.embed(query)
+            except Exception as e:
+                self._vector_unavailable(e)
+                return []
+
+        passages = []
+        if self.kb_snapshot:
+            from app.data.kb_snapshot import get_kb_snapshot
+
+            # Instantané absent (jamais construit ou base modifiée) : BM25 seul pour la base CDG
+            snapshot = await asyncio.to_thread(get_kb_snapshot)
+            if snapshot is not None:
+                passages.extend(self._cdg_passages(snapshot.search(embedding, self.top_k)))
+        passages.extend(await self._document_passages(embedding))
+        return passages
+
+    async def _document_passages(self, embedding: List[float]) -> List[Passage]:
+        from app.ml.vectorizer import get_vector_store
+
+        try:
+            vectorizer = await asyncio.to_thread(get_vector_store)
+            results = await asyncio.to_thread(vectorizer.query_by_embedding, embedding, self.top_k)
+        except Exception as e:
+            self._vector_unavailable(e)
+            return []
+        self._vector_failing = False
+
+        passages = []
+        space = getattr(vectorizer, "space", "l2")
+        for document, metadata, distance in zip(results["documents"][0], results["metadatas"][0], results["distances"][0]):
+            # Similarité cosinus, comme l'instantané CDG : un texte sans rapport tombe vers 0 et
+            # passe sous RAG_MIN_RELEVANCE (1 / (1 + distance) restait autour de 0,5)
+            metadata = metadata or {}
+            source = f"Document - {metadata.get('filename') or metadata.get('document_id', 'importé')}"
+            passages.append(Passage(text=" ".join(document.split()), source=source, relevance=cosine_similarity(distance, space)))
+        return passages
+
+    async def retrieve(self, query: str, cdg_results: List[dict], embedding: Optional[List[float]] = None) -> RetrievedContext:
+        """`embedding` : celui de la question s'il est déjà calculé (recherche du cache sémantique)"""
+        self.retrievals += 1
+        timings = {}
+        start = time.perf_counter()
+        semantic = await self._vector_passages(query, embedding)
+        timings["vector_search"] = self.record_stage("vector_search", time.perf_counter() - start)
+
+        start = time.perf_counter()
+        # Une entrée CDG trouvée par BM25 et par l'instantané n'est gardée qu'une fois, avec le meilleur score
+        unique: Dict[str, Passage] = {}
+        for passage in self._cdg_passages(cdg_results) + semantic:
+            if passage.relevance < self.min_relevance:
+                continue
+            kept = unique.get(passage.text)
+            if kept is None or passage.relevance > kept.relevance:
+                unique[passage.text] = passage
+        candidates = list(unique.values())
+        passages = pack_passages(candidates, self.token_budget)
+        timings["packing"] = self.record_stage("packing", time.perf_counter() - start)
+        return RetrievedContext(
+            passages=passages,
+            candidates=len(candidates),
+            tokens=sum(p.tokens for p in passages),
+            timings_ms=timings,
+        )
+
+    @staticmethod
+    def build_prompt(query: str, context: RetrievedContext, external_context: dict) -> str:
+        passages = "\n".join(f"[{p.source}] {p.text}" for p in context.passages)
+        context_lines = []
+        if "weather" in external_context:
+            weather = external_context["weather"]
+            context_lines.append(f"Météo {weather['city']} : {weather['description']} ({weather['temperature']}°C)")
+        upcoming = upcoming_holidays(external_context)
+        if upcoming:
+            context_lines.append("Prochains jours fériés : " + ", ".join(f"{h['name']} ({h['date']})" for h in upcoming))
+        return (
+            f"{PROMPT_HEADER}\n\n"
+            f"CONTEXTE :\n{passages or 'Aucun document pertinent.'}\n\n"
+            + ("CONTEXTE EXTERNE :\n" + "\n".join(context_lines) + "\n\n" if context_lines else "")
+            + f"QUESTION : {query}"
+        )
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "retrievals": self.retrievals,
+            "vector_errors": self.vector_errors,
+            "token_budget": self.token_budget,
+            "stage_latency_avg_ms": {
+                name: round(total / self.stage_counts[name] * 1000, 2) for name, total in self.stage_time_total.items()
+            },
+            "stage_counts": dict(self.stage_counts),
+        }
+
+
+rag_pipeline = RAGPipeline()
@@ -0,0 +1,173 @@
+"""
+Cache sémantique des réponses
+Les questions déjà répondues sont indexées (embedding de la question) dans une
+collection dédiée du magasin vectoriel, en similarité cosinus. Une nouvelle question dont le plus
+proche voisin dépasse le seuil de sa catégorie reçoit directement la réponse stockée,
+sans recherche CDG ni contexte externe. Les entrées portent la version de la base de
+connaissances : après une modification, les anciennes réponses ne sont plus servies.
+"""
+
+import asyncio
+import json
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+
+from loguru import logger
+
+from app.core.config import settings
+from app.core.text import query_fingerprint
+from app.data.cdg_data import knowledge_base_version
+from app.ml.embeddings import embedding_service
+
+COLLECTION_NAME = "answered_interactions"
+
+
+@dataclass
+class SemanticLookup:
+    """Résultat d'une recherche : la réponse si hit, et l'embedding de la question pour un stockage ultérieur"""
+    embedding: Optional[List[float]]
+    response: Optional[dict] = None
+    similarity: float = 0.0
+    matched_question: Optional[str] = None
+
+
+class SemanticAnswerCache:
+    def __init__(
+        self,
+        default_threshold: float = settings.SEMANTIC_CACHE_THRESHOLD,
+        category_thresholds: Optional[Dict[str, float]] = None,
+        approved_only: bool = settings.SEMANTIC_CACHE_APPROVED_ONLY,
+        min_coverage: float = settings.SEMANTIC_CACHE_MIN_COVERAGE,
+    ):
+        self.default_threshold = default_threshold
+        self.category_thresholds = dict(settings.SEMANTIC_CACHE_CATEGORY_THRESHOLDS if category_thresholds is None else category_thresholds)
+        self.approved_only = approved_only
+        self.min_coverage = min_coverage
+        self.lookups = 0
+        self.hits = 0
+        self.below_threshold = 0
+        self.stored = 0
+        self.errors = 0
+        self.lookup_time_total = 0.0
+        self.latency_saved_total = 0.0
+        # Durée moyenne (lissée) du pipeline complet, pour estimer le temps économisé par un hit
+        self.pipeline_latency_avg = 0.0
+
+    def _vectorizer(self):
+        from app.ml.vectorizer import get_vector_store
+
+        return get_vector_store(COLLECTION_NAME, metadata={"hnsw:space": "cosine"})
+
+    def threshold_for(self, category: Optional[str]) -> float:
+        return self.category_thresholds.get(category or "", self.default_threshold)
+
+    @staticmethod
+    def _entry_id(question: str) -> str:
+        return f"{knowledge_base_version()}:{query_fingerprint(question)}"
+
+    def _where(self) -> dict:
+        where = {"kb_version": knowledge_base_version()}
+        if self.approved_only:
+            return {"$and": [where, {"approved": True}]}
+        return where
+
+    async def lookup(self, question: str) -> SemanticLookup:
+        start = time.perf_counter()
+        self.lookups += 1
+        try:
+            embedding = await embedding_service.embed(question)
+            results = await asyncio.to_thread(self._vectorizer().query_by_embedding, embedding, 1, self._where())
+        except Exception as e:
+            self.errors += 1
+            logger.warning(f"Semantic cache lookup failed: {e!r}")
+            return SemanticLookup(embedding=None)
+        finally:
+            self.lookup_time_total += time.perf_counter() - start
+
+        if not results["ids"] or not results["ids"][0]:
+            return SemanticLookup(embedding=embedding)
+        metadata = results["metadatas"][0][0]
+        # Distance cosinus (Chroma comme NumpyVectorStore) : 1 - similarité
+        similarity = 1.0 - results["distances"][0][0]
+        if similarity < self.threshold_for(metadata.get("category")):
+            self.below_threshold += 1
+            return SemanticLookup(embedding=embedding, similarity=similarity)
+
+        self.hits += 1
+        self.latency_saved_total += max(0.0, self.pipeline_latency_avg - (time.perf_counter() - start))
+        return SemanticLookup(
+            embedding=embedding,
+            response=json.loads(metadata["response_json"]),
+            similarity=similarity,
+            matched_question=results["documents"][0][0],
+        )
+
+    def record_pipeline_latency(self, seconds: float):
+        if self.pipeline_latency_avg == 0.0:
+            self.pipeline_latency_avg = seconds
+        else:
+            self.pipeline_latency_avg = 0.9 * self.pipeline_latency_avg + 0.1 * seconds
+
+    async def store(
+        self, question: str, response: dict, category: Optional[str], coverage: float, embedding: Optional[List[float]] = None
+    ):
+        """Indexe une réponse du LLM ; appelé en tâche de fond après l'envoi de la réponse.
+
+        `coverage` est la part des termes de la question trouvés dans la base CDG : une
+        réponse rédigée sur un contexte qui couvre mal la question n'est pas réutilisée.
+        """
+        if coverage < self.min_coverage:
+            return
+        try:
+            if embedding is None:
+                embedding = await embedding_service.embed(question)
+            metadata = {
+                "kb_version": knowledge_base_version(),
+                "category": category or "",
+                "approved": False,
+                "response_json": json.dumps(response, default=str),
+            }
+            await asyncio.to_thread(self._vectorizer().upsert_chunks, [self._entry_id(question)], [question], [metadata], [embedding])
+            self.stored += 1
+        except Exception as e:
+            self.errors += 1
+            logger.warning(f"Semantic cache store failed: {e!r}")
+
+    async def mark_approved(self, question: str):
+        """Réponse validée par les RH : servie aussi quand SEMANTIC_CACHE_APPROVED_ONLY est actif"""
+        try:
+            vectorizer = self._vectorizer()
+            entry_id = self._entry_id(question)
+            metadatas = await asyncio.to_thread(vectorizer.get_metadatas, None, 1, [entry_id])
+            if metadatas:
+                await asyncio.to_thread(vectorizer.update_metadatas, [entry_id], [{**metadatas[0], "approved": True}])
+        except Exception as e:
+            self.errors += 1
+            logger.warning(f"Semantic cache approval failed: {e!r}")
+
+    async def purge_stale(self):
+        """Supprime les entrées d'anciennes versions de la base de connaissances"""
+        try:
+            await asyncio.to_thread(self._vectorizer().delete_documents, None, {"kb_version": {"$ne": knowledge_base_version()}})
+        except Exception as e:
+            self.errors += 1
+            logger.warning(f"Semantic cache purge failed: {e!r}")
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "lookups": self.lookups,
+            "hits": self.hits,
+            "hit_rate": round(self.hits / self.lookups, 4) if self.lookups else 0.0,
+            "below_threshold": self.below_threshold,
+            "stored": self.stored,
+            "errors": self.errors,
+            "lookup_latency_avg_ms": round(self.lookup_time_total / self.lookups * 1000, 2) if self.lookups else 0.0,
+            "pipeline_latency_avg_ms": round(self.pipeline_latency_avg * 1000, 2),
+            "latency_saved_total_ms": round(self.latency_saved_total * 1000, 1),
+            "default_threshold": self.default_threshold,
+            "category_thresholds": dict(self.category_thresholds),
+        }
+
+
+semantic_cache = SemanticAnswerCache()
@@ -0,0 +1,69 @@
+"""
+Préchauffage des composants lourds (modèle d'embeddings, base vectorielle, index CDG,
+instantané des embeddings CDG)
+Lancé en arrière-plan par le lifespan : le worker répond tout de suite aux sondes de
+santé, et /ready indique quand les singletons sont prêts.
+"""
+
+import asyncio
+import time
+from typing import Callable, Dict
+
+from loguru import logger
+
+from app.data.cdg_data import get_cdg_index
+from app.data.kb_snapshot import get_kb_snapshot
+from app.ml.model_registry import get_sentence_transformer
+from app.ml.vectorizer import get_vector_store
+
+
+def _load_embedding_model():
+    # Un premier encodage initialise aussi les poids en mémoire
+    get_sentence_transformer().encode(["préchauffage"])
+
+
+WARMUP_STEPS: Dict[str, Callable[[], object]] = {
+    "cdg_index": get_cdg_index,
+    "kb_snapshot": get_kb_snapshot,
+    "embedding_model": _load_embedding_model,
+    "vector_store": get_vector_store,
+}
+
+
+class WarmupState:
+    def __init__(self):
+        self.components: Dict[str, str] = {name: "pending" for name in WARMUP_STEPS}
+        self.durations_ms: Dict[str, float] = {}
+        self.errors: Dict[str, str] = {}
+
+    @property
+    def ready(self) -> bool:
+        return all(status == "ready" for status in self.components.values())
+
+    def as_dict(self) -> dict:
+        return {
+            "ready": self.ready,
+            "components": dict(self.components),
+            "durations_ms": dict(self.durations_ms),
+            "errors": dict(self.errors),
+        }
+
+
+warmup_state = WarmupState()
+
+
+async def warm_up(state: WarmupState = warmup_state):
+    """Charge chaque composant dans un thread pour ne pas bloquer la boucle d'événements"""
+    for name, load in WARMUP_STEPS.items():
+        state.components[name] = "loading"
+        start = time.perf_counter()
+        try:
+            await asyncio.to_thread(load)
+        except Exception as e:
+            state.components[name] = "failed"
+            state.errors[name] = repr(e)
+            logger.error(f"Warm-up of {name} failed: {e!r}")
+            continue
+        state.durations_ms[name] = round((time.perf_counter() - start) * 1000, 1)
+        state.components[name] = "ready"
+        logger.info(f"Warm-up of {name} done in {state.durations_ms[name]} ms")
@@ -0,0 +1,71 @@
+"""Query latency of the BM25 CDG index against the historical linear substring scan.
+
+Synthetic FAQ entries mix words from the real knowledge base with a large synthetic
+vocabulary, so that common HR terms have long posting lists and most terms are rare,
+as in a real corpus.
+"""
+
+import random
+import time
+
+from app.data.cdg_data import get_cdg_knowledge_base
+from app.data.cdg_index import build_cdg_index
+from benchmarks.common import measure, print_row
+
+QUERIES = [
+    "Combien de jours de congés payés par an ?",
+    "Comment calculer ma pension de retraite",
+    "documents pour une pension d'invalidité",
+    "taux de cotisation employeur",
+    "demande de prêt social logement",
+]
+
+
+def synthetic_faq(count: int, seed: int = 42) -> list:
+    rng = random.Random(seed)
+    knowledge_base = get_cdg_knowledge_base()
+    vocabulary = sorted({
+        word
+        for item in knowledge_base["faq"] + knowledge_base["policies"]
+        for word in (item.get("answer") or item.get("content")).split()
+    })
+    filler = [f"terme{i}" for i in range(50_000)]
+    categories = sorted({item["category"] for item in knowledge_base["faq"]})
+    return [
+        {
+            "question": " ".join(rng.choices(vocabulary, k=4) + rng.choices(filler, k=6)),
+            "answer": " ".join(rng.choices(vocabulary, k=8) + rng.choices(filler, k=32)),
+            "category": rng.choice(categories),
+            "confidence": 0.8,
+        }
+        for _ in range(count)
+    ]
+
+
+def linear_scan(entries: list, query: str) -> list:
+    # Reproduction of the pre-index search_cdg_content loop over FAQ entries
+    query_lower = query.lower()
+    return [
+        item for item in entries
+        if query_lower in item["question"].lower() or query_lower in item["answer"].lower()
+    ]
+
+
+def run():
+    for size in (10_000, 100_000):
+        entries = synthetic_faq(size)
+
+        start = time.perf_counter()
+        index = build_cdg_index({"faq": entries})
+        build_s = time.perf_counter() - start
+        print(f"\n{size} entries, index built in {build_s:.2f}s")
+
+        queries = iter(QUERIES * 1000)
+        print_row(f"bm25 top-5 ({size})", measure(lambda: index.search(next(queries), limit=5), 200))
+
+        queries = iter(QUERIES * 1000)
+        print_row(f"linear scan ({size})", measure(lambda: linear_scan(entries, next(queries)), 20, warmup=1))
+
+
+if __name__ == "__main__":
+    run()
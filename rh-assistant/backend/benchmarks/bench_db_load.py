@@ -0,0 +1,119 @@
+"""Requests/sec of the auth user lookup with the previous sync engine vs the async engine.
+
+Each simulated request runs the `get_current_user` query (user by email) as a
+coroutine, with `--concurrency` requests in flight. "sync" reproduces the previous
+`get_db`: a blocking `Session.query` called from an `async def`, which stalls the
+event loop for the whole round trip. "async" uses the app's async engine and pool
+settings. A heartbeat task measures event-loop lag during each run.
+
+On local SQLite the sync lookup is faster in raw req/s (aiosqlite adds a thread hop
+per query) but blocks the loop for the whole run; point --url at Postgres to see the
+pooled round trips overlap:
+
+    python -m benchmarks.bench_db_load --url postgresql://rh:rh@localhost/rh_bench
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import tempfile
+import time
+
+from sqlalchemy import create_engine, delete, select
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import Session, sessionmaker
+
+from app.database import engine_options, to_async_url
+from app.models import models
+from benchmarks.common import percentile, summarize
+
+
+async def heartbeat(stop: asyncio.Event, lags: list, interval: float = 0.001):
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(interval)
+        lags.append(time.perf_counter() - start - interval)
+
+
+async def run_load(lookup, emails: list, requests: int, concurrency: int) -> dict:
+    samples, lags = [], []
+    stop = asyncio.Event()
+    ticker = asyncio.create_task(heartbeat(stop, lags))
+    pending = iter(random.Random(7).choices(emails, k=requests))
+
+    async def client():
+        for email in pending:
+            start = time.perf_counter()
+            await lookup(email)
+            samples.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    stop.set()
+    await ticker
+    stats = summarize(samples)
+    stats["requests_per_s"] = len(samples) / elapsed
+    stats["loop_lag_p99_ms"] = percentile(lags, 99) * 1000
+    stats["loop_lag_max_ms"] = max(lags, default=0.0) * 1000
+    return stats
+
+
+def print_result(label: str, stats: dict):
+    print(
+        f"{label:<6} {stats['requests_per_s']:9.1f} req/s  p50={stats['p50_ms']:7.2f}ms p99={stats['p99_ms']:7.2f}ms  "
+        f"loop lag p99={stats['loop_lag_p99_ms']:6.2f}ms max={stats['loop_lag_max_ms']:6.2f}ms"
+    )
+
+
+async def run(url: str, users: int, requests: int, concurrency: int):
+    async_url = to_async_url(url)
+    sync_engine = create_engine(url, **({"connect_args": {"check_same_thread": False}} if url.startswith("sqlite") else {}))
+    async_engine = create_async_engine(async_url, **({} if async_url.startswith("sqlite") else engine_options))
+    sync_session = sessionmaker(bind=sync_engine)
+    async_session = async_sessionmaker(async_engine, expire_on_commit=False)
+
+    models.User.__table__.create(sync_engine, checkfirst=True)
+    emails = [f"bench-{i}@example.com" for i in range(users)]
+    with Session(sync_engine) as db:
+        db.execute(delete(models.User).where(models.User.email.like("bench-%")))
+        db.add_all(models.User(email=email, full_name=email, hashed_password="x", role="user") for email in emails)
+        db.commit()
+
+    async def sync_lookup(email: str):
+        db = sync_session()
+        try:
+            return db.query(models.User).filter(models.User.email == email).first()
+        finally:
+            db.close()
+
+    async def async_lookup(email: str):
+        async with async_session() as db:
+            return (await db.execute(select(models.User).where(models.User.email == email))).scalars().first()
+
+    print(f"{users} users, {requests} requests, concurrency {concurrency}, {async_url.split('://')[0]}")
+    await run_load(async_lookup, emails, min(200, requests), concurrency)  # warm up the pools
+    await run_load(sync_lookup, emails, min(200, requests), concurrency)
+    before = await run_load(sync_lookup, emails, requests, concurrency)
+    after = await run_load(async_lookup, emails, requests, concurrency)
+    print_result("sync", before)
+    print_result("async", after)
+    print(f"speed-up {after['requests_per_s'] / before['requests_per_s']:.2f}x")
+
+    with Session(sync_engine) as db:
+        db.execute(delete(models.User).where(models.User.email.like("bench-%")))
+        db.commit()
+    sync_engine.dispose()
+    await async_engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url", default=None, help="sync SQLAlchemy URL (default: temporary SQLite file)")
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, default=50)
+    args = parser.parse_args()
+    url = args.url or f"sqlite:///{os.path.join(tempfile.mkdtemp(prefix='rh_bench_'), 'bench.db')}"
+    asyncio.run(run(url, args.users, args.requests, args.concurrency))
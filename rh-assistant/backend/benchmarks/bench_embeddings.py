@@ -0,0 +1,48 @@
+"""Texts/sec for one-at-a-time versus batched SentenceTransformer encoding on CPU.
+
+Also measures the async BatchingEmbeddingService with many concurrent callers, which
+is how the API uses it.
+"""
+
+import asyncio
+import time
+
+from app.ml.embeddings import BatchingEmbeddingService, embeddings_generator
+
+TEXTS = [
+    f"Question RH numéro {i} : combien de jours de congés payés et quelle cotisation retraite ?"
+    for i in range(512)
+]
+
+
+def texts_per_second(fn, count: int) -> float:
+    start = time.perf_counter()
+    fn()
+    return count / (time.perf_counter() - start)
+
+
+async def concurrent_service(texts, max_batch_size: int) -> float:
+    service = BatchingEmbeddingService(embeddings_generator, max_batch_size=max_batch_size, max_wait_ms=5)
+    await service.embed("warmup")
+    start = time.perf_counter()
+    await asyncio.gather(*(service.embed(text) for text in texts))
+    rate = len(texts) / (time.perf_counter() - start)
+    print(f"  batches={service.stats()['batches']} avg_batch={service.stats()['avg_batch_size']}")
+    await service.close()
+    return rate
+
+
+def run():
+    embeddings_generator.generate_embedding("warmup")
+    single = texts_per_second(lambda: [embeddings_generator.generate_embedding(t) for t in TEXTS], len(TEXTS))
+    print(f"single encode                 {single:10.1f} texts/s")
+    for batch_size in (8, 32, 64):
+        rate = texts_per_second(lambda: embeddings_generator.generate_embeddings(TEXTS, batch_size), len(TEXTS))
+        print(f"batched encode (bs={batch_size:<3})       {rate:10.1f} texts/s  x{rate / single:.1f}")
+    for batch_size in (8, 32):
+        rate = asyncio.run(concurrent_service(TEXTS, batch_size))
+        print(f"async service (bs={batch_size:<3})        {rate:10.1f} texts/s  x{rate / single:.1f}")
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,66 @@
+"""Cold-import regression check for app.main.
+
+Runs ``python -X importtime -c "import app.main"`` in a fresh interpreter, prints the
+slowest modules and fails (exit 1) if the import exceeds the budget or pulls in one of
+the heavy ML/storage/parsing packages that must stay lazy.
+
+    python -m benchmarks.bench_import_time --budget-ms 1500
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+HEAVY_MODULES = ["torch", "sentence_transformers", "chromadb", "PyPDF2", "docx", "transformers", "numpy"]
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def import_profile() -> list:
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import app.main"],
+        cwd=BACKEND_DIR, capture_output=True, text=True, check=True,
+    )
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        rows.append((name.strip(), int(self_us), int(cumulative_us)))
+    return rows
+
+
+def heavy_modules_loaded() -> list:
+    code = (
+        "import json, sys; import app.main; "
+        f"print(json.dumps([m for m in {HEAVY_MODULES!r} if m in sys.modules]))"
+    )
+    result = subprocess.run([sys.executable, "-c", code], cwd=BACKEND_DIR, capture_output=True, text=True, check=True)
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def run(budget_ms: float) -> int:
+    rows = import_profile()
+    total_ms = next(cumulative for name, _, cumulative in rows if name == "app.main") / 1000
+    print("slowest imports (cumulative):")
+    for name, _, cumulative in sorted(rows, key=lambda row: row[2], reverse=True)[:15]:
+        print(f"  {cumulative / 1000:9.1f} ms  {name}")
+    print(f"app.main cold import: {total_ms:.1f} ms (budget {budget_ms:.0f} ms)")
+
+    failures = []
+    if total_ms > budget_ms:
+        failures.append(f"import took {total_ms:.1f} ms > {budget_ms:.0f} ms")
+    heavy = heavy_modules_loaded()
+    if heavy:
+        failures.append(f"heavy modules imported eagerly: {', '.join(heavy)}")
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--budget-ms", type=float, default=1500.0)
+    sys.exit(run(parser.parse_args().budget_ms))
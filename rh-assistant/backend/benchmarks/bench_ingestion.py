@@ -0,0 +1,69 @@
+"""Throughput of the document ingestion pipeline in pages/sec.
+
+Synthetic pages (~2,500 characters of HR policy text each) go through the same stages
+as an upload: chunking only, chunking + batched embedding, and the full pipeline
+including the Chroma bulk upsert. PDF parsing is left out here; the parsing cost is
+measured separately, on real files.
+
+    python -m benchmarks.bench_ingestion --pages 200
+"""
+
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+
+from app.data.cdg_data import CDG_POLICIES
+from app.services import ingestion
+from app.services.ingestion import Section, chunk_sections
+
+PAGE_TEXT = " ".join(policy["content"] for policy in CDG_POLICIES)[:2500]
+
+
+def synthetic_sections(pages: int):
+    for page in range(1, pages + 1):
+        yield Section(text=PAGE_TEXT, page=page)
+
+
+def chunk_only(pages: int) -> float:
+    start = time.perf_counter()
+    chunks = sum(1 for _ in chunk_sections(synthetic_sections(pages)))
+    elapsed = time.perf_counter() - start
+    print(f"chunking only        {pages / elapsed:10.1f} pages/s ({chunks} chunks)")
+    return elapsed
+
+
+async def embed_only(pages: int):
+    from app.ml.embeddings import embedding_service
+
+    await embedding_service.embed("warmup")
+    start = time.perf_counter()
+    for batch in ingestion._batched(chunk_sections(synthetic_sections(pages)), 64):
+        await embedding_service.embed_many([chunk.text for chunk in batch])
+    elapsed = time.perf_counter() - start
+    print(f"chunk + embed        {pages / elapsed:10.1f} pages/s")
+
+
+async def full_pipeline(pages: int):
+    start = time.perf_counter()
+    chunks = 0
+    for batch in ingestion._batched(chunk_sections(synthetic_sections(pages)), 64):
+        ids = [f"bench-doc:{chunk.index}" for chunk in batch]
+        await ingestion.index_chunks(ids, batch, {"source": "benchmark", "document_id": "bench-doc"})
+        chunks += len(batch)
+    elapsed = time.perf_counter() - start
+    print(f"chunk + embed + upsert {pages / elapsed:8.1f} pages/s ({chunks} chunks)")
+
+
+def run(pages: int):
+    chunk_only(pages)
+    os.chdir(tempfile.mkdtemp())  # throwaway chroma_db
+    asyncio.run(embed_only(pages))
+    asyncio.run(full_pipeline(pages))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--pages", type=int, default=200)
+    run(parser.parse_args().pages)
@@ -0,0 +1,82 @@
+"""Per-message cost of intent analysis (app/services/intent.py).
+
+`legacy_scans` replays the keyword checks the chat pipeline used to run, one
+`word in query.lower()` scan per stage (external context, enrichment, generic answer,
+tips); `analyze_query` is the single precompiled pass that replaced them. The cached
+row is the lru_cache hit for a repeated question.
+
+    python -m benchmarks.bench_intent --iterations 20000
+"""
+
+import argparse
+
+from app.services.intent import analyze_query
+from benchmarks.common import measure, print_row
+from benchmarks.loadgen import QUESTIONS
+
+LONG_QUESTION = (
+    "Bonjour, je souhaite savoir comment sont calculés mes congés payés lorsque je suis à temps "
+    "partiel, et si les jours fériés tombant pendant mes vacances sont décomptés de mon solde. "
+) * 4
+
+
+def legacy_scans(query: str) -> set:
+    found = set()
+    query_lower = query.lower()
+    # external_api.get_hr_context
+    if any(word in query_lower for word in ["événement", "congé", "sortie", "météo", "temps"]):
+        found.add("weather")
+    if any(word in query_lower for word in ["congé", "férié", "vacance", "repos", "jour"]):
+        found.add("holidays")
+    if any(word in query_lower for word in ["salaire", "pension", "rémunération", "euro", "dollar", "devise"]):
+        found.add("currency")
+    if any(word in query_lower for word in ["transport", "trafic", "déplacement", "route"]):
+        found.add("traffic")
+    if any(word in query_lower for word in ["économie", "inflation", "croissance", "marché"]):
+        found.add("economy")
+    # chat_service._generate_rich_response
+    if "congé" in query.lower() or "événement" in query.lower():
+        found.add("weather_tip")
+    if "congé" in query.lower() or "jour férié" in query.lower():
+        found.add("holidays_tip")
+    if "salaire" in query.lower() or "pension" in query.lower():
+        found.add("currency_tip")
+    # chat_service._get_generic_hr_response
+    query_lower = query.lower()
+    if any(word in query_lower for word in ["congé", "vacance", "repos"]):
+        found.add("leave")
+    elif any(word in query_lower for word in ["salaire", "rémunération", "paie"]):
+        found.add("salary")
+    elif any(word in query_lower for word in ["formation", "apprentissage", "développement"]):
+        found.add("training")
+    # chat_service._add_contextual_tips
+    query_lower = query.lower()
+    for word in ("congé", "salaire", "formation", "retraite"):
+        if word in query_lower:
+            found.add(word)
+    return found
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=20_000)
+    args = parser.parse_args()
+
+    for label, questions in (("short", QUESTIONS), ("long", [f"{LONG_QUESTION} ({q})" for q in QUESTIONS])):
+        position = iter(range(10**9))
+        unique = iter(range(10**9))
+
+        def next_question():
+            return questions[next(position) % len(questions)]
+
+        print_row(f"{label}: legacy scans", measure(lambda: legacy_scans(next_question()), args.iterations))
+        # Unique suffix: every call misses the lru_cache and pays the full analysis
+        print_row(
+            f"{label}: analyze_query",
+            measure(lambda: analyze_query(f"{next_question()} {next(unique)}"), args.iterations),
+        )
+        print_row(f"{label}: analyze_query (cached)", measure(lambda: analyze_query(next_question()), args.iterations))
+
+
+if __name__ == "__main__":
+    main()
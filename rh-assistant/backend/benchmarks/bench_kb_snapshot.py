@@ -0,0 +1,53 @@
+"""Worker startup cost of semantic search over the CDG knowledge base.
+
+Compares encoding every FAQ, policy and procedure at boot with opening the prebuilt
+snapshot (app/data/kb_snapshot.py, np.load with mmap_mode="r"), then times a top-k
+search on the memory-mapped matrix. The snapshot is built in a temporary directory.
+
+    python -m benchmarks.bench_kb_snapshot --iterations 200
+"""
+
+import argparse
+import tempfile
+import time
+
+from app.core.config import settings
+from app.data.cdg_data import get_cdg_knowledge_base
+from app.data.kb_snapshot import build_snapshot, entry_text, load_snapshot, snapshot_entries
+from app.ml.model_registry import get_sentence_transformer
+from benchmarks.common import measure, print_row
+from benchmarks.loadgen import QUESTIONS
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=200)
+    parser.add_argument("--dtype", default=settings.KB_SNAPSHOT_DTYPE, choices=("float16", "float32"))
+    args = parser.parse_args()
+
+    knowledge_base = get_cdg_knowledge_base()
+    entries = snapshot_entries(knowledge_base)
+    texts = [entry_text(entry["type"], knowledge_base[entry["section"]][entry["position"]]) for entry in entries]
+    model = get_sentence_transformer()
+    model.encode(["préchauffage"])
+
+    start = time.perf_counter()
+    model.encode(texts, batch_size=64, normalize_embeddings=True, convert_to_numpy=True)
+    print(f"encode {len(texts)} entries at boot        {(time.perf_counter() - start) * 1000:8.2f} ms")
+
+    with tempfile.TemporaryDirectory() as directory:
+        build_snapshot(directory, dtype=args.dtype)
+        print_row("load_snapshot (mmap)", measure(lambda: load_snapshot(directory), args.iterations))
+        snapshot = load_snapshot(directory)
+        print(f"snapshot: {snapshot.stats()}")
+
+        queries = [model.encode(question) for question in QUESTIONS]
+        position = iter(range(10**9))
+        print_row(
+            f"search top-{settings.RAG_TOP_K}",
+            measure(lambda: snapshot.search(queries[next(position) % len(queries)], settings.RAG_TOP_K), args.iterations * 10),
+        )
+
+
+if __name__ == "__main__":
+    main()
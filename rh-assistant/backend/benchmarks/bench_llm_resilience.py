@@ -0,0 +1,111 @@
+"""LLM client behaviour against the mock server: latency, retries and the circuit breaker.
+
+Runs the mock OpenAI server (benchmarks/mock_llm_server.py) in-process under uvicorn,
+points `LLMEngine` at it and drives `--requests` completions with `--concurrency` in
+flight through three phases:
+
+- flaky: `--error-rate` of 503/429 answers, absorbed by jittered retries
+- outage: every request fails; the breaker opens and calls fail fast
+- recovery: the upstream is back; after the reset timeout a single probe closes the
+  breaker (calls made while the probe is in flight still fail fast)
+
+For each phase it reports completion and fallback latencies and the client counters.
+
+    python -m benchmarks.bench_llm_resilience --requests 200 --concurrency 32 --error-rate 0.2
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+import httpx
+
+from benchmarks.common import print_row, summarize
+from benchmarks.mock_llm_server import Behaviour, create_app
+from benchmarks.bench_stream_ttfb import free_port
+
+
+async def run_phase(engine, requests: int, concurrency: int, stream: bool) -> dict:
+    from app.ml.llm_engine import LLMUnavailableError
+
+    slots = asyncio.Semaphore(concurrency)
+    ok, fallback = [], []
+
+    async def one():
+        async with slots:
+            start = time.perf_counter()
+            try:
+                if stream:
+                    async for _ in engine.stream_completion("Combien de jours de congés ?"):
+                        pass
+                else:
+                    await engine.get_completion("Combien de jours de congés ?")
+                ok.append(time.perf_counter() - start)
+            except LLMUnavailableError:
+                fallback.append(time.perf_counter() - start)
+
+    await asyncio.gather(*(one() for _ in range(requests)))
+    return {"ok": ok, "fallback": fallback}
+
+
+async def run(args) -> int:
+    import uvicorn
+
+    port = free_port()
+    os.environ["LLM_BASE_URL"] = f"http://127.0.0.1:{port}/v1"
+    from app.ml.llm_engine import LLMEngine
+
+    behaviour = Behaviour(latency_ms=args.latency_ms, error_rate=args.error_rate / 2, rate_limit_rate=args.error_rate / 2, retry_after_s=0.1)
+    server = uvicorn.Server(uvicorn.Config(create_app(behaviour), host="127.0.0.1", port=port, log_level="warning"))
+    serving = asyncio.create_task(server.serve())
+    while not server.started:
+        await asyncio.sleep(0.05)
+
+    engine = LLMEngine(model="mock")
+    phases = [
+        ("flaky", {}),
+        ("outage", {"error_rate": 1.0, "rate_limit_rate": 0.0}),
+        ("recovery", {"error_rate": 0.0, "rate_limit_rate": 0.0}),
+    ]
+    async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}") as control:
+        for name, changes in phases:
+            await control.post("/control", json=changes)
+            if name == "recovery":
+                await asyncio.sleep(float(os.environ["LLM_BREAKER_RESET_SECONDS"]))
+            before = engine.stats()
+            results = await run_phase(engine, args.requests, args.concurrency, args.stream)
+            after = engine.stats()
+            print(f"--- {name}: {len(results['ok'])} completed, {len(results['fallback'])} fell back to the CDG answer")
+            for label in ("ok", "fallback"):
+                if results[label]:
+                    print_row(f"  {label}", summarize(results[label]))
+            print(
+                f"  retries={after['retries'] - before['retries']} max_waiting={after['max_waiting']} "
+                f"breaker={after['circuit_breaker']['state']} "
+                f"rejected={after['circuit_breaker']['rejected'] - before['circuit_breaker']['rejected']}"
+            )
+        print("mock server:", (await control.get("/stats")).json())
+
+    await engine.close()
+    server.should_exit = True
+    await serving
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--latency-ms", type=float, default=50.0)
+    parser.add_argument("--error-rate", type=float, default=0.2)
+    parser.add_argument("--stream", action="store_true")
+    parser.add_argument("--breaker-reset-seconds", type=float, default=2.0)
+    args = parser.parse_args()
+    # Settings are read at import time: configure the client before importing the app
+    os.environ.setdefault("OPENAI_API_KEY", "mock")
+    os.environ["LLM_BREAKER_RESET_SECONDS"] = str(args.breaker_reset_seconds)
+    os.environ.setdefault("LLM_RETRY_BASE_DELAY", "0.05")
+    os.environ.setdefault("LLM_RETRY_MAX_DELAY", "0.5")
+    sys.exit(asyncio.run(run(args)))
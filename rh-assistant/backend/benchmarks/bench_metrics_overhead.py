@@ -0,0 +1,59 @@
+"""Per-span cost of the metrics layer (app/core/metrics.py).
+
+Times `with span(...)` around an empty block, outside a request and inside a request
+traced for Server-Timing, against the bare loop; plus a histogram observe and a
+full /metrics render.
+
+    python -m benchmarks.bench_metrics_overhead --iterations 200000
+"""
+
+import argparse
+import time
+
+from app.core.metrics import _server_timing, metrics, span, stage_duration
+
+
+def per_call_us(fn, iterations: int) -> float:
+    start = time.perf_counter()
+    fn(iterations)
+    return (time.perf_counter() - start) / iterations * 1e6
+
+
+def empty_loop(n: int):
+    for _ in range(n):
+        pass
+
+
+def spans(n: int):
+    for _ in range(n):
+        with span("bench"):
+            pass
+
+
+def observes(n: int):
+    for _ in range(n):
+        stage_duration.observe(0.001, "bench")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=200_000)
+    args = parser.parse_args()
+
+    baseline = per_call_us(empty_loop, args.iterations)
+    untraced = per_call_us(spans, args.iterations) - baseline
+    token = _server_timing.set({})
+    traced = per_call_us(spans, args.iterations) - baseline
+    _server_timing.reset(token)
+    observe = per_call_us(observes, args.iterations) - baseline
+
+    print(f"span (no Server-Timing)      {untraced:6.2f} us")
+    print(f"span (traced request)        {traced:6.2f} us")
+    print(f"histogram observe            {observe:6.2f} us")
+    start = time.perf_counter()
+    body = metrics.render()
+    print(f"render /metrics              {(time.perf_counter() - start) * 1000:6.2f} ms ({len(body.splitlines())} lines)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,47 @@
+"""Resident memory of the embedding stack, and how many model instances it holds.
+
+Before the shared registry, importing app.ml.vectorizer loaded paraphrase-MiniLM-L6-v2
+twice (once for embeddings_generator, once inside Chroma's embedding function). Run it
+from a fresh interpreter, because RSS only ever grows within a process.
+"""
+
+import gc
+import os
+import tempfile
+
+
+def rss_mb() -> float:
+    with open("/proc/self/status") as status:
+        for line in status:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) / 1024
+    return 0.0
+
+
+def count_models() -> int:
+    from sentence_transformers import SentenceTransformer
+
+    gc.collect()
+    return sum(isinstance(obj, SentenceTransformer) for obj in gc.get_objects())
+
+
+def run():
+    os.chdir(tempfile.mkdtemp())  # keep the throwaway chroma_db out of the repo
+    baseline = rss_mb()
+    print(f"baseline                        {baseline:8.1f} MB")
+
+    from app.ml.embeddings import embeddings_generator
+    from app.ml.vectorizer import ChromaVectorizer
+
+    vectorizer = ChromaVectorizer()
+    print(f"after imports                   {rss_mb():8.1f} MB")
+
+    embeddings_generator.generate_embedding("congés payés")
+    vectorizer.add_document("bench", "congés payés annuels", {"source": "bench"})
+    vectorizer.search_documents("congés", n_results=1)
+    print(f"after first encode + query      {rss_mb():8.1f} MB  (+{rss_mb() - baseline:.1f} MB)")
+    print(f"SentenceTransformer instances   {count_models():8d}")
+
+
+if __name__ == "__main__":
+    run()
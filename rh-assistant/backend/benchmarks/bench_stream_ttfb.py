@@ -0,0 +1,110 @@
+"""Time-to-first-byte of the streaming chat endpoint against a buffered LLM completion.
+
+Starts the app under uvicorn on a local port (the ASGI test transport buffers whole
+responses, so it cannot observe streaming) with the stub LLM backend, then for each
+question records, over real HTTP:
+
+- first byte: the `sources` event, sent before any LLM call
+- first token: the first `token` event
+- done: the complete response
+
+"buffered" is the time a non-streaming endpoint would need before its first byte:
+retrieval plus a full `get_completion` call on the same stub.
+
+    python -m benchmarks.bench_stream_ttfb --requests 20 --first-token-ms 300 --token-ms 20
+"""
+
+import argparse
+import asyncio
+import os
+import socket
+import sys
+import time
+from types import SimpleNamespace
+
+import httpx
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+async def stream_once(client: httpx.AsyncClient, message: str) -> dict:
+    payload = {"message": message, "user_id": 1, "session_id": "bench-stream"}
+    start = time.perf_counter()
+    timings = {}
+    async with client.stream("POST", "/chat/stream", json=payload, headers={"Authorization": "Bearer bench"}) as response:
+        response.raise_for_status()
+        async for line in response.aiter_lines():
+            now = time.perf_counter() - start
+            timings.setdefault("first_byte", now)
+            if line == "event: token":
+                timings.setdefault("first_token", now)
+            elif line == "event: done":
+                timings["done"] = now
+    return timings
+
+
+async def run(requests: int) -> int:
+    import uvicorn
+
+    from app.api.endpoints.chat import get_current_user
+    from app.data.cdg_data import search_cdg_content
+    from app.main import app
+    from app.ml.llm_engine import llm_engine
+    from app.services.rag import rag_pipeline
+    from benchmarks.common import summarize
+
+    app.dependency_overrides[get_current_user] = lambda: SimpleNamespace(
+        id=1, email="bench@example.com", full_name="Bench", is_active=True, role="user"
+    )
+    port = free_port()
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+    serving = asyncio.create_task(server.serve())
+    while not server.started:
+        await asyncio.sleep(0.05)
+
+    questions = [f"Combien de jours de congés payés par an ? ({i})" for i in range(requests)]
+    samples = {"first_byte": [], "first_token": [], "done": []}
+    async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}", timeout=60) as client:
+        for question in questions:
+            timings = await stream_once(client, question)
+            for name in samples:
+                samples[name].append(timings[name])
+
+    buffered = []
+    for question in questions:
+        start = time.perf_counter()
+        cdg_results = search_cdg_content(question)
+        context = await rag_pipeline.retrieve(question, cdg_results)
+        await llm_engine.get_completion(rag_pipeline.build_prompt(question, context, {}))
+        buffered.append(time.perf_counter() - start)
+
+    server.should_exit = True
+    await serving
+
+    for name, values in [*samples.items(), ("buffered", buffered)]:
+        stats = summarize(values)
+        print(f"{name:<12} p50={stats['p50_ms']:8.1f}ms p95={stats['p95_ms']:8.1f}ms p99={stats['p99_ms']:8.1f}ms")
+    speedup = summarize(buffered)["p50_ms"] / max(summarize(samples["first_byte"])["p50_ms"], 1e-6)
+    print(f"first byte is {speedup:.0f}x sooner than a buffered completion (p50)")
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=20)
+    parser.add_argument("--first-token-ms", type=float, default=300.0)
+    parser.add_argument("--token-ms", type=float, default=20.0)
+    args = parser.parse_args()
+    # Settings are read at import time: configure the stub before importing the app
+    os.environ["LLM_BACKEND"] = "stub"
+    os.environ["LLM_STUB_FIRST_TOKEN_MS"] = str(args.first_token_ms)
+    os.environ["LLM_STUB_TOKEN_MS"] = str(args.token_ms)
+    os.environ.setdefault("WARMUP_ON_STARTUP", "false")
+    os.environ.setdefault("SEMANTIC_CACHE_ENABLED", "false")
+    # The benchmark question matches a FAQ entry: always go through the LLM
+    os.environ.setdefault("RAG_FAQ_DIRECT_THRESHOLD", "1.01")
+    sys.exit(asyncio.run(run(args.requests)))
@@ -0,0 +1,89 @@
+"""Chat latency while a large PDF is being ingested on the same worker.
+
+Measures /chat p50/p99 on an idle app, then again while 200-page PDFs are uploaded
+back to back, all in-process through an ASGI transport. Since parsing runs in the
+extraction process pool and embeddings on a worker thread, chat p99 should barely
+move. Exits non-zero if p99 degrades by more than --max-p99-ratio.
+
+    python -m benchmarks.bench_upload_contention --pages 200
+"""
+
+import argparse
+import asyncio
+import sys
+import time
+from types import SimpleNamespace
+
+import httpx
+
+from app.api.endpoints.chat import get_current_user
+from app.main import app
+from benchmarks.common import make_text_pdf, summarize
+
+ADMIN = SimpleNamespace(id=1, email="admin@example.com", full_name="Bench Admin", is_active=True, role="admin")
+
+
+async def chat_latencies(client: httpx.AsyncClient, requests: int) -> list:
+    samples = []
+    for i in range(requests):
+        start = time.perf_counter()
+        response = await client.post(
+            "/chat/",
+            json={"message": f"Combien de jours de congés ? #{i}", "user_id": ADMIN.id, "session_id": f"bench-{i}"},
+            headers={"Authorization": "Bearer bench"},
+        )
+        response.raise_for_status()
+        samples.append(time.perf_counter() - start)
+        await asyncio.sleep(0.01)
+    return samples
+
+
+async def upload_loop(client: httpx.AsyncClient, pdf: bytes, stop: asyncio.Event) -> int:
+    uploads = 0
+    while not stop.is_set():
+        response = await client.post(
+            "/upload/documents",
+            files={"file": ("big.pdf", pdf, "application/pdf")},
+            headers={"Authorization": "Bearer bench"},
+        )
+        response.raise_for_status()
+        # Ingestion runs as a background job: wait for it so uploads stay back to back
+        status_url = response.json()["status_url"]
+        while True:
+            job = (await client.get(status_url, headers={"Authorization": "Bearer bench"})).json()
+            if job["status"] in ("succeeded", "failed"):
+                break
+            await asyncio.sleep(0.1)
+        uploads += 1
+    return uploads
+
+
+async def run(pages: int, requests: int, max_ratio: float) -> int:
+    app.dependency_overrides[get_current_user] = lambda: ADMIN
+    pdf = make_text_pdf(pages)
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=600) as client:
+        await chat_latencies(client, 20)  # warm-up
+        idle = summarize(await chat_latencies(client, requests))
+
+        stop = asyncio.Event()
+        uploader = asyncio.create_task(upload_loop(client, pdf, stop))
+        await asyncio.sleep(0.5)
+        loaded = summarize(await chat_latencies(client, requests))
+        stop.set()
+        uploads = await uploader
+
+    print(f"idle            p50={idle['p50_ms']:.1f}ms p99={idle['p99_ms']:.1f}ms")
+    print(f"during upload   p50={loaded['p50_ms']:.1f}ms p99={loaded['p99_ms']:.1f}ms ({uploads} x {pages}-page PDF)")
+    ratio = loaded["p99_ms"] / idle["p99_ms"] if idle["p99_ms"] else 0.0
+    print(f"p99 ratio       {ratio:.2f} (max {max_ratio})")
+    return 0 if ratio <= max_ratio else 1
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--pages", type=int, default=200)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--max-p99-ratio", type=float, default=2.0)
+    args = parser.parse_args()
+    sys.exit(asyncio.run(run(args.pages, args.requests, args.max_p99_ratio)))
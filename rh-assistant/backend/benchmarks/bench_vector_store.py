@@ -0,0 +1,96 @@
+"""NumpyVectorStore against Chroma on the same random corpus.
+
+For each corpus size, times a single top-k query, a batch of queries in one call
+(reported per query) and a query filtered on a metadata key, on both backends. Chroma
+runs in memory (EphemeralClient, cosine space) and NumpyVectorStore in a temporary
+directory. Chroma is skipped when chromadb is not installed.
+
+    python -m benchmarks.bench_vector_store --sizes 1000 5000 20000 --iterations 300
+"""
+
+import argparse
+import tempfile
+
+import numpy as np
+
+from app.ml.numpy_vector_store import NumpyVectorStore
+from benchmarks.common import measure, print_row
+
+DIMENSION = 384  # paraphrase-MiniLM-L6-v2
+CATEGORIES = 8
+
+
+def corpus(size: int, rng: np.random.Generator):
+    embeddings = rng.normal(size=(size, DIMENSION)).astype(np.float32)
+    ids = [str(i) for i in range(size)]
+    documents = [f"passage {i}" for i in range(size)]
+    metadatas = [{"category": f"c{i % CATEGORIES}"} for i in range(size)]
+    return ids, documents, metadatas, embeddings
+
+
+def chroma_store(size: int, ids, documents, metadatas, embeddings):
+    import chromadb
+
+    client = chromadb.EphemeralClient()
+    collection = client.get_or_create_collection(f"bench_{size}", metadata={"hnsw:space": "cosine"}, embedding_function=None)
+    for offset in range(0, size, 1000):
+        collection.add(
+            ids=ids[offset:offset + 1000],
+            embeddings=embeddings[offset:offset + 1000].tolist(),
+            documents=documents[offset:offset + 1000],
+            metadatas=metadatas[offset:offset + 1000],
+        )
+
+    def query(vectors, n_results, where=None):
+        return collection.query(query_embeddings=vectors, n_results=n_results, where=where, include=["documents", "metadatas", "distances"])
+
+    return query, lambda: client.delete_collection(f"bench_{size}")
+
+
+def per_query(stats: dict, batch: int) -> dict:
+    return {**stats, **{key: value / batch for key, value in stats.items() if key.endswith("_ms")}, "ops_per_s": stats["ops_per_s"] * batch}
+
+
+def bench(label: str, query, queries: np.ndarray, iterations: int, top_k: int, batch: int):
+    position = iter(range(10**9))
+    single = [[vector] for vector in queries.tolist()]
+    print_row(f"{label} query", measure(lambda: query(single[next(position) % len(single)], top_k), iterations))
+    batches = [queries[i:i + batch].tolist() for i in range(0, len(queries) - batch + 1, batch)]
+    print_row(
+        f"{label} batch x{batch} (per query)",
+        per_query(measure(lambda: query(batches[next(position) % len(batches)], top_k), max(1, iterations // batch)), batch),
+    )
+    where = {"category": "c3"}
+    print_row(f"{label} query where", measure(lambda: query(single[next(position) % len(single)], top_k, where), iterations))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 5000, 20000])
+    parser.add_argument("--iterations", type=int, default=300)
+    parser.add_argument("--top-k", type=int, default=5)
+    parser.add_argument("--batch", type=int, default=32)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    queries = rng.normal(size=(max(args.batch * 4, 64), DIMENSION)).astype(np.float32)
+    for size in args.sizes:
+        ids, documents, metadatas, embeddings = corpus(size, rng)
+        with tempfile.TemporaryDirectory() as directory:
+            store = NumpyVectorStore(f"bench_{size}", {"hnsw:space": "cosine"}, directory)
+            store.upsert_chunks(ids, documents, metadatas, embeddings)
+            bench(f"numpy {size}", store.query_by_embeddings, queries, args.iterations, args.top_k, args.batch)
+
+        try:
+            query, drop = chroma_store(size, ids, documents, metadatas, embeddings)
+        except ImportError:
+            print(f"chroma {size:<34} skipped (chromadb not installed)")
+            continue
+        try:
+            bench(f"chroma {size}", query, queries, args.iterations, args.top_k, args.batch)
+        finally:
+            drop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+"""Small timing helpers shared by the benchmark scripts.
+
+Run the scripts from the backend directory, e.g. ``python -m benchmarks.bench_cdg_search``.
+``python -m benchmarks.suite`` runs the standard cases and saves/compares JSON baselines.
+"""
+
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+from datetime import datetime, timezone
+from typing import Callable, Dict, List, Optional
+
+
+def percentile(samples: List[float], pct: float) -> float:
+    ordered = sorted(samples)
+    if not ordered:
+        return 0.0
+    rank = min(len(ordered) - 1, max(0, round(pct / 100 * (len(ordered) - 1))))
+    return ordered[rank]
+
+
+def summarize(samples_s: List[float]) -> Dict[str, float]:
+    """Latency summary in milliseconds plus throughput in operations per second."""
+    total = sum(samples_s)
+    return {
+        "count": len(samples_s),
+        "mean_ms": statistics.fmean(samples_s) * 1000 if samples_s else 0.0,
+        "p50_ms": percentile(samples_s, 50) * 1000,
+        "p95_ms": percentile(samples_s, 95) * 1000,
+        "p99_ms": percentile(samples_s, 99) * 1000,
+        "ops_per_s": len(samples_s) / total if total else 0.0,
+    }
+
+
+def measure(fn: Callable[[], object], iterations: int, warmup: int = 5) -> Dict[str, float]:
+    for _ in range(warmup):
+        fn()
+    samples = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return summarize(samples)
+
+
+def print_row(label: str, stats: Dict[str, float]):
+    print(
+        f"{label:<40} p50={stats['p50_ms']:8.3f}ms p95={stats['p95_ms']:8.3f}ms "
+        f"p99={stats['p99_ms']:8.3f}ms {stats['ops_per_s']:10.1f} ops/s"
+    )
+
+
+async def measure_async(fn: Callable[[], object], iterations: int, warmup: int = 5) -> Dict[str, float]:
+    for _ in range(warmup):
+        await fn()
+    samples = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        await fn()
+        samples.append(time.perf_counter() - start)
+    return summarize(samples)
+
+
+def save_results(path: str, results: Dict[str, Dict[str, float]]):
+    """Write a baseline: per-case summaries plus the environment they were measured in."""
+    payload = {
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "results": results,
+    }
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(payload, f, indent=2, sort_keys=True)
+
+
+def load_results(path: str) -> Dict[str, Dict[str, float]]:
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)["results"]
+
+
+def compare_results(
+    current: Dict[str, Dict[str, float]],
+    baseline: Dict[str, Dict[str, float]],
+    metric: str = "p95_ms",
+    tolerance: float = 0.2,
+) -> List[dict]:
+    """Cases present in both runs, with `regressed` set when `metric` grew by more than `tolerance`."""
+    rows = []
+    for name in sorted(current.keys() & baseline.keys()):
+        before, after = baseline[name].get(metric), current[name].get(metric)
+        if before is None or after is None:
+            continue
+        ratio = after / before if before else float("inf") if after else 1.0
+        rows.append({"case": name, "baseline": before, "current": after, "ratio": ratio, "regressed": ratio > 1 + tolerance})
+    return rows
+
+
+def print_comparison(rows: List[dict], metric: str):
+    for row in rows:
+        flag = "REGRESSION" if row["regressed"] else ""
+        print(f"{row['case']:<40} {metric} {row['baseline']:10.3f} -> {row['current']:10.3f} ({row['ratio']:5.2f}x) {flag}")
+
+
+def make_text_pdf(pages: int, lines_per_page: int = 45) -> bytes:
+    """Minimal multi-page PDF with real text content streams (Helvetica)."""
+    line = "Article {page}.{n} - Les congés annuels sont de 30 jours ouvrables par an pour tout agent."
+    objects: List[Optional[str]] = ["<< /Type /Catalog /Pages 2 0 R >>", None, "<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    kids = []
+    for page in range(pages):
+        text = "".join(
+            f"({line.format(page=page, n=n).encode('latin-1', 'replace').decode('latin-1')}) Tj 0 -14 Td "
+            for n in range(lines_per_page)
+        )
+        stream = f"BT /F1 10 Tf 40 800 Td {text}ET"
+        objects.append(f"<< /Length {len(stream.encode('latin-1'))} >>\nstream\n{stream}\nendstream")
+        content_id = len(objects)
+        objects.append(f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] "
+                       f"/Resources << /Font << /F1 3 0 R >> >> /Contents {content_id} 0 R >>")
+        kids.append(f"{len(objects)} 0 R")
+    objects[1] = f"<< /Type /Pages /Kids [{' '.join(kids)}] /Count {pages} >>"
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += f"{number} 0 obj\n{body}\nendobj\n".encode("latin-1")
+    xref = len(out)
+    out += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode()
+    out += "".join(f"{offset:010d} 00000 n \n" for offset in offsets).encode()
+    out += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode()
+    return bytes(out)
@@ -0,0 +1,108 @@
+"""In-process HTTP load generator for the FastAPI app.
+
+Requests go through httpx's ASGI transport (no sockets, no server process), with
+`concurrency` virtual users issuing requests back to back. Authentication is replaced
+by a fixed user, the LLM by the stub backend and the external APIs by their mock data,
+so the numbers only depend on this code base:
+
+    python -m benchmarks.loadgen --requests 500 --concurrency 16
+"""
+
+import argparse
+import asyncio
+import itertools
+import os
+import time
+from types import SimpleNamespace
+from typing import Callable, Dict, Tuple
+
+import httpx
+
+from benchmarks.common import summarize
+
+BENCH_USER = SimpleNamespace(id=1, email="bench@example.com", full_name="Bench", is_active=True, role="user")
+
+QUESTIONS = [
+    "Combien de jours de congés payés par an ?",
+    "Comment demander un prêt social ?",
+    "Quel est le taux de cotisation retraite ?",
+    "Procédure de changement d'adresse",
+    "Quels sont les avantages sociaux ?",
+    "Conditions de la retraite anticipée",
+]
+
+
+def configure_offline_environment(first_token_ms: float = 20.0, token_ms: float = 0.0):
+    """Settings are read at import time: call before importing anything from `app`."""
+    os.environ["LLM_BACKEND"] = "stub"
+    os.environ["LLM_STUB_FIRST_TOKEN_MS"] = str(first_token_ms)
+    os.environ["LLM_STUB_TOKEN_MS"] = str(token_ms)
+    os.environ["WEATHER_API_KEY"] = "demo_key"
+    os.environ["CURRENCY_API_KEY"] = "demo_key"
+    os.environ.setdefault("WARMUP_ON_STARTUP", "false")
+    os.environ.setdefault("SEMANTIC_CACHE_ENABLED", "false")
+    # Vector search needs the embedding model and Chroma; measured by its own suite cases
+    os.environ.setdefault("RAG_VECTOR_SEARCH_ENABLED", "false")
+
+
+def chat_request(unique: bool) -> Callable[[int], Tuple[str, str, dict]]:
+    """Request factory for POST /chat/: `unique` questions always miss the response caches."""
+
+    def make(i: int):
+        question = QUESTIONS[i % len(QUESTIONS)]
+        message = f"{question} (#{i})" if unique else question
+        return "POST", "/chat/", {"message": message, "user_id": BENCH_USER.id, "session_id": f"bench-{i % 50}"}
+
+    return make
+
+
+async def http_load(
+    client: httpx.AsyncClient, make_request: Callable[[int], Tuple[str, str, dict]], requests: int, concurrency: int
+) -> Dict[str, float]:
+    """Latency summary plus wall-clock throughput (`rps`) and the count of non-2xx answers."""
+    counter = itertools.count()
+    samples, errors = [], 0
+
+    async def user():
+        nonlocal errors
+        while (i := next(counter)) < requests:
+            method, url, payload = make_request(i)
+            start = time.perf_counter()
+            response = await client.request(method, url, json=payload)
+            samples.append(time.perf_counter() - start)
+            if response.status_code >= 300:
+                errors += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(user() for _ in range(concurrency)))
+    wall = time.perf_counter() - start
+    return {**summarize(samples), "rps": len(samples) / wall if wall else 0.0, "errors": errors}
+
+
+def bench_client() -> httpx.AsyncClient:
+    from app.api.endpoints.chat import get_current_user
+    from app.main import app
+
+    app.dependency_overrides[get_current_user] = lambda: BENCH_USER
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench", timeout=120)
+
+
+async def run(requests: int, concurrency: int, unique: bool):
+    async with bench_client() as client:
+        await http_load(client, chat_request(unique), min(requests, 20), 1)  # warm-up
+        stats = await http_load(client, chat_request(unique), requests, concurrency)
+    print(
+        f"POST /chat/ x{requests} c={concurrency}: {stats['rps']:.1f} req/s "
+        f"p50={stats['p50_ms']:.1f}ms p95={stats['p95_ms']:.1f}ms p99={stats['p99_ms']:.1f}ms errors={stats['errors']}"
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--unique", action="store_true", help="unique questions (cache misses only)")
+    parser.add_argument("--first-token-ms", type=float, default=20.0)
+    args = parser.parse_args()
+    configure_offline_environment(args.first_token_ms)
+    asyncio.run(run(args.requests, args.concurrency, args.unique))
@@ -0,0 +1,124 @@
+"""OpenAI-compatible mock of `/v1/chat/completions` with latency and failure injection.
+
+Serves both plain and `stream=True` (SSE) completions. Failures are drawn per request:
+a 429 with Retry-After, a 503, or a hang longer than the client timeout. The mix can be
+changed at runtime with `POST /control` (e.g. to simulate an outage and a recovery).
+
+    python -m benchmarks.mock_llm_server --port 8900 --error-rate 0.2
+    LLM_BASE_URL=http://127.0.0.1:8900/v1 uvicorn app.main:app
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import time
+from dataclasses import asdict, dataclass
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+ANSWER = "Vous avez droit à 22 jours de congés payés par an, à poser après validation de votre responsable."
+
+
+@dataclass
+class Behaviour:
+    latency_ms: float = 50.0
+    token_ms: float = 10.0
+    rate_limit_rate: float = 0.0
+    error_rate: float = 0.0
+    hang_rate: float = 0.0
+    hang_s: float = 60.0
+    retry_after_s: float = 0.5
+
+
+def create_app(behaviour: Behaviour) -> FastAPI:
+    app = FastAPI()
+    app.state.behaviour = behaviour
+    app.state.counts = {"requests": 0, "ok": 0, "rate_limited": 0, "errors": 0, "hangs": 0}
+
+    def chunk(delta: dict, finish_reason=None) -> str:
+        payload = {
+            "id": "chatcmpl-mock",
+            "object": "chat.completion.chunk",
+            "created": int(time.time()),
+            "model": "mock",
+            "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+        }
+        return f"data: {json.dumps(payload)}\n\n"
+
+    @app.post("/v1/chat/completions")
+    async def completions(request: Request):
+        body = await request.json()
+        current, counts = app.state.behaviour, app.state.counts
+        counts["requests"] += 1
+        draw = random.random()
+        if draw < current.rate_limit_rate:
+            counts["rate_limited"] += 1
+            return JSONResponse(
+                {"error": {"message": "Rate limit reached", "type": "rate_limit_error"}},
+                status_code=429,
+                headers={"Retry-After": str(current.retry_after_s)},
+            )
+        draw -= current.rate_limit_rate
+        if draw < current.error_rate:
+            counts["errors"] += 1
+            return JSONResponse({"error": {"message": "Overloaded", "type": "server_error"}}, status_code=503)
+        draw -= current.error_rate
+        if draw < current.hang_rate:
+            counts["hangs"] += 1
+            await asyncio.sleep(current.hang_s)
+
+        await asyncio.sleep(current.latency_ms / 1000)
+        counts["ok"] += 1
+        if not body.get("stream"):
+            return {
+                "id": "chatcmpl-mock",
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": body.get("model", "mock"),
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": ANSWER}, "finish_reason": "stop"}],
+                "usage": {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0},
+            }
+
+        async def events():
+            yield chunk({"role": "assistant", "content": ""})
+            for index, word in enumerate(ANSWER.split(" ")):
+                await asyncio.sleep(current.token_ms / 1000)
+                yield chunk({"content": word if index == 0 else " " + word})
+            yield chunk({}, finish_reason="stop")
+            yield "data: [DONE]\n\n"
+
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    @app.post("/control")
+    async def control(changes: dict):
+        for name, value in changes.items():
+            if hasattr(app.state.behaviour, name):
+                setattr(app.state.behaviour, name, float(value))
+        return asdict(app.state.behaviour)
+
+    @app.get("/stats")
+    async def stats():
+        return app.state.counts
+
+    return app
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--port", type=int, default=8900)
+    parser.add_argument("--latency-ms", type=float, default=50.0)
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--hang-rate", type=float, default=0.0)
+    args = parser.parse_args()
+    behaviour = Behaviour(
+        latency_ms=args.latency_ms,
+        rate_limit_rate=args.rate_limit_rate,
+        error_rate=args.error_rate,
+        hang_rate=args.hang_rate,
+    )
+    uvicorn.run(create_app(behaviour), host="127.0.0.1", port=args.port, log_level="warning")
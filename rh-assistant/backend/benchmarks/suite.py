@@ -0,0 +1,211 @@
+"""Standard benchmark suite with JSON baselines for regression checks.
+
+Cases (all offline: stub LLM, mock external APIs, temporary stores):
+
+- cdg_search: BM25 search over the CDG knowledge base
+- chat_cold / chat_warm: ChatService.process_chat_query on unseen vs cached questions
+- embedding_encode: one batched SentenceTransformer encode
+- chroma_query_<n>: nearest-neighbour query on an in-memory Chroma collection of n vectors
+- numpy_query_<n>: the same query on NumpyVectorStore (VECTOR_STORE_BACKEND=numpy)
+- pdf_extraction: text extraction of a generated PDF through the process pool
+- http_chat_cold / http_chat_warm: POST /chat/ through the in-process load generator
+
+Cases whose optional dependency is missing are reported as skipped.
+
+    python -m benchmarks.suite --save baselines/main.json
+    python -m benchmarks.suite --compare baselines/main.json --tolerance 0.2
+
+With --compare, the exit code is 1 when a case's --metric (default p95_ms) grew by
+more than the tolerance.
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import sys
+import tempfile
+from typing import Callable, Dict
+
+from benchmarks.common import compare_results, load_results, make_text_pdf, measure, measure_async, print_comparison, print_row, save_results
+from benchmarks.loadgen import QUESTIONS, bench_client, chat_request, configure_offline_environment, http_load
+
+# One event loop for every async case: the app singletons (caches, locks, queues) bind to it
+_loop = asyncio.new_event_loop()
+
+
+def run_async(coroutine):
+    return _loop.run_until_complete(coroutine)
+
+
+def case_cdg_search(quick: bool) -> Dict[str, float]:
+    from app.data.cdg_data import search_cdg_content
+
+    queries = iter(QUESTIONS * 100_000)
+    return measure(lambda: search_cdg_content(next(queries)), 500 if quick else 5000)
+
+
+def _chat_query(message: str):
+    from types import SimpleNamespace
+
+    return SimpleNamespace(message=message, session_id="bench", user_id=1)
+
+
+def case_chat_cold(quick: bool) -> Dict[str, float]:
+    from app.services.chat_service import chat_service
+
+    counter = iter(range(10**9))
+
+    async def one():
+        i = next(counter)
+        await chat_service.process_chat_query(None, _chat_query(f"{QUESTIONS[i % len(QUESTIONS)]} (#{i})"))
+
+    return run_async(measure_async(one, 30 if quick else 200))
+
+
+def case_chat_warm(quick: bool) -> Dict[str, float]:
+    from app.services.chat_service import chat_service
+
+    counter = iter(range(10**9))
+
+    async def one():
+        await chat_service.process_chat_query(None, _chat_query(QUESTIONS[next(counter) % len(QUESTIONS)]))
+
+    # Warm-up iterations fill the caches with every question
+    return run_async(measure_async(one, 500 if quick else 5000, warmup=len(QUESTIONS)))
+
+
+def case_embedding_encode(quick: bool) -> Dict[str, float]:
+    from app.ml.embeddings import embeddings_generator
+
+    texts = [f"{question} ({i})" for i, question in enumerate(QUESTIONS * 6)]
+    return measure(lambda: embeddings_generator.generate_embeddings(texts), 5 if quick else 30, warmup=2)
+
+
+def chroma_case(size: int) -> Callable[[bool], Dict[str, float]]:
+    def case(quick: bool) -> Dict[str, float]:
+        import chromadb
+
+        rng = random.Random(size)
+        dimension = 384  # paraphrase-MiniLM-L6-v2
+        client = chromadb.EphemeralClient()
+        collection = client.get_or_create_collection(f"bench_{size}", metadata={"hnsw:space": "cosine"}, embedding_function=None)
+        for offset in range(0, size, 1000):
+            count = min(1000, size - offset)
+            collection.add(
+                ids=[str(offset + i) for i in range(count)],
+                embeddings=[[rng.gauss(0, 1) for _ in range(dimension)] for _ in range(count)],
+                documents=[f"passage {offset + i}" for i in range(count)],
+                metadatas=[{"category": f"c{(offset + i) % 8}"} for i in range(count)],
+            )
+        queries = [[rng.gauss(0, 1) for _ in range(dimension)] for _ in range(50)]
+        position = iter(range(10**9))
+        try:
+            return measure(
+                lambda: collection.query(query_embeddings=[queries[next(position) % len(queries)]], n_results=5),
+                100 if quick else 1000,
+            )
+        finally:
+            client.delete_collection(f"bench_{size}")
+
+    return case
+
+
+def numpy_store_case(size: int) -> Callable[[bool], Dict[str, float]]:
+    def case(quick: bool) -> Dict[str, float]:
+        from app.ml.numpy_vector_store import NumpyVectorStore
+
+        rng = random.Random(size)
+        dimension = 384
+        with tempfile.TemporaryDirectory() as directory:
+            store = NumpyVectorStore(f"bench_{size}", {"hnsw:space": "cosine"}, directory)
+            store.upsert_chunks(
+                [str(i) for i in range(size)],
+                [f"passage {i}" for i in range(size)],
+                [{"category": f"c{i % 8}"} for i in range(size)],
+                [[rng.gauss(0, 1) for _ in range(dimension)] for _ in range(size)],
+            )
+            queries = [[rng.gauss(0, 1) for _ in range(dimension)] for _ in range(50)]
+            position = iter(range(10**9))
+            return measure(lambda: store.query_by_embedding(queries[next(position) % len(queries)], 5), 100 if quick else 1000)
+
+    return case
+
+
+def case_pdf_extraction(quick: bool) -> Dict[str, float]:
+    from app.services.extraction import iter_pdf_pages, shutdown_extraction_executor
+
+    pages = 20 if quick else 100
+    with tempfile.NamedTemporaryFile(suffix=".pdf", delete=False) as f:
+        f.write(make_text_pdf(pages))
+    try:
+        async def extract():
+            async for _ in iter_pdf_pages(f.name):
+                pass
+
+        return run_async(measure_async(extract, 3 if quick else 10, warmup=1))
+    finally:
+        os.unlink(f.name)
+        shutdown_extraction_executor()
+
+
+def http_case(unique: bool) -> Callable[[bool], Dict[str, float]]:
+    def case(quick: bool) -> Dict[str, float]:
+        async def run():
+            async with bench_client() as client:
+                await http_load(client, chat_request(unique), 20, 1)
+                return await http_load(client, chat_request(unique), 100 if quick else 1000, 16)
+
+        return run_async(run())
+
+    return case
+
+
+CASES: Dict[str, Callable[[bool], Dict[str, float]]] = {
+    "cdg_search": case_cdg_search,
+    "chat_cold": case_chat_cold,
+    "chat_warm": case_chat_warm,
+    "embedding_encode": case_embedding_encode,
+    "chroma_query_1000": chroma_case(1000),
+    "chroma_query_10000": chroma_case(10000),
+    "numpy_query_1000": numpy_store_case(1000),
+    "numpy_query_10000": numpy_store_case(10000),
+    "pdf_extraction": case_pdf_extraction,
+    "http_chat_cold": http_case(unique=True),
+    "http_chat_warm": http_case(unique=False),
+}
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--only", nargs="*", choices=sorted(CASES), help="run a subset of the cases")
+    parser.add_argument("--quick", action="store_true", help="fewer iterations (smoke run)")
+    parser.add_argument("--save", metavar="PATH", help="write the results as a JSON baseline")
+    parser.add_argument("--compare", metavar="PATH", help="compare against a saved baseline")
+    parser.add_argument("--metric", default="p95_ms")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed relative growth of --metric")
+    args = parser.parse_args()
+
+    configure_offline_environment()
+    results = {}
+    for name in args.only or CASES:
+        try:
+            results[name] = CASES[name](args.quick)
+        except ImportError as e:
+            print(f"{name:<40} skipped ({e.name} not installed)")
+            continue
+        print_row(name, results[name])
+
+    if args.save:
+        save_results(args.save, results)
+        print(f"saved {len(results)} results to {args.save}")
+    if args.compare:
+        rows = compare_results(results, load_results(args.compare), args.metric, args.tolerance)
+        print_comparison(rows, args.metric)
+        if any(row["regressed"] for row in rows):
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
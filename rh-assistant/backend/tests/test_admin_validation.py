@@ -0,0 +1,36 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+from fastapi import HTTPException
+
+from app.api.endpoints import admin
+from app.services.semantic_cache import semantic_cache
+
+
+def _validate(**kwargs):
+    return asyncio.run(admin.validate_hr_response(validation_id=7, db=None, current_user=None, **kwargs))
+
+
+def test_unknown_validation_is_a_404(monkeypatch):
+    async def update(db, validation_id, approved, hr_feedback):
+        return None
+
+    monkeypatch.setattr(admin.hr_service, "update_hr_validation_status", update)
+    with pytest.raises(HTTPException) as error:
+        _validate(approved=True)
+    assert error.value.status_code == 404
+
+
+def test_cache_failure_does_not_fail_the_validation(monkeypatch):
+    validation = SimpleNamespace(query="Comment poser un congé ?", approved=True)
+
+    async def update(db, validation_id, approved, hr_feedback):
+        return validation
+
+    async def mark_approved(query):
+        raise ConnectionError("vector store unavailable")
+
+    monkeypatch.setattr(admin.hr_service, "update_hr_validation_status", update)
+    monkeypatch.setattr(semantic_cache, "mark_approved", mark_approved)
+    assert _validate(approved=True) is validation
@@ -0,0 +1,27 @@
+import asyncio
+
+from app.data.cdg_data import search_cdg_content
+from app.services.chat_service import chat_service
+from app.services.intent import analyze_query
+
+
+def rich_response(question: str) -> dict:
+    return asyncio.run(chat_service._generate_rich_response(question, search_cdg_content(question), {}, analyze_query(question)))
+
+
+def test_off_topic_question_gets_the_generic_answer():
+    response = rich_response("Combien coûte un café à la CDG ?")
+    assert response["sources"] == ["Base de connaissances CDG"]
+    assert "adhésion" not in response["response"].lower()
+
+
+def test_single_shared_term_does_not_pick_an_unrelated_entry():
+    # "procédure" et "demande" figurent aussi dans la politique de liquidation des pensions
+    response = rich_response("Quelle est la procédure de demande de congé ?")
+    assert response["sources"] == ["Base de connaissances CDG"]
+    assert "Gestion des congés" in response["response"]
+
+
+def test_covered_question_is_answered_from_the_knowledge_base():
+    response = rich_response("Comment calculer ma pension de retraite ?")
+    assert response["sources"] == ["CDG FAQ - retraite"]
@@ -0,0 +1,93 @@
+import asyncio
+
+from app.ml.embeddings import embedding_service
+from app.services import interaction_log as interaction_log_module
+from app.services.interaction_log import InteractionLog
+
+
+class UnavailableDatabase:
+    def __init__(self):
+        self.attempts = 0
+
+    def __call__(self):
+        return self
+
+    async def __aenter__(self):
+        self.attempts += 1
+        raise ConnectionError("database is down")
+
+    async def __aexit__(self, *exc_info):
+        return False
+
+
+def test_failed_flush_backs_off_and_keeps_embeddings(monkeypatch):
+    database = UnavailableDatabase()
+    monkeypatch.setattr(interaction_log_module, "SessionLocal", database)
+    encoded = []
+
+    async def embed_many(texts):
+        encoded.extend(texts)
+        return [[0.0] * 4 for _ in texts]
+
+    monkeypatch.setattr(embedding_service, "embed_many", embed_many)
+    log = InteractionLog(batch_size=2, flush_interval=0.05, retry_max_delay=10.0, store_embeddings=True)
+
+    async def run():
+        log.start()
+        # Each record at batch size wakes the flusher up; during the backoff it must not retry
+        for i in range(20):
+            log.record("a@x.com", "s", f"question {i}", {"response": "r"}, 1)
+            await asyncio.sleep(0.01)
+        await log.stop()
+
+    asyncio.run(run())
+    # First attempt, one retry after 0.05s, then 0.1s of backoff; plus the final flush of stop()
+    assert 2 <= database.attempts <= 4
+    assert log.stats()["consecutive_failures"] == database.attempts
+    assert log.stats()["buffered"] == 20
+    # The batch retried after a failure is not encoded again
+    assert encoded == ["question 0", "question 1"]
+
+
+def test_write_pending_skips_the_model_and_the_flush_lock(monkeypatch, tmp_path):
+    from sqlalchemy import select
+    from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+    from app.database import Base
+    from app.models import models
+
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'log.db'}")
+    monkeypatch.setattr(interaction_log_module, "SessionLocal", async_sessionmaker(engine, expire_on_commit=False))
+    encoded = []
+
+    async def embed_many(texts):
+        encoded.extend(texts)
+        return [[0.5] * 4 for _ in texts]
+
+    monkeypatch.setattr(embedding_service, "embed_many", embed_many)
+    log = InteractionLog(batch_size=10, store_embeddings=True)
+
+    async def embeddings():
+        async with interaction_log_module.SessionLocal() as db:
+            rows = (await db.execute(select(models.ChatInteraction.question_text, models.ChatInteraction.embedding_vector))).all()
+        return dict(rows)
+
+    async def run():
+        async with engine.begin() as conn:
+            tables = [models.User.__table__, models.Collaborator.__table__, models.ChatInteraction.__table__]
+            await conn.run_sync(lambda c: Base.metadata.create_all(c, tables=tables))
+        log.record("a@x.com", "s", "question a", {"response": "r"}, 1)
+        log.record("b@x.com", "s", "question b", {"response": "r"}, 1)
+        # A background flush in progress must not delay the history page
+        async with log._flush_lock:
+            await asyncio.wait_for(log.write_pending("a@x.com"), timeout=1.0)
+        assert encoded == []
+        assert await embeddings() == {"question a": None}
+        assert [item.email for item in log._buffer] == ["b@x.com"]
+
+        await log.flush()
+        assert await embeddings() == {"question a": [0.5] * 4, "question b": [0.5] * 4}
+        assert log.stats()["embeddings_to_backfill"] == 0
+        await engine.dispose()
+
+    asyncio.run(run())
@@ -0,0 +1,56 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from app.core.config import settings
+from app.ml.llm_engine import LLMEngine, LLMUnavailableError
+
+
+class FakeClient:
+    def __init__(self, content="Réponse"):
+        self.content = content
+        self.chat = SimpleNamespace(completions=self)
+        self.calls = 0
+
+    async def create(self, **kwargs):
+        self.calls += 1
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=self.content))])
+
+
+@pytest.fixture(autouse=True)
+def configured(monkeypatch):
+    monkeypatch.setattr(settings, "OPENAI_API_KEY", "test-key")
+
+
+def test_saturated_queue_fails_without_opening_the_breaker(monkeypatch):
+    monkeypatch.setattr(settings, "LLM_DEADLINE_SECONDS", 0.05)
+    client = FakeClient()
+    engine = LLMEngine(client=client)
+    engine.breaker.failure_threshold = 1
+
+    async def run():
+        # Every slot is taken by calls that never finish
+        engine._slots = asyncio.Semaphore(0)
+        with pytest.raises(LLMUnavailableError):
+            await engine.get_completion("question")
+
+    asyncio.run(run())
+    assert engine.queue_timeouts == 1
+    assert engine.waiting == 0
+    assert client.calls == 0
+    assert engine.breaker.state == "closed"
+    assert engine.breaker.consecutive_failures == 0
+
+
+def test_empty_completion_falls_back():
+    engine = LLMEngine(client=FakeClient(content=None))
+    with pytest.raises(LLMUnavailableError):
+        asyncio.run(engine.get_completion("question"))
+    assert engine.empty_answers == 1
+    assert engine.breaker.state == "closed"
+
+
+def test_completion_is_stripped():
+    engine = LLMEngine(client=FakeClient(content="  Réponse  \n"))
+    assert asyncio.run(engine.get_completion("question")) == "Réponse"
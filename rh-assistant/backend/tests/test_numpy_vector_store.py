@@ -0,0 +1,48 @@
+import numpy as np
+
+from app.ml import numpy_vector_store as numpy_vector_store_module
+from app.ml.numpy_vector_store import NumpyVectorStore
+
+COSINE = {"hnsw:space": "cosine"}
+
+
+def _vectors(count, seed):
+    return np.random.default_rng(seed).normal(size=(count, 8)).tolist()
+
+
+def test_workers_sharing_a_directory_keep_each_others_rows(tmp_path):
+    first = NumpyVectorStore("docs", COSINE, str(tmp_path))
+    second = NumpyVectorStore("docs", COSINE, str(tmp_path))
+
+    for batch in range(5):
+        for name, store in (("a", first), ("b", second)):
+            ids = [f"{name}-{batch}-{i}" for i in range(3)]
+            store.upsert_chunks(ids, ids, [{"worker": name} for _ in ids], _vectors(3, batch))
+    second.update_metadatas(["a-0-0"], [{"validated": True}])
+    first.delete_documents(where={"worker": "b"})
+
+    reopened = NumpyVectorStore("docs", COSINE, str(tmp_path))
+    for store in (first, second, reopened):
+        assert sorted(store.get_ids({"worker": "a"})) == sorted(f"a-{batch}-{i}" for batch in range(5) for i in range(3))
+        assert store.get_ids({"worker": "b"}) == []
+        assert store.get_metadatas(ids=["a-0-0"]) == [{"worker": "a", "validated": True}]
+
+
+def test_writes_append_to_the_log_until_compaction(tmp_path, monkeypatch):
+    store = NumpyVectorStore("docs", COSINE, str(tmp_path))
+    for batch in range(10):
+        ids = [f"{batch}-{i}" for i in range(4)]
+        store.upsert_chunks(ids, ids, [{} for _ in ids], _vectors(4, batch))
+    assert not (tmp_path / "docs.npy").exists()
+    assert store.stats()["compactions"] == 0
+
+    monkeypatch.setattr(numpy_vector_store_module, "COMPACT_MIN_LOG_BYTES", 0)
+    store.upsert_chunks(["last"], ["last"], [{}], _vectors(1, 99))
+    assert store.stats()["compactions"] == 1
+    assert (tmp_path / "docs.log").stat().st_size == 0
+
+    reopened = NumpyVectorStore("docs", COSINE, str(tmp_path))
+    assert len(reopened) == 41
+    query = _vectors(1, 99)
+    assert reopened.query_by_embeddings(query, 1)["ids"] == [["last"]]
+    assert store.query_by_embeddings(query, 1)["ids"] == [["last"]]
@@ -0,0 +1,34 @@
+import asyncio
+
+import numpy as np
+
+from app.ml import vectorizer as vectorizer_module
+from app.ml.numpy_vector_store import NumpyVectorStore
+from app.services.rag import RAGPipeline, cosine_similarity
+
+
+def test_cosine_similarity_per_space():
+    assert cosine_similarity(0.0, "cosine") == 1.0
+    assert cosine_similarity(1.0, "cosine") == 0.0
+    # Squared L2 between unit vectors: orthogonal is 2, opposite is 4
+    assert cosine_similarity(2.0, "l2") == 0.0
+    assert cosine_similarity(4.0, "l2") == 0.0
+    assert cosine_similarity(0.5, "l2") == 0.75
+
+
+def test_unrelated_document_falls_below_min_relevance(tmp_path, monkeypatch):
+    # The hr_documents collection is created without a space, so it uses l2 like Chroma
+    store = NumpyVectorStore("hr_documents", None, str(tmp_path))
+    store.upsert_chunks(
+        ["related", "unrelated"],
+        ["Congés annuels : 22 jours ouvrables", "Menu de la cantine"],
+        [{"filename": "conges.pdf"}, {"filename": "cantine.pdf"}],
+        [[1.0, 0.1, 0.0], [0.0, 0.0, 1.0]],
+    )
+    monkeypatch.setattr(vectorizer_module, "get_vector_store", lambda: store)
+    pipeline = RAGPipeline(top_k=2, min_relevance=0.2)
+
+    passages = asyncio.run(pipeline._document_passages(np.array([1.0, 0.0, 0.0]).tolist()))
+    relevance = {passage.source: passage.relevance for passage in passages}
+    assert relevance["Document - conges.pdf"] > 0.9
+    assert relevance["Document - cantine.pdf"] < pipeline.min_relevance